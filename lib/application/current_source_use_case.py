@@ -0,0 +1,19 @@
+"""Use case for reading the current audio source."""
+from typing import Optional
+from lib.infrastructure.audio_service import AudioSystemClient
+
+
+class CurrentSourceUseCase:
+    """Use case for reading the default audio source."""
+    
+    def __init__(self, audio_client: AudioSystemClient):
+        self._audio_client = audio_client
+    
+    def execute(self) -> Optional[str]:
+        """
+        Get the name of the default audio source.
+        
+        Returns:
+            Source name, or None if it could not be determined
+        """
+        return self._audio_client.get_default_source()
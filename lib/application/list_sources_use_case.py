@@ -1,13 +1,28 @@
 """Use case for listing audio sources."""
+import threading
+from collections import OrderedDict
+from typing import List, Optional
 from lib.domain.audio_source import AudioSourceList
+from lib.domain.source_search import Match, SourceSearchIndex, normalize
 from lib.infrastructure.audio_service import AudioSystemClient
 
 
 class ListSourcesUseCase:
-    """Use case for listing and filtering audio sources."""
+    """Use case for listing and filtering audio sources.
+    
+    Full match sets of recent queries are memoized per snapshot, so a query
+    that extends an earlier one ("us" after "u") only re-checks the earlier
+    matches instead of the whole list. ``prepare()`` builds the index for a
+    snapshot ahead of the first query on it.
+    """
+    
+    MEMO_SIZE = 16
     
     def __init__(self, audio_client: AudioSystemClient):
         self._audio_client = audio_client
+        self._index: Optional[SourceSearchIndex] = None
+        self._memo: "OrderedDict[str, List[Match]]" = OrderedDict()
+        self._lock = threading.Lock()
     
     def execute(self, query: str = "", limit: int = 10) -> AudioSourceList:
         """
@@ -18,7 +33,7 @@ class ListSourcesUseCase:
             limit: Maximum number of sources to return (must be > 0)
             
         Returns:
-            Filtered and limited list of audio sources
+            Matching sources, best matches first, limited to ``limit``
             
         Raises:
             ValueError: If limit is less than 1
@@ -27,8 +42,40 @@ class ListSourcesUseCase:
             raise ValueError("limit must be greater than 0")
         
         sources = self._audio_client.list_sources()
+        needle = normalize(query)
+        
+        if not needle:
+            return sources.view().limit(limit).materialize()
+        
+        with self._lock:
+            index = self._index_for(sources)
+            matches = self._matches(index, needle)
+        return index.top(matches, limit)
+    
+    def prepare(self, sources: AudioSourceList) -> None:
+        """Build the search index for a snapshot before it is queried."""
+        with self._lock:
+            self._index_for(sources)
+    
+    def _index_for(self, sources: AudioSourceList) -> SourceSearchIndex:
+        """Reuse the index and memo while the client returns the same snapshot."""
+        index = self._index
+        if index is None or index.sources is not sources:
+            index = self._index = SourceSearchIndex(sources)
+            self._memo.clear()
+        return index
+    
+    def _matches(self, index: SourceSearchIndex, needle: str) -> List[Match]:
+        matches = self._memo.get(needle)
+        if matches is not None:
+            self._memo.move_to_end(needle)
+            return matches
         
-        if query:
-            sources = sources.filter_by_query(query)
+        base = max((q for q in self._memo if needle.startswith(q)), key=len, default=None)
+        within = [position for _, position in self._memo[base]] if base is not None else None
+        matches = index.matches(needle, within)
         
-        return sources.limit(limit)
+        self._memo[needle] = matches
+        if len(self._memo) > self.MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return matches
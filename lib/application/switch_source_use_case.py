@@ -1,6 +1,10 @@
 """Use case for switching audio source."""
 import logging
+import time
+from typing import Optional
+from lib.domain.stream_move import SwitchResult
 from lib.infrastructure.audio_service import AudioSystemClient
+from lib.infrastructure.command_runner import operation_deadline
 
 logger = logging.getLogger(__name__)
 
@@ -8,22 +12,37 @@ logger = logging.getLogger(__name__)
 class SwitchSourceUseCase:
     """Use case for switching to a different audio source."""
     
-    def __init__(self, audio_client: AudioSystemClient):
+    def __init__(self, audio_client: AudioSystemClient, deadline: Optional[float] = None):
         self._audio_client = audio_client
+        self._deadline = deadline
     
-    def execute(self, source_name: str) -> None:
+    def execute(self, source_name: str) -> SwitchResult:
         """
         Switch to a different audio source.
         
+        With a ``deadline``, setting the default and moving the streams
+        share that one budget instead of each running to its own timeout.
+        
         Args:
             source_name: Name of the source to switch to
             
+        Returns:
+            Total switch duration and the per-stream move report
+            
         Raises:
             ValueError: If source_name is empty
+            RuntimeError: If the default source could not be set
         """
         if not source_name or not source_name.strip():
             raise ValueError("Source name cannot be empty")
         
         logger.info(f"Switching to audio source: {source_name}")
-        self._audio_client.set_default_source(source_name)
-        self._audio_client.move_streams_to_source(source_name)
+        started = time.monotonic()
+        if self._deadline is None:
+            self._audio_client.set_default_source(source_name)
+            streams = self._audio_client.move_streams_to_source(source_name)
+        else:
+            with operation_deadline(self._deadline):
+                self._audio_client.set_default_source(source_name)
+                streams = self._audio_client.move_streams_to_source(source_name)
+        return SwitchResult(source_name, streams, time.monotonic() - started)
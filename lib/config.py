@@ -1,24 +1,70 @@
 """Configuration settings for the extension."""
 from dataclasses import dataclass
+from typing import Tuple
+from lib.domain.stream_move import DEFAULT_STREAM_EXCLUSIONS, StreamExclusionPolicy
+
+AUDIO_BACKENDS = ("auto", "pulse-native", "pw-dump", "pactl", "macos")
 
 
 @dataclass(frozen=True)
 class Config:
     """Extension configuration."""
+    audio_backend: str = "auto"
     pactl_timeout: float = 0.3
+    adaptive_timeouts: bool = True
+    timeout_floor: float = 0.05
+    timeout_ceiling: float = 2.0
+    timeout_factor: float = 3.0
     set_source_timeout: float = 0.5
     move_stream_timeout: float = 0.5
+    move_stream_workers: int = 4
+    switch_deadline: float = 1.5
+    circuit_failure_threshold: int = 3
+    circuit_reset_timeout: float = 1.0
+    stream_exclusions: Tuple[str, ...] = DEFAULT_STREAM_EXCLUSIONS
+    two_tier_listing: bool = True
+    source_list_ttl: float = 1.0
+    source_list_grace: float = 5.0
+    source_snapshot_file: bool = True
+    shared_snapshot: bool = True
+    event_coalesce_window: float = 0.15
+    min_refresh_interval: float = 0.5
     max_sources_display: int = 10
     notification_expire_time: int = 800
     
     def __post_init__(self):
         """Validate configuration values."""
+        if self.audio_backend not in AUDIO_BACKENDS:
+            raise ValueError(f"audio_backend must be one of {', '.join(AUDIO_BACKENDS)}")
         if self.pactl_timeout <= 0:
             raise ValueError("pactl_timeout must be greater than 0")
+        if self.timeout_floor <= 0:
+            raise ValueError("timeout_floor must be greater than 0")
+        if self.timeout_ceiling < self.timeout_floor:
+            raise ValueError("timeout_ceiling must not be lower than timeout_floor")
+        if self.timeout_factor < 1:
+            raise ValueError("timeout_factor must be at least 1")
         if self.set_source_timeout <= 0:
             raise ValueError("set_source_timeout must be greater than 0")
         if self.move_stream_timeout <= 0:
             raise ValueError("move_stream_timeout must be greater than 0")
+        if self.move_stream_workers < 1:
+            raise ValueError("move_stream_workers must be at least 1")
+        if self.switch_deadline <= 0:
+            raise ValueError("switch_deadline must be greater than 0")
+        if self.circuit_failure_threshold < 1:
+            raise ValueError("circuit_failure_threshold must be at least 1")
+        if self.circuit_reset_timeout <= 0:
+            raise ValueError("circuit_reset_timeout must be greater than 0")
+        StreamExclusionPolicy.from_strings(self.stream_exclusions)
+        if self.source_list_ttl < 0:
+            raise ValueError("source_list_ttl must be non-negative")
+        if self.source_list_grace < 0:
+            raise ValueError("source_list_grace must be non-negative")
+        if self.event_coalesce_window < 0:
+            raise ValueError("event_coalesce_window must be non-negative")
+        if self.min_refresh_interval < 0:
+            raise ValueError("min_refresh_interval must be non-negative")
         if self.max_sources_display < 1:
             raise ValueError("max_sources_display must be at least 1")
         if self.notification_expire_time < 0:
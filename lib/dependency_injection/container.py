@@ -1,53 +1,334 @@
 """Dependency injection container."""
+import atexit
+import logging
+import shutil
 import sys
-from typing import Optional
+from dataclasses import dataclass
+from enum import Flag, auto
+from typing import Callable, List, Optional, Tuple
 from lib.config import Config
-from lib.infrastructure.audio_service import AudioSystemClient, PactlClient
+from lib.domain.circuit_breaker import CircuitBreaker
+from lib.domain.event_coalescer import EventCoalescer
+from lib.domain.latency import AdaptiveTimeouts
+from lib.domain.stream_move import StreamExclusionPolicy
+from lib.infrastructure import pulse_protocol
+from lib.infrastructure.audio_service import AudioSystemClient, PactlClient, PulseNativeClient
+from lib.infrastructure.backend_probe import BackendChoiceStore, probe_latency, server_identity
+from lib.infrastructure.command_runner import CommandRunner
+from lib.infrastructure.latency_store import LatencyStore
+from lib.infrastructure.shared_snapshot import SharedSnapshotPublisher
+from lib.infrastructure.source_cache import SourceCache
+from lib.infrastructure.source_snapshot import SourceSnapshotFile
+from lib.application.current_source_use_case import CurrentSourceUseCase
 from lib.application.list_sources_use_case import ListSourcesUseCase
 from lib.application.switch_source_use_case import SwitchSourceUseCase
 
+logger = logging.getLogger(__name__)
+
+
+class Capability(Flag):
+    """What an audio backend offers beyond the AudioSystemClient protocol."""
+    NONE = 0
+    EVENT_FEED = auto()
+    BATCH_OPS = auto()
+    JSON_OUTPUT = auto()
+    NATIVE_SOCKET = auto()
+
+
+@dataclass(frozen=True)
+class Backend:
+    """A way of talking to the audio server, registered in ``BACKENDS``."""
+    name: str
+    platform: str
+    capabilities: Capability
+    is_available: Callable[[], bool]
+    create: Callable[[Config, CommandRunner], AudioSystemClient]
+    event_feed: Optional[Callable[[], Tuple[object, object]]] = None
+
+
+def _create_pactl(config: Config, runner: CommandRunner) -> AudioSystemClient:
+    return PactlClient(
+        timeout=config.pactl_timeout,
+        set_source_timeout=config.set_source_timeout,
+        move_stream_timeout=config.move_stream_timeout,
+        move_stream_workers=config.move_stream_workers,
+        move_deadline=config.switch_deadline,
+        exclusion_policy=StreamExclusionPolicy.from_strings(config.stream_exclusions),
+        two_tier_listing=config.two_tier_listing,
+        runner=runner,
+        list_cache_ttl=config.source_list_ttl,
+        list_cache_grace=config.source_list_grace
+    )
+
+
+def _create_pulse_native(config: Config, runner: CommandRunner) -> AudioSystemClient:
+    return PulseNativeClient(
+        timeout=config.pactl_timeout,
+        exclusion_policy=StreamExclusionPolicy.from_strings(config.stream_exclusions),
+        breaker=runner.breaker
+    )
+
+
+def _create_pw_dump(config: Config, runner: CommandRunner) -> AudioSystemClient:
+    from lib.infrastructure.pipewire_dump import PipeWireDumpClient
+    return PipeWireDumpClient(
+        timeout=config.pactl_timeout,
+        set_source_timeout=config.set_source_timeout,
+        move_stream_timeout=config.move_stream_timeout,
+        move_stream_workers=config.move_stream_workers,
+        move_deadline=config.switch_deadline,
+        exclusion_policy=StreamExclusionPolicy.from_strings(config.stream_exclusions),
+        runner=runner
+    )
+
+
+def _create_macos(config: Config, runner: CommandRunner) -> AudioSystemClient:
+    from lib.infrastructure.macos_audio_service import MacOSAudioClient
+    return MacOSAudioClient(
+        timeout=config.pactl_timeout,
+        set_source_timeout=config.set_source_timeout,
+        runner=runner
+    )
+
+
+def _pactl_feed():
+    from lib.infrastructure.device_monitor import PactlEventParser, PactlSubscribeReader
+    return PactlSubscribeReader(), PactlEventParser()
+
+
+def _pw_dump_feed():
+    from lib.infrastructure.pipewire_dump import PwDumpEventParser, PwDumpMonitorReader
+    return PwDumpMonitorReader(), PwDumpEventParser()
+
+
+BACKENDS: Tuple[Backend, ...] = (
+    Backend(
+        "pulse-native", "linux", Capability.NATIVE_SOCKET | Capability.BATCH_OPS,
+        lambda: pulse_protocol.default_socket_path() is not None, _create_pulse_native,
+    ),
+    Backend(
+        "pw-dump", "linux", Capability.JSON_OUTPUT | Capability.EVENT_FEED,
+        lambda: bool(shutil.which("pw-dump") and shutil.which("pw-metadata")), _create_pw_dump, _pw_dump_feed,
+    ),
+    Backend(
+        "pactl", "linux", Capability.EVENT_FEED,
+        lambda: shutil.which("pactl") is not None, _create_pactl, _pactl_feed,
+    ),
+    Backend("macos", "darwin", Capability.NONE, lambda: True, _create_macos),
+)
+"""Known backends, most compatible last within each platform."""
+
+
+def platform_backends(platform: Optional[str] = None) -> List[Backend]:
+    """Registered backends usable on the platform."""
+    platform = platform or sys.platform
+    return [backend for backend in BACKENDS if platform.startswith(backend.platform)]
+
 
 class Container:
     """Dependency injection container."""
     
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(
+        self,
+        config: Optional[Config] = None,
+        backend_store: Optional[BackendChoiceStore] = None,
+        latency_store: Optional[LatencyStore] = None,
+    ):
         self._config = config or Config()
+        self._backend_store = backend_store or BackendChoiceStore()
+        self._latency_store = latency_store or LatencyStore()
+        self._circuit_breaker: Optional[CircuitBreaker] = None
+        self._command_runner: Optional[CommandRunner] = None
+        self._backend: Optional[Backend] = None
         self._audio_client: Optional[AudioSystemClient] = None
+        self._source_cache: Optional[SourceCache] = None
+        self._snapshot_publisher: Optional[SharedSnapshotPublisher] = None
         self._list_use_case: Optional[ListSourcesUseCase] = None
         self._switch_use_case: Optional[SwitchSourceUseCase] = None
+        self._current_use_case: Optional[CurrentSourceUseCase] = None
         self._presenter = None
     
     def audio_client(self) -> AudioSystemClient:
         """Get audio system client."""
         if self._audio_client is None:
-            if sys.platform.startswith("linux"):
-                self._audio_client = PactlClient(
-                    timeout=self._config.pactl_timeout,
-                    set_source_timeout=self._config.set_source_timeout,
-                    move_stream_timeout=self._config.move_stream_timeout
+            backend = self.backend()
+            if self._audio_client is None:
+                self._audio_client = backend.create(self._config, self.command_runner())
+        return self._audio_client
+    
+    def command_runner(self) -> CommandRunner:
+        """Get the runner shared by command-line backends, learning timeouts if enabled."""
+        if self._command_runner is None:
+            if self._config.adaptive_timeouts:
+                timeouts = AdaptiveTimeouts(
+                    floor=self._config.timeout_floor,
+                    ceiling=self._config.timeout_ceiling,
+                    factor=self._config.timeout_factor,
                 )
-            elif sys.platform == "darwin":
-                from lib.infrastructure.macos_audio_service import MacOSAudioClient
-                self._audio_client = MacOSAudioClient(
-                    timeout=self._config.pactl_timeout,
-                    set_source_timeout=self._config.set_source_timeout
+                store = self._latency_store
+                store.load(timeouts)
+                atexit.register(store.flush, timeouts)
+                self._command_runner = CommandRunner(
+                    timeouts,
+                    on_observed=lambda: store.save_if_due(timeouts),
+                    breaker=self.circuit_breaker(),
                 )
             else:
+                self._command_runner = CommandRunner(breaker=self.circuit_breaker())
+        return self._command_runner
+    
+    def circuit_breaker(self) -> CircuitBreaker:
+        """Get the breaker shared by every call to the audio server."""
+        if self._circuit_breaker is None:
+            self._circuit_breaker = CircuitBreaker(
+                failure_threshold=self._config.circuit_failure_threshold,
+                reset_timeout=self._config.circuit_reset_timeout,
+            )
+        return self._circuit_breaker
+    
+    def backend(self) -> Backend:
+        """
+        Get the audio backend, selecting it on first use.
+        
+        ``Config.audio_backend`` forces a backend. Otherwise the choice saved
+        for the running audio server is reused while that backend is still
+        available; failing that, every available backend is probed and the
+        fastest working one is used and saved.
+        """
+        if self._backend is None:
+            candidates = platform_backends()
+            if not candidates:
                 raise RuntimeError(f"Unsupported platform: {sys.platform}")
-        return self._audio_client
+            
+            if self._config.audio_backend != "auto":
+                forced = [b for b in candidates if b.name == self._config.audio_backend]
+                if not forced:
+                    raise RuntimeError(f"Audio backend '{self._config.audio_backend}' is not supported on {sys.platform}")
+                self._backend = forced[0]
+            else:
+                self._backend = self._select_backend(candidates)
+        return self._backend
+    
+    def _select_backend(self, candidates: List[Backend]) -> Backend:
+        available = [b for b in candidates if b.is_available()]
+        if len(available) <= 1:
+            return available[0] if available else candidates[-1]
+        
+        server = server_identity(self.command_runner(), self._config.set_source_timeout)
+        saved = self._backend_store.load(server) if server else None
+        for backend in available:
+            if backend.name == saved:
+                logger.debug(f"Using saved audio backend '{saved}' for {server}")
+                return backend
+        
+        best: Optional[Tuple[float, Backend, AudioSystemClient]] = None
+        for backend in available:
+            client = backend.create(self._config, self.command_runner())
+            latency = probe_latency(client)
+            logger.debug(f"Probed audio backend '{backend.name}': {latency}")
+            if latency is not None and (best is None or latency < best[0]):
+                if best:
+                    self._close(best[2])
+                best = (latency, backend, client)
+            else:
+                self._close(client)
+        
+        if best is None:
+            logger.warning("No audio backend answered the probe, falling back to the most compatible one")
+            return available[-1]
+        
+        latency, backend, client = best
+        self._audio_client = client
+        if server:
+            self._backend_store.save(server, backend.name, latency)
+        logger.info(f"Selected audio backend '{backend.name}' ({latency * 1000:.1f} ms round trip)")
+        return backend
+    
+    @staticmethod
+    def _close(client: AudioSystemClient) -> None:
+        close = getattr(client, "close", None)
+        if close:
+            close()
+    
+    def source_cache(self) -> SourceCache:
+        """Get in-memory source list cache."""
+        if self._source_cache is None:
+            client = self.audio_client()
+            saves_snapshots = self._config.source_snapshot_file and hasattr(client, "snapshot_token")
+            self._source_cache = SourceCache(
+                client,
+                breaker=self.circuit_breaker(),
+                snapshot_file=SourceSnapshotFile() if saves_snapshots else None,
+            )
+        return self._source_cache
+    
+    def publish_shared_snapshot(self) -> None:
+        """
+        Publish the source cache for readers in other processes.
+        
+        Only the long-lived process owning the cache should call this; a
+        published file has a single writer, so while another running owner
+        (the service or the extension) publishes it, this one does not.
+        """
+        if self._snapshot_publisher is None and self._config.shared_snapshot:
+            self._snapshot_publisher = SharedSnapshotPublisher()
+            self.source_cache().attach_publisher(self._snapshot_publisher)
+            atexit.register(self._snapshot_publisher.close)
     
     def list_sources_use_case(self) -> ListSourcesUseCase:
         """Get list sources use case."""
         if self._list_use_case is None:
-            self._list_use_case = ListSourcesUseCase(self.audio_client())
+            self._list_use_case = ListSourcesUseCase(self.source_cache())
+            self.source_cache().on_install(self._list_use_case.prepare)
         return self._list_use_case
     
     def switch_source_use_case(self) -> SwitchSourceUseCase:
-        """Get switch source use case."""
+        """Get switch source use case; switches go through the source cache so its default stays current."""
         if self._switch_use_case is None:
-            self._switch_use_case = SwitchSourceUseCase(self.audio_client())
+            self._switch_use_case = SwitchSourceUseCase(self.source_cache(), deadline=self._config.switch_deadline)
         return self._switch_use_case
     
+    def current_source_use_case(self) -> CurrentSourceUseCase:
+        """Get current source use case."""
+        if self._current_use_case is None:
+            self._current_use_case = CurrentSourceUseCase(self.source_cache())
+        return self._current_use_case
+    
+    def device_monitor(self):
+        """Create a device monitor that refreshes the source cache, if supported."""
+        if not sys.platform.startswith("linux"):
+            return None
+        
+        from lib.infrastructure.device_monitor import DeviceChangeNotifier, PulseAudioDeviceMonitor
+        reader, parser = self.event_feed()
+        return PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(self.source_cache().apply_events),
+            reader,
+            parser,
+            resync=self.source_cache().resync,
+            coalescer=self.event_coalescer(),
+            on_freshness=self.source_cache().set_freshness,
+        )
+    
+    def event_feed(self):
+        """
+        Create the reader and parser of the backend's change feed.
+        
+        Backends without a feed of their own are followed with `pactl subscribe`.
+        """
+        backend = self.backend()
+        if Capability.EVENT_FEED in backend.capabilities and backend.event_feed:
+            return backend.event_feed()
+        return _pactl_feed()
+    
+    def event_coalescer(self) -> EventCoalescer:
+        """Create a coalescer for device event bursts."""
+        return EventCoalescer(
+            window=self._config.event_coalesce_window,
+            min_interval=self._config.min_refresh_interval,
+            max_delay=max(1.0, self._config.event_coalesce_window),
+        )
+    
     def presenter(self):
         """Get presenter (lazy import to avoid Ulauncher dependency)."""
         if self._presenter is None:
@@ -56,6 +337,10 @@ class Container:
                 self.list_sources_use_case(),
                 self.switch_source_use_case(),
                 max_sources=self._config.max_sources_display,
-                notification_expire_time=self._config.notification_expire_time
+                notification_expire_time=self._config.notification_expire_time,
+                source_cache=self.source_cache(),
+                event_coalescer=self.event_coalescer(),
+                event_feed=self.event_feed() if sys.platform.startswith("linux") else None,
+                refresh_interval=self._config.source_list_ttl
             )
         return self._presenter
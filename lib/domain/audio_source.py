@@ -1,23 +1,83 @@
 """Domain model for audio sources."""
-from dataclasses import dataclass
-from typing import List
+import unicodedata
+from dataclasses import FrozenInstanceError, dataclass
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+
+
+KEY_SEPARATOR = "\0"
+
+
+def normalize(text: str) -> str:
+    """Casefold and strip accents so "Mikrofón" and "mikrofon" compare equal."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
 
 
-@dataclass(frozen=True)
 class AudioSource:
-    """Represents an audio input source."""
-    name: str
-    index: int
-    description: str = ""
+    """Represents an audio input source.
+    
+    An immutable, slotted record: the normalized search key (name and
+    description joined by a NUL, so one ``in`` test checks both) and the
+    monitor flag are computed once when the source is created instead of on
+    every query. This trades memory for speed: storing the key makes a
+    source larger than the plain dataclass it replaced.
+    """
+    
+    __slots__ = (
+        "name",
+        "index",
+        "description",
+        "search_key",
+        "_monitor",
+    )
+    
+    def __init__(self, name: str, index: int, description: str = ""):
+        init = object.__setattr__
+        init(self, "name", name)
+        init(self, "index", index)
+        init(self, "description", description)
+        init(self, "search_key", KEY_SEPARATOR.join(normalize(key) for key in (name, description) if key))
+        init(self, "_monitor", "monitor" in name.lower())
+    
+    def __setattr__(self, key, value):
+        raise FrozenInstanceError(f"cannot assign to field '{key}'")
+    
+    def __delattr__(self, key):
+        raise FrozenInstanceError(f"cannot delete field '{key}'")
+    
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.name, self.index, self.description) == (other.name, other.index, other.description)
+    
+    def __hash__(self):
+        return hash((self.name, self.index, self.description))
+    
+    def __repr__(self):
+        return f"AudioSource(name={self.name!r}, index={self.index!r}, description={self.description!r})"
+    
+    def __reduce__(self):
+        return (AudioSource, (self.name, self.index, self.description))
     
     def is_monitor(self) -> bool:
         """Check if this is a monitor source."""
-        return "monitor" in self.name.lower()
+        return self._monitor
     
     def matches_query(self, query: str) -> bool:
         """Check if source name or description matches search query."""
-        query_lower = query.lower()
-        return query_lower in self.name.lower() or query_lower in self.description.lower()
+        return self.matches_key(normalize(query))
+    
+    def matches_key(self, needle: str) -> bool:
+        """Check if an already normalized query occurs in name or description."""
+        return needle in self.search_key and KEY_SEPARATOR not in needle
+    
+    @property
+    def search_keys(self) -> Tuple[str, ...]:
+        """Normalized name and description (when set), as separate keys."""
+        return tuple(self.search_key.split(KEY_SEPARATOR))
     
     def display_name(self) -> str:
         """Get user-friendly display name."""
@@ -26,26 +86,89 @@ class AudioSource:
 
 @dataclass(frozen=True)
 class AudioSourceList:
-    """Collection of audio sources."""
+    """Collection of audio sources.
+    
+    A ``stale`` list is the last one known to be good, served while the
+    audio server is not answering; filtering and limiting keep the flag.
+    """
     sources: List[AudioSource]
+    stale: bool = False
     
     def filter_monitors(self) -> "AudioSourceList":
         """Return sources excluding monitors."""
         filtered = [s for s in self.sources if not s.is_monitor()]
-        return AudioSourceList(filtered)
+        return AudioSourceList(filtered, self.stale)
     
     def filter_by_query(self, query: str) -> "AudioSourceList":
         """Filter sources matching query."""
         if not query:
             return self
-        filtered = [s for s in self.sources if s.matches_query(query)]
-        return AudioSourceList(filtered)
+        needle = normalize(query)
+        filtered = [s for s in self.sources if s.matches_key(needle)]
+        return AudioSourceList(filtered, self.stale)
     
     def limit(self, max_count: int) -> "AudioSourceList":
         """Limit number of sources."""
         limited = self.sources[:max_count]
-        return AudioSourceList(limited)
+        return AudioSourceList(limited, self.stale)
     
     def is_empty(self) -> bool:
         """Check if list is empty."""
         return len(self.sources) == 0
+    
+    def as_stale(self) -> "AudioSourceList":
+        """The same sources, marked as possibly out of date."""
+        return AudioSourceList(self.sources, stale=True)
+    
+    def view(self) -> "AudioSourceView":
+        """Start a lazy pipeline over these sources."""
+        return AudioSourceView(self.sources, stale=self.stale)
+
+
+Step = Union[Callable[[AudioSource], bool], int]
+
+
+class AudioSourceView:
+    """Lazy, composable pipeline of filters and limits over audio sources.
+    
+    Each operation returns a new view and does no work. Iterating runs all
+    steps in a single pass that stops as soon as the last limit is reached;
+    ``materialize()`` collects the result into an ``AudioSourceList``.
+    """
+    
+    def __init__(self, sources: Iterable[AudioSource], steps: Tuple[Step, ...] = (), stale: bool = False):
+        self._sources = sources
+        self._steps = steps
+        self._stale = stale
+    
+    def filter_monitors(self) -> "AudioSourceView":
+        """Exclude monitor sources."""
+        return self.where(lambda s: not s.is_monitor())
+    
+    def filter_by_query(self, query: str) -> "AudioSourceView":
+        """Keep sources matching query."""
+        if not query:
+            return self
+        needle = normalize(query)
+        return self.where(lambda s: s.matches_key(needle))
+    
+    def where(self, predicate: Callable[[AudioSource], bool]) -> "AudioSourceView":
+        """Keep sources for which ``predicate`` is true."""
+        return AudioSourceView(self._sources, self._steps + (predicate,), self._stale)
+    
+    def limit(self, max_count: int) -> "AudioSourceView":
+        """Stop after ``max_count`` sources."""
+        return AudioSourceView(self._sources, self._steps + (max_count,), self._stale)
+    
+    def __iter__(self) -> Iterator[AudioSource]:
+        sources: Iterator[AudioSource] = iter(self._sources)
+        for step in self._steps:
+            if isinstance(step, int):
+                sources = islice(sources, max(step, 0))
+            else:
+                sources = filter(step, sources)
+        return sources
+    
+    def materialize(self) -> AudioSourceList:
+        """Run the pipeline and collect the result."""
+        return AudioSourceList(list(self), self._stale)
@@ -0,0 +1,88 @@
+"""Circuit breaker for calls to an audio server that stopped answering."""
+import threading
+from enum import Enum
+from typing import Optional
+
+
+class CircuitState(Enum):
+    """Whether calls are let through to the server."""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Fails calls fast once the server keeps timing out.
+
+    Time is passed in by the caller, so the policy has no clock of its own.
+    After ``failure_threshold`` failures in a row the circuit opens and
+    ``allow`` refuses calls for ``reset_timeout`` seconds. Then a single
+    trial call is let through: its success closes the circuit, its failure
+    opens it again for twice as long, up to ``max_reset_timeout``. A trial
+    that never reports back is replaced by a new one after the same wait.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 1.0, max_reset_timeout: float = 30.0):
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        if reset_timeout <= 0:
+            raise ValueError("reset_timeout must be greater than 0")
+        if max_reset_timeout < reset_timeout:
+            raise ValueError("max_reset_timeout must not be shorter than reset_timeout")
+
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._max_reset_timeout = max_reset_timeout
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._wait = reset_timeout
+        self._retry_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    @property
+    def healthy(self) -> bool:
+        """Check if the last call that reported back succeeded."""
+        return self._failures == 0
+
+    @property
+    def retry_at(self) -> Optional[float]:
+        """Time from which the next trial call is let through, while not closed."""
+        return self._retry_at
+
+    def allow(self, now: float) -> bool:
+        """Check if a call may go to the server, claiming the trial when one is due."""
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return True
+            if now < self._retry_at:
+                return False
+
+            self._state = CircuitState.HALF_OPEN
+            self._retry_at = now + self._wait
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit after a call the server answered."""
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._wait = self._reset_timeout
+            self._retry_at = None
+
+    def record_failure(self, now: float) -> None:
+        """Count a call that timed out, opening the circuit when it is one too many."""
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.OPEN:
+                return
+            if self._state is CircuitState.HALF_OPEN:
+                self._wait = min(self._wait * 2, self._max_reset_timeout)
+            elif self._failures < self._failure_threshold:
+                return
+
+            self._state = CircuitState.OPEN
+            self._retry_at = now + self._wait
@@ -0,0 +1,47 @@
+"""Domain model for audio server change events."""
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+
+class DeviceEventType(Enum):
+    """What happened to the object."""
+    NEW = "new"
+    CHANGE = "change"
+    REMOVE = "remove"
+
+
+class DeviceFacility(Enum):
+    """Kind of object the event is about."""
+    SINK = "sink"
+    SOURCE = "source"
+    SINK_INPUT = "sink-input"
+    SOURCE_OUTPUT = "source-output"
+    MODULE = "module"
+    CLIENT = "client"
+    SAMPLE_CACHE = "sample-cache"
+    SERVER = "server"
+    CARD = "card"
+
+
+class CacheFreshness(Enum):
+    """How far an event-fed cache can be trusted."""
+    LIVE = "live"
+    RESYNCING = "resyncing"
+    DEGRADED = "degraded"
+
+
+@dataclass(frozen=True)
+class DeviceEvent:
+    """A single change notification from the audio server."""
+    type: DeviceEventType
+    facility: DeviceFacility
+    index: Optional[int] = None
+
+    def affects_sources(self) -> bool:
+        """Check if the event can change the source list or the default source.
+
+        Card events are not included: profile and port changes that add or
+        remove sources are followed by their own source events.
+        """
+        return self.facility in (DeviceFacility.SOURCE, DeviceFacility.SERVER)
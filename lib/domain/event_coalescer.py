@@ -0,0 +1,93 @@
+"""Coalescing of bursts of audio server events."""
+from typing import Dict, List, Optional, Tuple
+from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+
+EventKey = Tuple[DeviceFacility, Optional[int]]
+
+
+class EventCoalescer:
+    """Merges events per object and decides when a batch may be flushed.
+
+    Time is passed in by the caller, so the policy has no clock or thread
+    of its own. A batch becomes due once no event has arrived for
+    ``window`` seconds, or ``max_delay`` seconds after its first event if
+    events keep coming. Flushes are never closer together than
+    ``min_interval`` seconds; events arriving in between are held for the
+    next one, so the last event of a burst is always flushed.
+    """
+
+    def __init__(self, window: float = 0.15, min_interval: float = 0.5, max_delay: float = 1.0):
+        if window < 0:
+            raise ValueError("window must be non-negative")
+        if min_interval < 0:
+            raise ValueError("min_interval must be non-negative")
+        if max_delay < window:
+            raise ValueError("max_delay must not be shorter than window")
+
+        self._window = window
+        self._min_interval = min_interval
+        self._max_delay = max_delay
+        self._pending: Dict[EventKey, DeviceEvent] = {}
+        self._first_event_at: Optional[float] = None
+        self._last_event_at: Optional[float] = None
+        self._last_flush_at: Optional[float] = None
+
+    def add(self, event: DeviceEvent, now: float) -> None:
+        """Record an event, merging it with a pending one for the same object."""
+        key = (event.facility, event.index)
+        merged = self._merge(self._pending.get(key), event)
+        if merged is None:
+            del self._pending[key]
+        else:
+            self._pending[key] = merged
+
+        if self._first_event_at is None:
+            self._first_event_at = now
+        self._last_event_at = now
+
+    def has_pending(self) -> bool:
+        """Check if a batch is waiting to be flushed."""
+        return self._last_event_at is not None
+
+    def due_at(self) -> Optional[float]:
+        """Time at which the pending batch should be flushed, if any."""
+        if self._last_event_at is None:
+            return None
+
+        due = min(self._last_event_at + self._window, self._first_event_at + self._max_delay)
+        if self._last_flush_at is not None:
+            due = max(due, self._last_flush_at + self._min_interval)
+        return due
+
+    def flush(self, now: float) -> List[DeviceEvent]:
+        """Take the pending batch if it is due, in arrival order.
+
+        A burst whose events cancelled each other out still counts as a
+        flush, but yields an empty batch.
+        """
+        due = self.due_at()
+        if due is None or now < due:
+            return []
+
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._first_event_at = None
+        self._last_event_at = None
+        self._last_flush_at = now
+        return events
+
+    @staticmethod
+    def _merge(pending: Optional[DeviceEvent], event: DeviceEvent) -> Optional[DeviceEvent]:
+        if pending is None:
+            return event
+
+        if pending.type is DeviceEventType.NEW:
+            # The object appeared during the burst: it is still new, or it
+            # was gone again before anyone looked.
+            return None if event.type is DeviceEventType.REMOVE else pending
+
+        if pending.type is DeviceEventType.REMOVE and event.type is DeviceEventType.NEW:
+            # Same index reused for a different object.
+            return DeviceEvent(DeviceEventType.CHANGE, event.facility, event.index)
+
+        return event
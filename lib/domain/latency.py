@@ -0,0 +1,153 @@
+"""Rolling latency statistics and the timeouts derived from them."""
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+BUCKET_BASE = 0.001
+BUCKET_RATIO = 2 ** 0.25
+BUCKET_BOUNDS = tuple(BUCKET_BASE * BUCKET_RATIO ** i for i in range(64))
+"""Upper bounds of the histogram buckets, 1 ms to about 50 s in steps of 19%."""
+
+
+class LatencyHistogram:
+    """Log-scale histogram over the last ``window`` samples.
+
+    Percentiles are reported as the upper bound of the bucket they fall in,
+    so they err on the long side by at most one bucket step.
+    """
+
+    def __init__(self, window: int = 256, buckets: Iterable[int] = ()):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+
+        self._recent: deque = deque(maxlen=window)
+        self._counts = [0] * len(BUCKET_BOUNDS)
+        for bucket in buckets:
+            if 0 <= bucket < len(BUCKET_BOUNDS):
+                self._add_bucket(bucket)
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def add(self, seconds: float) -> None:
+        """Record one sample; the oldest one drops out once the window is full."""
+        self._add_bucket(min(bisect_left(BUCKET_BOUNDS, seconds), len(BUCKET_BOUNDS) - 1))
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Latency below which ``percent`` of the samples fall, if there are any."""
+        if not self._recent:
+            return None
+
+        rank = max(1, -(-len(self._recent) * percent // 100))
+        seen = 0
+        for bucket, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return BUCKET_BOUNDS[bucket]
+        return BUCKET_BOUNDS[-1]
+
+    def buckets(self) -> List[int]:
+        """Bucket of every sample in the window, oldest first."""
+        return list(self._recent)
+
+    def _add_bucket(self, bucket: int) -> None:
+        if len(self._recent) == self._recent.maxlen:
+            self._counts[self._recent[0]] -= 1
+        self._recent.append(bucket)
+        self._counts[bucket] += 1
+
+
+class AdaptiveTimeouts:
+    """Per-operation timeouts following the observed latency.
+
+    Once an operation has ``min_samples`` samples, its timeout is its p99
+    latency times ``factor``, kept between ``floor`` and ``ceiling``.
+    Until then the caller's default applies. A call that timed out should be
+    recorded with the timeout it was given, which raises the next timeout
+    while the server stays slow.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(
+        self,
+        floor: float = 0.05,
+        ceiling: float = 2.0,
+        factor: float = 3.0,
+        percentile: float = 99,
+        min_samples: int = 20,
+        window: int = 256,
+    ):
+        if floor <= 0:
+            raise ValueError("floor must be greater than 0")
+        if ceiling < floor:
+            raise ValueError("ceiling must not be lower than floor")
+        if factor < 1:
+            raise ValueError("factor must be at least 1")
+
+        self.floor = floor
+        self.ceiling = ceiling
+        self.factor = factor
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def unsaved(self) -> int:
+        """Samples recorded since the last ``mark_saved``."""
+        return self._unsaved
+
+    def timeout(self, operation: str, default: float) -> float:
+        """Timeout to use for the next call of ``operation``."""
+        learned = self._learned(operation)
+        return default if learned is None else learned
+
+    def observe(self, operation: str, seconds: float) -> None:
+        """Record how long a call of ``operation`` took."""
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = LatencyHistogram(self.window)
+            histogram.add(seconds)
+            self._unsaved += 1
+
+    def percentiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p50, p90 and p99 latency, sample count and learned timeout per operation."""
+        with self._lock:
+            stats = {
+                operation: {
+                    **{f"p{p}": histogram.percentile(p) for p in self.PERCENTILES},
+                    "samples": len(histogram),
+                }
+                for operation, histogram in self._histograms.items()
+            }
+        for operation, values in stats.items():
+            values["timeout"] = self._learned(operation)
+        return stats
+
+    def to_dict(self) -> Dict[str, List[int]]:
+        """Histogram buckets per operation, for persisting."""
+        with self._lock:
+            return {operation: histogram.buckets() for operation, histogram in self._histograms.items()}
+
+    def load(self, state: Dict[str, List[int]]) -> None:
+        """Restore histograms saved with ``to_dict``."""
+        with self._lock:
+            for operation, buckets in state.items():
+                self._histograms[operation] = LatencyHistogram(self.window, buckets)
+
+    def mark_saved(self) -> None:
+        with self._lock:
+            self._unsaved = 0
+
+    def _learned(self, operation: str) -> Optional[float]:
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None or len(histogram) < self.min_samples:
+                return None
+            learned = histogram.percentile(self.percentile) * self.factor
+        return min(self.ceiling, max(self.floor, learned))
@@ -0,0 +1,105 @@
+"""Search index over an audio source snapshot."""
+import heapq
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from lib.domain.audio_source import KEY_SEPARATOR, AudioSourceList, normalize
+
+_WORD_SEPARATOR = re.compile(r"[\W_]+")
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+Match = Tuple[int, int]
+"""A ``(rank, snapshot position)`` pair; lower sorts first."""
+
+
+def trigrams(text: str) -> Set[str]:
+    """All three-character substrings of ``text``."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SourceSearchIndex:
+    """Query index built once per source snapshot.
+
+    Matching keeps the substring semantics of ``AudioSource.matches_query``
+    on normalized name and description. Queries of three or more characters
+    only verify sources sharing all of the query's trigrams; shorter ones
+    check every key. Results are ranked exact match, then prefix of a key,
+    then prefix of a word in a key, then any substring, keeping snapshot
+    order within a rank.
+
+    Each source keeps its keys and words as NUL-separated strings, so
+    ranking a candidate is a few substring tests on its own entry and
+    never looks at other sources.
+    """
+
+    def __init__(self, sources: AudioSourceList):
+        self._sources = sources
+        self._keys: List[Tuple[str, ...]] = []
+        self._key_starts: List[str] = []
+        self._word_starts: List[str] = []
+        self._trigrams: Dict[str, Set[int]] = {}
+
+        for position, source in enumerate(sources.sources):
+            keys = source.search_keys
+            self._keys.append(keys)
+            self._key_starts.append(KEY_SEPARATOR + source.search_key)
+            words = [word for key in keys for word in _WORD_SEPARATOR.split(key) if word]
+            self._word_starts.append(KEY_SEPARATOR + KEY_SEPARATOR.join(words))
+            for key in keys:
+                for gram in trigrams(key):
+                    self._trigrams.setdefault(gram, set()).add(position)
+
+    @property
+    def sources(self) -> AudioSourceList:
+        """The snapshot this index was built for."""
+        return self._sources
+
+    def search(self, query: str, limit: int) -> AudioSourceList:
+        """Return the best ``limit`` sources matching ``query``."""
+        if not normalize(query):
+            return self._sources.limit(limit)
+
+        return self.top(self.matches(query), limit)
+
+    def matches(self, query: str, within: Optional[Iterable[int]] = None) -> List[Match]:
+        """Rank every source matching ``query``.
+
+        ``within`` restricts the check to the given snapshot positions, such
+        as the matches of a query this one extends.
+        """
+        needle = normalize(query)
+        if KEY_SEPARATOR in needle:
+            return []
+        candidates = self._candidates(needle) if within is None else within
+        return list(self._ranked(candidates, needle))
+
+    def top(self, matches: Iterable[Match], limit: int) -> AudioSourceList:
+        """Select the best ``limit`` of ``matches`` without sorting them all."""
+        ranked = heapq.nsmallest(limit, matches)
+        return AudioSourceList([self._sources.sources[position] for _, position in ranked], self._sources.stale)
+
+    def _ranked(self, candidates: Iterable[int], needle: str) -> Iterator[Match]:
+        start = KEY_SEPARATOR + needle
+        keys, key_starts, word_starts = self._keys, self._key_starts, self._word_starts
+        for position in candidates:
+            key_start = key_starts[position]
+            if needle not in key_start:
+                continue
+            if needle in keys[position]:
+                yield EXACT, position
+            elif start in key_start:
+                yield PREFIX, position
+            elif start in word_starts[position]:
+                yield WORD_PREFIX, position
+            else:
+                yield SUBSTRING, position
+
+    def _candidates(self, needle: str) -> Iterable[int]:
+        if len(needle) < 3:
+            return range(len(self._keys))
+
+        postings = [self._trigrams.get(gram) for gram in trigrams(needle)]
+        if not all(postings):
+            return ()
+        postings.sort(key=len)
+        return sorted(set.intersection(*postings))
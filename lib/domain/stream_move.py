@@ -0,0 +1,122 @@
+"""Domain model for moving capture streams between sources."""
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+DEFAULT_STREAM_EXCLUSIONS = (
+    "application.id=org.PulseAudio.pavucontrol",
+    "media.name=Peak detect",
+    "stream.monitor=true",
+)
+
+
+class StreamMoveOutcome(Enum):
+    """Final state of a single stream move."""
+    MOVED = "moved"
+    FAILED = "failed"
+    TIMED_OUT = "timed_out"
+
+
+@dataclass(frozen=True)
+class StreamMoveResult:
+    """Outcome of moving one capture stream."""
+    stream_id: int
+    outcome: StreamMoveOutcome
+    latency: float = 0.0
+    error: str = ""
+
+
+@dataclass(frozen=True)
+class StreamMoveReport:
+    """Per-stream outcomes of moving all capture streams to a source."""
+    source_name: str
+    results: List[StreamMoveResult] = field(default_factory=list)
+    elapsed: float = 0.0
+    skipped: int = 0
+
+    def moved(self) -> List[StreamMoveResult]:
+        """Streams that now capture from the source."""
+        return self._with_outcome(StreamMoveOutcome.MOVED)
+
+    def failed(self) -> List[StreamMoveResult]:
+        """Streams the audio server refused to move."""
+        return self._with_outcome(StreamMoveOutcome.FAILED)
+
+    def timed_out(self) -> List[StreamMoveResult]:
+        """Streams whose move did not finish before the deadline."""
+        return self._with_outcome(StreamMoveOutcome.TIMED_OUT)
+
+    def _with_outcome(self, outcome: StreamMoveOutcome) -> List[StreamMoveResult]:
+        return [r for r in self.results if r.outcome is outcome]
+
+
+@dataclass(frozen=True)
+class SourceOutput:
+    """A capture stream and the source it currently records from."""
+    index: int
+    source_index: int
+    properties: Mapping[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class StreamExclusionPolicy:
+    """Property rules selecting capture streams that must never be moved."""
+    rules: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def from_strings(cls, entries: Iterable[str]) -> "StreamExclusionPolicy":
+        """Build a policy from ``key=value`` entries."""
+        rules = []
+        for entry in entries:
+            key, separator, value = entry.partition("=")
+            if not separator or not key.strip():
+                raise ValueError(f"Invalid stream exclusion '{entry}', expected key=value")
+            rules.append((key.strip(), value.strip()))
+        return cls(tuple(rules))
+
+    def excludes(self, output: SourceOutput) -> bool:
+        """Check if any rule matches the stream's properties."""
+        return any(output.properties.get(key) == value for key, value in self.rules)
+
+
+@dataclass(frozen=True)
+class StreamMovePlan:
+    """Capture streams split by what a switch has to do with them."""
+    to_move: List[SourceOutput]
+    already_on_target: List[SourceOutput]
+    excluded: List[SourceOutput]
+
+    def skipped(self) -> int:
+        """Number of streams left where they are."""
+        return len(self.already_on_target) + len(self.excluded)
+
+
+class StreamMovePlanner:
+    """Decides which capture streams actually need moving."""
+
+    def __init__(self, policy: Optional[StreamExclusionPolicy] = None):
+        self._policy = policy or StreamExclusionPolicy.from_strings(DEFAULT_STREAM_EXCLUSIONS)
+
+    def plan(self, outputs: Iterable[SourceOutput], target_index: Optional[int]) -> StreamMovePlan:
+        """
+        Plan the moves for a switch to the source at ``target_index``.
+        
+        When the target index is unknown every non-excluded stream is moved.
+        """
+        to_move, already_on_target, excluded = [], [], []
+        for output in outputs:
+            if self._policy.excludes(output):
+                excluded.append(output)
+            elif target_index is not None and output.source_index == target_index:
+                already_on_target.append(output)
+            else:
+                to_move.append(output)
+        return StreamMovePlan(to_move, already_on_target, excluded)
+
+
+@dataclass(frozen=True)
+class SwitchResult:
+    """Outcome of switching the default source."""
+    source_name: str
+    streams: StreamMoveReport
+    elapsed: float = 0.0
@@ -1,12 +1,43 @@
 """Infrastructure layer for audio system interactions."""
+import hashlib
 import logging
+import os
+import socket
 import subprocess
-from typing import Protocol
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Protocol, Tuple
 from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.circuit_breaker import CircuitBreaker
+from lib.domain.stream_move import (
+    SourceOutput,
+    StreamExclusionPolicy,
+    StreamMoveOutcome,
+    StreamMovePlanner,
+    StreamMoveReport,
+    StreamMoveResult,
+)
+from lib.infrastructure import pulse_protocol
+from lib.infrastructure.command_runner import CommandRunner, Deadline
+from lib.infrastructure.pactl_parser import parse_short_sources, parse_sources
+from lib.infrastructure.pulse_protocol import (
+    PulseConnection,
+    PulseProtocolError,
+    TagStructReader,
+    TagStructWriter,
+)
+from lib.infrastructure.ttl_cache import CacheStats, TtlCache
 
 logger = logging.getLogger(__name__)
 
 
+def c_locale_env() -> dict:
+    """Environment forcing untranslated pactl output, which the parsers expect."""
+    return {**os.environ, "LC_ALL": "C"}
+
+
 class AudioSystemClient(Protocol):
     """Protocol for audio system client."""
     
@@ -14,67 +45,153 @@ class AudioSystemClient(Protocol):
         """List all audio input sources."""
         ...
     
+    def get_default_source(self) -> Optional[str]:
+        """Get name of the default audio input source."""
+        ...
+    
     def set_default_source(self, source_name: str) -> None:
-        """Set default audio input source."""
+        """Set default audio input source.
+        
+        Raises:
+            RuntimeError: If the audio server did not switch
+        """
         ...
     
-    def move_streams_to_source(self, source_name: str) -> None:
+    def move_streams_to_source(self, source_name: str) -> StreamMoveReport:
         """Move all active input streams to source."""
         ...
 
 
-class PactlClient:
-    """PulseAudio/PipeWire client using pactl."""
+class ConcurrentStreamMover(ABC):
+    """Moves capture streams with one command each, in parallel, under a shared deadline.
+    
+    Subclasses set ``move_stream_timeout``, ``move_stream_workers``,
+    ``move_deadline`` and a ``_runner``, and provide the command that moves
+    a single stream.
+    """
+    
+    move_stream_timeout: float
+    move_stream_workers: int
+    move_deadline: float
+    _runner: CommandRunner
+    MOVE_OPERATION = "move-stream"
     
-    def __init__(self, timeout: float = 0.15, set_source_timeout: float = 0.5, move_stream_timeout: float = 0.5):
+    @abstractmethod
+    def _move_command(self, stream_id: int, source_name: str) -> List[str]:
+        """Command moving one stream to the source."""
+    
+    def _move_streams_concurrently(
+        self, stream_ids: List[int], source_name: str, deadline: Deadline
+    ) -> List[StreamMoveResult]:
+        workers = max(1, min(self.move_stream_workers, len(stream_ids)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="move-stream")
+        try:
+            futures = {
+                stream_id: executor.submit(self._move_stream, stream_id, source_name, deadline)
+                for stream_id in stream_ids
+            }
+            wait(futures.values(), timeout=deadline.remaining())
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = []
+        for stream_id, future in futures.items():
+            if future.done() and not future.cancelled():
+                results.append(future.result())
+            else:
+                results.append(StreamMoveResult(stream_id, StreamMoveOutcome.TIMED_OUT, self.move_deadline))
+        return results
+    
+    def _move_stream(self, stream_id: int, source_name: str, deadline: Deadline) -> StreamMoveResult:
+        started = time.monotonic()
+        if deadline.expired():
+            return StreamMoveResult(stream_id, StreamMoveOutcome.TIMED_OUT)
+        
+        try:
+            move_result = self._runner.run(
+                self._move_command(stream_id, source_name),
+                deadline,
+                cap=self._runner.budget(self.MOVE_OPERATION, self.move_stream_timeout),
+                operation=self.MOVE_OPERATION
+            )
+        except subprocess.TimeoutExpired:
+            return StreamMoveResult(stream_id, StreamMoveOutcome.TIMED_OUT, time.monotonic() - started)
+        except Exception as e:
+            return StreamMoveResult(stream_id, StreamMoveOutcome.FAILED, time.monotonic() - started, str(e))
+        
+        latency = time.monotonic() - started
+        if move_result.returncode != 0:
+            logger.debug(f"Failed to move stream {stream_id}: {move_result.stderr}")
+            return StreamMoveResult(stream_id, StreamMoveOutcome.FAILED, latency, move_result.stderr.strip())
+        return StreamMoveResult(stream_id, StreamMoveOutcome.MOVED, latency)
+
+
+class PactlClient(ConcurrentStreamMover):
+    """PulseAudio/PipeWire client using pactl.
+    
+    Latencies are recorded per pactl subcommand, so a runner with adaptive
+    timeouts replaces the fixed timeouts once it has learned enough.
+    
+    With a ``list_cache_ttl``, the source list is reused for that long and
+    for ``list_cache_grace`` seconds more while it is refreshed in the
+    background, for callers that get no change events to rely on.
+    """
+    
+    MOVE_OPERATION = "move-source-output"
+    
+    def __init__(
+        self,
+        timeout: float = 0.15,
+        set_source_timeout: float = 0.5,
+        move_stream_timeout: float = 0.5,
+        move_stream_workers: int = 4,
+        move_deadline: float = 1.5,
+        exclusion_policy: Optional[StreamExclusionPolicy] = None,
+        two_tier_listing: bool = False,
+        runner: Optional[CommandRunner] = None,
+        list_cache_ttl: float = 0.0,
+        list_cache_grace: float = 0.0,
+    ):
         self.timeout = timeout
         self.set_source_timeout = set_source_timeout
         self.move_stream_timeout = move_stream_timeout
+        self.move_stream_workers = move_stream_workers
+        self.move_deadline = move_deadline
+        self.two_tier_listing = two_tier_listing
+        self._runner = runner or CommandRunner()
+        self._planner = StreamMovePlanner(exclusion_policy)
+        self._descriptions: Dict[int, Tuple[str, str]] = {}
+        self._descriptions_lock = threading.Lock()
+        self._list_cache: Optional[TtlCache[AudioSourceList]] = None
+        if list_cache_ttl > 0:
+            self._list_cache = TtlCache(
+                self._list_sources_uncached,
+                list_cache_ttl,
+                list_cache_grace,
+                cacheable=lambda sources: not sources.is_empty(),
+            )
     
     def list_sources(self) -> AudioSourceList:
         """List audio input sources with descriptions."""
+        if self._list_cache is not None:
+            return self._list_cache.get()
+        return self._list_sources_uncached()
+    
+    def cache_stats(self) -> CacheStats:
+        """Hits, stale hits and misses of the source list cache."""
+        return self._list_cache.stats() if self._list_cache is not None else CacheStats()
+    
+    def invalidate(self) -> None:
+        """Drop the cached source list so the next listing asks pactl."""
+        if self._list_cache is not None:
+            self._list_cache.invalidate()
+    
+    def _list_sources_uncached(self) -> AudioSourceList:
         try:
-            result = subprocess.run(
-                ["timeout", str(self.timeout), "pactl", "list", "sources"],
-                capture_output=True,
-                text=True,
-                timeout=self.timeout + 0.05
-            )
-            
-            if result.returncode != 0:
-                logger.warning(f"pactl list sources failed with return code {result.returncode}: {result.stderr}")
-                return AudioSourceList([])
-            
-            if not result.stdout:
-                logger.debug("No audio sources found")
-                return AudioSourceList([])
-            
-            sources = []
-            current_source = {}
-            
-            for line in result.stdout.splitlines():
-                line = line.rstrip()
-                
-                if line.startswith("Source #"):
-                    if current_source.get("name"):
-                        sources.append(AudioSource(
-                            name=current_source["name"],
-                            index=current_source.get("index", len(sources)),
-                            description=current_source.get("description", "")
-                        ))
-                    current_source = {"index": len(sources)}
-                elif line.startswith("\tName: "):
-                    current_source["name"] = line.split("Name: ", 1)[1].strip()
-                elif line.startswith("\tDescription: "):
-                    current_source["description"] = line.split("Description: ", 1)[1].strip()
-            
-            if current_source.get("name"):
-                sources.append(AudioSource(
-                    name=current_source["name"],
-                    index=current_source.get("index", len(sources)),
-                    description=current_source.get("description", "")
-                ))
-            
+            if self.two_tier_listing:
+                sources = self._list_sources_two_tier()
+            else:
+                sources = self._list_sources_full()
             return AudioSourceList(sources).filter_monitors()
         except subprocess.TimeoutExpired:
             logger.warning("Timeout while listing audio sources")
@@ -83,60 +200,427 @@ class PactlClient:
             logger.error(f"Error listing audio sources: {e}", exc_info=True)
             return AudioSourceList([])
     
+    def invalidate_source(self, index: int) -> None:
+        """Forget the memoized description of a source that changed."""
+        with self._descriptions_lock:
+            self._descriptions.pop(index, None)
+        self.invalidate()
+    
+    def snapshot_token(self) -> Optional[bytes]:
+        """
+        Fingerprint of the current sources, for validating a saved list.
+        
+        A digest of the indices and names in the short listing, which is
+        much cheaper than the full listing with descriptions but still one
+        pactl run. Descriptions are not covered, so a saved list must only
+        be trusted for a cold start.
+        
+        Returns:
+            The token, or None if pactl did not answer
+        """
+        try:
+            output = self._run_listing("short", "sources")
+        except (subprocess.TimeoutExpired, OSError) as e:
+            logger.debug(f"Cannot fingerprint audio sources: {e}")
+            return None
+        
+        if output is None:
+            return None
+        
+        digest = hashlib.blake2b(digest_size=16)
+        for index, name in parse_short_sources(output):
+            digest.update(f"{index}\t{name}\n".encode())
+        return digest.digest()
+    
+    def _list_sources_full(self) -> List[AudioSource]:
+        output = self._run_listing("sources")
+        if output is None:
+            return []
+        return [record.to_audio_source() for record in parse_sources(output)]
+    
+    def _list_sources_two_tier(self) -> List[AudioSource]:
+        """
+        List sources from the short listing, adding memoized descriptions.
+        
+        The short listing is a line per source. pactl cannot describe a
+        single source, so when any listed index has no memoized description
+        the full listing is read once and refills the memo. With nothing
+        memoized yet, the full listing is read straight away.
+        """
+        with self._descriptions_lock:
+            cold = not self._descriptions
+        if cold:
+            return self._memoize_full_listing()
+        
+        output = self._run_listing("short", "sources")
+        if output is None:
+            return []
+        
+        listed = parse_short_sources(output)
+        with self._descriptions_lock:
+            known = self._descriptions
+            if all(known.get(index, ("",))[0] == name for index, name in listed):
+                self._descriptions = {index: known[index] for index, _ in listed}
+                return [
+                    AudioSource(name=name, index=index, description=known[index][1])
+                    for index, name in listed
+                ]
+        
+        return self._memoize_full_listing()
+    
+    def _memoize_full_listing(self) -> List[AudioSource]:
+        sources = self._list_sources_full()
+        with self._descriptions_lock:
+            self._descriptions = {s.index: (s.name, s.description) for s in sources}
+        logger.debug(f"Memoized descriptions for {len(sources)} source(s)")
+        return sources
+    
+    def _run_listing(self, *what: str) -> Optional[bytes]:
+        command = ["pactl", "list", *what]
+        operation = "-".join(command[1:])
+        result = self._runner.run(
+            command,
+            Deadline.after(self._runner.budget(operation, self.timeout)),
+            env=c_locale_env(),
+            text=False,
+            operation=operation
+        )
+        
+        if result.returncode != 0:
+            logger.warning(f"{' '.join(command)} failed with return code {result.returncode}: {result.stderr}")
+            return None
+        
+        if not result.stdout:
+            logger.debug("No audio sources found")
+            return None
+        
+        return result.stdout
+    
+    def get_default_source(self) -> Optional[str]:
+        """Get name of the default audio input source."""
+        try:
+            result = self._runner.run(
+                ["pactl", "get-default-source"],
+                Deadline.after(self._runner.budget("get-default-source", self.timeout)),
+                operation="get-default-source"
+            )
+            if result.returncode != 0:
+                logger.warning(f"pactl get-default-source failed with return code {result.returncode}: {result.stderr}")
+                return None
+            return result.stdout.strip() or None
+        except subprocess.TimeoutExpired:
+            logger.warning("Timeout while getting default source")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting default source: {e}", exc_info=True)
+            return None
+    
     def set_default_source(self, source_name: str) -> None:
-        """Set default audio input source."""
+        """
+        Set default audio input source.
+        
+        Raises:
+            RuntimeError: If pactl failed, timed out or could not be run
+        """
         try:
-            result = subprocess.run(
+            result = self._runner.run(
                 ["pactl", "set-default-source", source_name],
-                capture_output=True,
-                text=True,
-                timeout=self.set_source_timeout
+                Deadline.after(self._runner.budget("set-default-source", self.set_source_timeout)),
+                operation="set-default-source"
             )
-            if result.returncode != 0:
-                logger.warning(f"Failed to set default source '{source_name}': {result.stderr}")
         except subprocess.TimeoutExpired:
             logger.error(f"Timeout setting default source '{source_name}'")
+            raise RuntimeError("Timeout while switching audio source")
         except Exception as e:
             logger.error(f"Error setting default source '{source_name}': {e}", exc_info=True)
+            raise RuntimeError(f"Error switching audio source: {e}")
+        
+        if result.returncode != 0:
+            logger.warning(f"Failed to set default source '{source_name}': {result.stderr}")
+            raise RuntimeError(f"Failed to switch audio source: {result.stderr.strip() or 'Unknown error'}")
     
-    def move_streams_to_source(self, source_name: str) -> None:
-        """Move all active input streams to source."""
+    def move_streams_to_source(self, source_name: str) -> StreamMoveReport:
+        """
+        Move all active input streams to source.
+        
+        Only streams that are not already on the source and not excluded
+        by the exclusion policy are moved. Moves run concurrently on at most
+        ``move_stream_workers`` threads and share one ``move_deadline``
+        measured from the start of the call, or the enclosing operation's
+        deadline if that is earlier; streams not moved by then are reported
+        as timed out.
+        """
+        started = time.monotonic()
+        deadline = Deadline.after(self.move_deadline)
+        results: List[StreamMoveResult] = []
+        skipped = 0
         try:
-            result = subprocess.run(
-                ["pactl", "list", "short", "source-outputs"],
-                capture_output=True,
-                text=True,
-                timeout=self.move_stream_timeout,
-                check=False
-            )
-            
-            if result.returncode != 0:
-                logger.debug(f"No source outputs to move (return code {result.returncode})")
-                return
-            
-            if not result.stdout:
-                logger.debug("No active source outputs found")
-                return
-            
-            moved_count = 0
-            for line in result.stdout.splitlines():
-                parts = line.split("\t")
-                if parts and parts[0].strip().isdigit():
-                    stream_id = parts[0].strip()
-                    move_result = subprocess.run(
-                        ["pactl", "move-source-output", stream_id, source_name],
-                        capture_output=True,
-                        text=True,
-                        timeout=self.move_stream_timeout,
-                        check=False
-                    )
-                    if move_result.returncode == 0:
-                        moved_count += 1
-                    else:
-                        logger.debug(f"Failed to move stream {stream_id}: {move_result.stderr}")
-            
-            logger.debug(f"Moved {moved_count} stream(s) to source '{source_name}'")
+            outputs = self._list_source_outputs(deadline)
+            if outputs:
+                plan = self._planner.plan(outputs, self._resolve_source_index(source_name, deadline))
+                skipped = plan.skipped()
+                stream_ids = [output.index for output in plan.to_move]
+                if stream_ids:
+                    results = self._move_streams_concurrently(stream_ids, source_name, deadline)
         except subprocess.TimeoutExpired:
             logger.warning(f"Timeout moving streams to source '{source_name}'")
         except Exception as e:
             logger.error(f"Error moving streams to source '{source_name}': {e}", exc_info=True)
+        
+        report = StreamMoveReport(source_name, results, time.monotonic() - started, skipped)
+        logger.debug(
+            f"Moved {len(report.moved())}/{len(results)} stream(s) to source '{source_name}' "
+            f"in {report.elapsed * 1000:.1f} ms, skipped {skipped}"
+        )
+        return report
+    
+    def _list_source_outputs(self, deadline: Deadline) -> List[SourceOutput]:
+        result = self._runner.run(
+            ["pactl", "list", "source-outputs"],
+            deadline,
+            cap=self._runner.budget("list-source-outputs", self.move_stream_timeout),
+            env=c_locale_env(),
+            operation="list-source-outputs"
+        )
+        
+        if result.returncode != 0:
+            logger.debug(f"No source outputs to move (return code {result.returncode})")
+            return []
+        
+        if not result.stdout:
+            logger.debug("No active source outputs found")
+            return []
+        
+        return self._parse_source_outputs(result.stdout)
+    
+    @staticmethod
+    def _parse_source_outputs(output: str) -> List[SourceOutput]:
+        outputs = []
+        current: dict = {}
+        
+        def flush():
+            if "index" in current:
+                outputs.append(SourceOutput(
+                    index=current["index"],
+                    source_index=current.get("source", -1),
+                    properties=current.get("properties", {})
+                ))
+        
+        for line in output.splitlines():
+            if line.startswith("Source Output #"):
+                flush()
+                current = {"index": int(line[len("Source Output #"):].strip()), "properties": {}}
+            elif line.startswith("\tSource: "):
+                value = line.split("Source: ", 1)[1].strip()
+                if value.isdigit():
+                    current["source"] = int(value)
+            elif line.startswith("\t\t") and " = " in line and "properties" in current:
+                key, value = line.strip().split(" = ", 1)
+                current["properties"][key] = value.strip('"')
+        flush()
+        return outputs
+    
+    def _resolve_source_index(self, source_name: str, deadline: Deadline) -> Optional[int]:
+        result = self._runner.run(
+            ["pactl", "list", "short", "sources"],
+            deadline,
+            cap=self._runner.budget("list-short-sources", self.move_stream_timeout),
+            operation="list-short-sources"
+        )
+        if result.returncode != 0 or not result.stdout:
+            return None
+        
+        for line in result.stdout.splitlines():
+            parts = line.split("\t")
+            if len(parts) > 1 and parts[1] == source_name and parts[0].strip().isdigit():
+                return int(parts[0].strip())
+        return None
+    
+    def _move_command(self, stream_id: int, source_name: str) -> List[str]:
+        return ["pactl", "move-source-output", str(stream_id), source_name]
+
+
+class PulseNativeClient:
+    """PulseAudio/PipeWire client speaking the native protocol over a unix socket.
+
+    Keeps one authenticated connection open for the lifetime of the client,
+    so every operation is a single round trip instead of a pactl fork.
+    With a ``breaker``, requests fail at once while the server keeps timing
+    out.
+    """
+    
+    def __init__(
+        self,
+        socket_path: Optional[str] = None,
+        timeout: float = 0.3,
+        client_name: str = "mic-select",
+        exclusion_policy: Optional[StreamExclusionPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.socket_path = socket_path or pulse_protocol.default_socket_path()
+        self.timeout = timeout
+        self._breaker = breaker
+        self._planner = StreamMovePlanner(exclusion_policy)
+        self._connection: Optional[PulseConnection] = None
+        if self.socket_path:
+            self._connection = PulseConnection(self.socket_path, timeout, client_name)
+    
+    def list_sources(self) -> AudioSourceList:
+        """List audio input sources with descriptions."""
+        try:
+            reply = self._request(pulse_protocol.COMMAND_GET_SOURCE_INFO_LIST)
+            sources = []
+            while not reply.eof():
+                sources.append(self._read_source_info(reply))
+            return AudioSourceList(sources).filter_monitors()
+        except Exception as e:
+            logger.warning(f"Error listing audio sources over native protocol: {e}")
+            return AudioSourceList([])
+    
+    def get_source(self, index: int) -> Optional[AudioSource]:
+        """
+        Fetch a single source by index.
+        
+        Returns:
+            The source, or None if it no longer exists or is a monitor
+            
+        Raises:
+            PulseProtocolError, OSError: If the audio server cannot be reached
+        """
+        lookup = TagStructWriter().put_u32(index).put_string(None)
+        try:
+            reply = self._request(pulse_protocol.COMMAND_GET_SOURCE_INFO, lookup)
+        except PulseProtocolError as e:
+            if e.code is None:
+                raise
+            return None
+        
+        source = self._read_source_info(reply)
+        return None if source.is_monitor() else source
+    
+    def get_default_source(self) -> Optional[str]:
+        """Get name of the default audio input source."""
+        try:
+            reply = self._request(pulse_protocol.COMMAND_GET_SERVER_INFO)
+            reply.skip(6)
+            return reply.get_string()
+        except Exception as e:
+            logger.warning(f"Error getting default source over native protocol: {e}")
+            return None
+    
+    def set_default_source(self, source_name: str) -> None:
+        """
+        Set default audio input source.
+        
+        Raises:
+            RuntimeError: If the server refused or did not answer
+        """
+        try:
+            self._request(pulse_protocol.COMMAND_SET_DEFAULT_SOURCE, TagStructWriter().put_string(source_name))
+        except Exception as e:
+            logger.warning(f"Failed to set default source '{source_name}': {e}")
+            raise RuntimeError(f"Failed to switch audio source: {e}")
+    
+    def move_streams_to_source(self, source_name: str) -> StreamMoveReport:
+        """Move all active input streams to source in one pipelined batch."""
+        started = time.monotonic()
+        results: List[StreamMoveResult] = []
+        skipped = 0
+        try:
+            outputs, target_index = self._list_source_outputs_and_target(source_name)
+            plan = self._planner.plan(outputs, target_index)
+            skipped = plan.skipped()
+            stream_ids = [output.index for output in plan.to_move]
+            if not stream_ids:
+                logger.debug("No source outputs need moving")
+                return StreamMoveReport(source_name, [], time.monotonic() - started, skipped)
+            
+            moves = [
+                (
+                    pulse_protocol.COMMAND_MOVE_SOURCE_OUTPUT,
+                    TagStructWriter()
+                    .put_u32(stream_id)
+                    .put_u32(pulse_protocol.INVALID_INDEX)
+                    .put_string(source_name),
+                )
+                for stream_id in stream_ids
+            ]
+            batch_started = time.monotonic()
+            try:
+                replies = self._connection.request_batch(moves)
+            except OSError as e:
+                latency = time.monotonic() - batch_started
+                outcome = StreamMoveOutcome.TIMED_OUT if isinstance(e, TimeoutError) else StreamMoveOutcome.FAILED
+                results = [StreamMoveResult(stream_id, outcome, latency, str(e)) for stream_id in stream_ids]
+            else:
+                latency = time.monotonic() - batch_started
+                results = [
+                    StreamMoveResult(stream_id, StreamMoveOutcome.FAILED, latency, str(reply))
+                    if isinstance(reply, PulseProtocolError)
+                    else StreamMoveResult(stream_id, StreamMoveOutcome.MOVED, latency)
+                    for stream_id, reply in zip(stream_ids, replies)
+                ]
+            logger.debug(f"Moved {len(stream_ids)} stream(s) to source '{source_name}', skipped {skipped}")
+        except Exception as e:
+            logger.warning(f"Error moving streams to source '{source_name}': {e}")
+        return StreamMoveReport(source_name, results, time.monotonic() - started, skipped)
+    
+    def close(self) -> None:
+        """Close the connection to the audio server."""
+        if self._connection:
+            self._connection.close()
+    
+    def _list_source_outputs_and_target(self, source_name: str) -> Tuple[List[SourceOutput], Optional[int]]:
+        """Fetch stream placement and the target's index in one round trip."""
+        if not self._connection:
+            raise PulseProtocolError("No PulseAudio native socket found")
+        
+        lookup = TagStructWriter().put_u32(pulse_protocol.INVALID_INDEX).put_string(source_name)
+        outputs_reply, source_reply = self._connection.request_batch([
+            (pulse_protocol.COMMAND_GET_SOURCE_OUTPUT_INFO_LIST, None),
+            (pulse_protocol.COMMAND_GET_SOURCE_INFO, lookup),
+        ])
+        if isinstance(outputs_reply, PulseProtocolError):
+            raise outputs_reply
+        
+        outputs = []
+        while not outputs_reply.eof():
+            index = outputs_reply.get_u32()
+            outputs_reply.skip(3)
+            source_index = outputs_reply.get_u32()
+            outputs_reply.skip(6)
+            properties = outputs_reply.get_proplist()
+            outputs.append(SourceOutput(index, source_index, properties))
+        
+        target_index = None
+        if not isinstance(source_reply, PulseProtocolError):
+            target_index = source_reply.get_u32()
+        return outputs, target_index
+    
+    def _request(self, command: int, body: Optional[TagStructWriter] = None) -> TagStructReader:
+        if not self._connection:
+            raise PulseProtocolError("No PulseAudio native socket found")
+        if self._breaker is None:
+            return self._connection.request(command, body)
+        
+        if not self._breaker.allow(time.monotonic()):
+            raise TimeoutError("Skipped while the audio server is not responding")
+        try:
+            reply = self._connection.request(command, body)
+        except (TimeoutError, socket.timeout):
+            self._breaker.record_failure(time.monotonic())
+            raise
+        except PulseProtocolError as e:
+            if e.code is not None:
+                self._breaker.record_success()
+            raise
+        self._breaker.record_success()
+        return reply
+    
+    @staticmethod
+    def _read_source_info(reply: TagStructReader) -> AudioSource:
+        index = reply.get_u32()
+        name = reply.get_string() or ""
+        description = reply.get_string() or ""
+        reply.skip(pulse_protocol.SOURCE_INFO_FIELDS - 3)
+        return AudioSource(name=name, index=index, description=description)
@@ -0,0 +1,100 @@
+"""Round-trip probing of audio backends and the persisted choice between them."""
+import logging
+import subprocess
+import time
+from typing import Optional
+from lib.infrastructure.audio_service import AudioSystemClient, c_locale_env
+from lib.infrastructure.command_runner import CommandRunner, Deadline
+from lib.infrastructure.state_file import JsonStateFile, user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+PROBE_ATTEMPTS = 3
+
+
+def default_store_path() -> str:
+    """Per-user cache file, preferring the XDG cache directory."""
+    return str(user_cache_dir() / "backend.json")
+
+
+def probe_latency(client: AudioSystemClient, attempts: int = PROBE_ATTEMPTS) -> Optional[float]:
+    """
+    Best round-trip time of listing sources, in seconds.
+
+    The first call also pays for connecting or starting the tool, so the
+    best of a few calls is taken. Clients caching the list are told to drop
+    it before each call. A backend that lists no sources is treated as not
+    working, since clients report failures as an empty list.
+
+    Returns:
+        The latency, or None if the backend does not work
+    """
+    invalidate = getattr(client, "invalidate", None)
+    best = None
+    for _ in range(attempts):
+        if invalidate:
+            invalidate()
+        started = time.perf_counter()
+        sources = client.list_sources()
+        elapsed = time.perf_counter() - started
+        if sources.is_empty():
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def server_identity(runner: CommandRunner, timeout: float = 0.5) -> Optional[str]:
+    """
+    Name and version of the running audio server, as reported by `pactl info`.
+
+    Args:
+        runner: Runner to call pactl with
+        timeout: Timeout used until the runner has learned one
+
+    Returns:
+        ``"<server name> <server version>"``, or None if the server or
+        pactl is not available
+    """
+    try:
+        result = runner.run(
+            ["pactl", "info"],
+            Deadline.after(runner.budget("info", timeout)),
+            env=c_locale_env(),
+            operation="info"
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"Cannot identify audio server: {e}")
+        return None
+
+    if result.returncode != 0:
+        return None
+
+    fields = {}
+    for line in result.stdout.splitlines():
+        label, separator, value = line.partition(": ")
+        if separator:
+            fields[label.strip()] = value.strip()
+
+    name, version = fields.get("Server Name"), fields.get("Server Version")
+    if not name or not version:
+        return None
+    return f"{name} {version}"
+
+
+class BackendChoiceStore:
+    """JSON file remembering the backend picked for each audio server."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_store_path()
+        self._file = JsonStateFile(self.path)
+
+    def load(self, server: str) -> Optional[str]:
+        """Backend name chosen earlier for the server, if any."""
+        entry = self._file.read().get(server)
+        return entry.get("backend") if isinstance(entry, dict) else None
+
+    def save(self, server: str, backend: str, latency: float) -> None:
+        """Remember the backend chosen for the server; failures are only logged."""
+        choices = self._file.read()
+        choices[server] = {"backend": backend, "latency": round(latency, 6)}
+        self._file.write(choices)
@@ -0,0 +1,231 @@
+"""Running audio tool commands under a shared deadline.
+
+An operation such as a switch runs several commands one after another or in
+parallel. Each command only gets what is left of the operation's budget, so
+the operation as a whole is bounded. Commands run in their own process group,
+which is killed as a whole once the budget is gone.
+"""
+import logging
+import os
+import signal
+import subprocess
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Union
+from lib.domain.circuit_breaker import CircuitBreaker
+from lib.domain.latency import AdaptiveTimeouts
+
+logger = logging.getLogger(__name__)
+
+
+class Deadline:
+    """Point in time by which an operation must be done."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """Deadline ``seconds`` from now, never later than the enclosing operation's."""
+        deadline = cls(time.monotonic() + seconds)
+        enclosing = _operation_deadline.get()
+        if enclosing is not None and enclosing.expires_at < deadline.expires_at:
+            return enclosing
+        return deadline
+
+    def remaining(self, cap: Optional[float] = None) -> float:
+        """Seconds left, bounded by ``cap`` when given."""
+        left = max(0.0, self.expires_at - time.monotonic())
+        return left if cap is None else min(cap, left)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f})"
+
+
+_operation_deadline: ContextVar[Optional[Deadline]] = ContextVar("operation_deadline", default=None)
+
+
+@contextmanager
+def operation_deadline(seconds: float) -> Iterator[Deadline]:
+    """Bound every deadline created in the block by one shared budget."""
+    deadline = Deadline.after(seconds)
+    token = _operation_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _operation_deadline.reset(token)
+
+
+class CircuitOpenError(subprocess.TimeoutExpired):
+    """A command was not started because the audio server keeps timing out.
+
+    It is a ``TimeoutExpired``, so callers handle it like the timeout it
+    stands in for, only without waiting for it.
+    """
+
+    def __init__(self, cmd: List[str]):
+        super().__init__(cmd, 0)
+
+    def __str__(self) -> str:
+        return f"Command '{self.cmd}' skipped while the audio server is not responding"
+
+
+@dataclass(frozen=True)
+class CommandResult:
+    """Output of a finished command, with where its time went."""
+    args: List[str]
+    returncode: int
+    stdout: Union[str, bytes]
+    stderr: Union[str, bytes]
+    spawn_time: float = 0.0
+    wait_time: float = 0.0
+
+
+class CommandRunner:
+    """Runs commands with a timeout taken from a deadline.
+
+    With ``timeouts``, the latency of every named operation is recorded and
+    ``budget`` hands out timeouts learned from it. ``on_observed`` is called
+    after each recorded sample, e.g. to persist them now and then.
+
+    With a ``breaker``, every command that times out counts against it, and
+    while it is open commands fail at once instead of waiting out their
+    timeout.
+    """
+
+    TERMINATE_GRACE = 0.05
+
+    def __init__(
+        self,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+        on_observed: Optional[Callable[[], None]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.timeouts = timeouts
+        self.breaker = breaker
+        self._on_observed = on_observed
+
+    def budget(self, operation: str, default: float) -> float:
+        """Timeout for the next ``operation``: learned if possible, ``default`` otherwise."""
+        if self.timeouts is None:
+            return default
+        return self.timeouts.timeout(operation, default)
+
+    def run(
+        self,
+        args: List[str],
+        deadline: Deadline,
+        cap: Optional[float] = None,
+        env: Optional[dict] = None,
+        text: bool = True,
+        operation: Optional[str] = None,
+    ) -> CommandResult:
+        """
+        Run a command to completion within the deadline.
+
+        Args:
+            args: Command and arguments
+            deadline: Deadline of the operation the command is part of
+            cap: Longest this command may take, even if more budget is left
+            env: Environment of the command, inherited if None
+            text: Decode output as text rather than returning bytes
+            operation: Name under which to record the command's latency
+
+        Raises:
+            subprocess.TimeoutExpired: If the budget ran out; the command's
+                process group has been killed by then
+            CircuitOpenError: If the breaker is open; nothing was started
+            OSError: If the command cannot be started
+        """
+        timeout = deadline.remaining(cap)
+        full_budget = self._has_full_budget(deadline, cap, timeout)
+        if timeout <= 0:
+            raise subprocess.TimeoutExpired(args, 0)
+        if self.breaker is not None and not self.breaker.allow(time.monotonic()):
+            raise CircuitOpenError(args)
+
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            text=text,
+            start_new_session=True,
+        )
+        spawned = time.perf_counter()
+
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._kill_group(process)
+            logger.debug(f"{args[0]} killed after {(time.perf_counter() - spawned) * 1000:.1f} ms")
+            if full_budget:
+                self._observe(operation, timeout)
+                self._record(timed_out=True)
+            raise subprocess.TimeoutExpired(args, timeout) from None
+        except BaseException:
+            self._kill_group(process)
+            raise
+
+        result = CommandResult(
+            args, process.returncode, stdout, stderr, spawned - started, time.perf_counter() - spawned
+        )
+        logger.debug(
+            f"{args[0]}: spawn {result.spawn_time * 1000:.1f} ms, wait {result.wait_time * 1000:.1f} ms"
+        )
+        self._observe(operation, result.spawn_time + result.wait_time)
+        self._record(timed_out=False)
+        return result
+
+    @staticmethod
+    def _has_full_budget(deadline: Deadline, cap: Optional[float], timeout: float) -> bool:
+        """Whether the command got its own budget rather than what an operation had left.
+
+        A command cut short by its operation's deadline says little about
+        how long the command takes or whether the server is answering.
+        """
+        if cap is not None:
+            return timeout >= cap
+        return deadline is not _operation_deadline.get()
+
+    def _record(self, timed_out: bool) -> None:
+        if self.breaker is None:
+            return
+
+        if timed_out:
+            self.breaker.record_failure(time.monotonic())
+        else:
+            self.breaker.record_success()
+
+    def _observe(self, operation: Optional[str], seconds: float) -> None:
+        if operation is None or self.timeouts is None:
+            return
+
+        self.timeouts.observe(operation, seconds)
+        if self._on_observed:
+            self._on_observed()
+
+    def _kill_group(self, process: subprocess.Popen) -> None:
+        """Terminate the command and anything it started, then reap it."""
+        self._signal_group(process, signal.SIGTERM)
+        try:
+            process.communicate(timeout=self.TERMINATE_GRACE)
+        except subprocess.TimeoutExpired:
+            self._signal_group(process, signal.SIGKILL)
+            process.communicate()
+
+    @staticmethod
+    def _signal_group(process: subprocess.Popen, sig: int) -> None:
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            pass
@@ -0,0 +1,333 @@
+"""Audio device change monitoring via pactl subscribe."""
+import logging
+import os
+import random
+import re
+import selectors
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional
+from lib.domain.device_event import CacheFreshness, DeviceEvent, DeviceEventType, DeviceFacility
+from lib.domain.event_coalescer import EventCoalescer
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceChangeNotifier:
+    def __init__(self, callback: Optional[Callable[[List[DeviceEvent]], None]] = None):
+        self._callback = callback
+
+    def notify(self, events: List[DeviceEvent]):
+        if not self._callback:
+            return
+
+        self._callback(events)
+
+
+class PactlSubscribeReader:
+    """Runs `pactl subscribe` and reads its output without blocking."""
+
+    COMMAND = ["pactl", "subscribe"]
+    READ_SIZE = 4096
+    TERMINATE_TIMEOUT = 0.5
+
+    def __init__(self):
+        self._process: Optional[subprocess.Popen] = None
+        self._buffer = b""
+
+    def start(self):
+        self._buffer = b""
+        self._process = subprocess.Popen(
+            self.COMMAND,
+            env={**os.environ, "LC_ALL": "C"},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        os.set_blocking(self._process.stdout.fileno(), False)
+
+    def fileno(self) -> int:
+        return self._process.stdout.fileno()
+
+    def read_chunk(self) -> Optional[bytes]:
+        """Read the output available now; None once the stream has ended."""
+        try:
+            chunk = os.read(self.fileno(), self.READ_SIZE)
+        except BlockingIOError:
+            return b""
+        return chunk or None
+
+    def read_lines(self) -> Optional[List[str]]:
+        """Read the complete lines available now; None once the stream has ended."""
+        chunk = self.read_chunk()
+        if chunk is None:
+            return None
+
+        *lines, self._buffer = (self._buffer + chunk).split(b"\n")
+        return [line.decode("utf-8", "replace") for line in lines]
+
+    def terminate(self):
+        """Stop the child process and reap it."""
+        process, self._process = self._process, None
+        if not process:
+            return
+
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=self.TERMINATE_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        process.stdout.close()
+
+
+class PactlEventParser:
+    """Parses `pactl subscribe` lines such as ``Event 'remove' on source #57``."""
+
+    INVALID_INDEX = 0xFFFFFFFF
+    _PATTERN = re.compile(r"^Event '([a-z]+)' on ([a-z-]+)(?: #(\d+))?\s*$")
+
+    def parse(self, line: str) -> Optional[DeviceEvent]:
+        match = self._PATTERN.match(line.strip())
+        if not match:
+            return None
+
+        try:
+            event_type = DeviceEventType(match.group(1))
+            facility = DeviceFacility(match.group(2))
+        except ValueError:
+            return None
+
+        index = int(match.group(3)) if match.group(3) else None
+        if index == self.INVALID_INDEX:
+            index = None
+
+        return DeviceEvent(event_type, facility, index)
+
+
+class ReconnectBackoff:
+    """Exponential reconnect delays with full jitter."""
+
+    def __init__(
+        self,
+        base: float = 0.5,
+        cap: float = 30.0,
+        rand: Callable[[], float] = random.random,
+    ):
+        self._base = base
+        self._cap = cap
+        self._rand = rand
+        self._attempts = 0
+
+    def next_delay(self) -> float:
+        ceiling = min(self._cap, self._base * (2 ** self._attempts))
+        self._attempts += 1
+        return ceiling * self._rand()
+
+    def reset(self):
+        self._attempts = 0
+
+
+class PulseAudioDeviceMonitor:
+    """Keeps a `pactl subscribe` stream alive and forwards source events.
+
+    A single thread runs a ``selectors`` loop over the subscription pipe
+    and a wake-up pipe, with the coalescing flush and the reconnect
+    backoff as timers; when nothing is pending it sleeps without a
+    timeout. Events are merged by an ``EventCoalescer`` and handed to the
+    notifier in batches.
+
+    When the subscription ends (audio server restart, crash, session
+    hiccup) it is restarted after a jittered exponential backoff, and the
+    ``resync`` callback is run after every (re)connect because events
+    emitted while disconnected are lost. ``freshness`` tells consumers
+    whether data built from the event stream can be trusted, and every
+    change of it is passed to ``on_freshness``.
+    """
+
+    STABLE_AFTER = 5.0
+
+    def __init__(
+        self,
+        notifier: DeviceChangeNotifier,
+        reader: PactlSubscribeReader,
+        parser: PactlEventParser,
+        resync: Optional[Callable[[], None]] = None,
+        backoff: Optional[ReconnectBackoff] = None,
+        coalescer: Optional[EventCoalescer] = None,
+        clock: Callable[[], float] = time.monotonic,
+        on_freshness: Optional[Callable[[CacheFreshness], None]] = None,
+    ):
+        self._notifier = notifier
+        self._reader = reader
+        self._parser = parser
+        self._resync = resync
+        self._backoff = backoff or ReconnectBackoff()
+        self._coalescer = coalescer or EventCoalescer()
+        self._clock = clock
+        self._on_freshness = on_freshness
+        self._monitor_thread: Optional[threading.Thread] = None
+        self._wake_fds: Optional[tuple] = None
+        self._running = False
+        self._freshness = CacheFreshness.DEGRADED
+
+        self._connected = False
+        self._connected_at = 0.0
+        self._received = False
+        self._reconnect_at: Optional[float] = None
+
+    @property
+    def freshness(self) -> CacheFreshness:
+        return self._freshness
+
+    def _set_freshness(self, freshness: CacheFreshness):
+        if freshness is self._freshness:
+            return
+
+        self._freshness = freshness
+        if self._on_freshness:
+            try:
+                self._on_freshness(freshness)
+            except Exception as e:
+                logger.warning(f"Error handling freshness change: {e}")
+
+    def start(self):
+        if self._running:
+            return
+
+        self._running = True
+        self._wake_fds = os.pipe()
+        for fd in self._wake_fds:
+            os.set_blocking(fd, False)
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._monitor_thread.start()
+        logger.debug("PulseAudio device monitor started")
+
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+        self._wake()
+        self._monitor_thread.join()
+        for fd in self._wake_fds:
+            os.close(fd)
+        self._wake_fds = None
+        logger.debug("PulseAudio device monitor stopped")
+
+    def _wake(self):
+        try:
+            os.write(self._wake_fds[1], b"\0")
+        except BlockingIOError:
+            pass
+
+    def _monitor_loop(self):
+        self._reconnect_at = self._clock()
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._wake_fds[0], selectors.EVENT_READ)
+            try:
+                while self._running:
+                    self._run_timers(selector)
+                    for key, _ in selector.select(self._select_timeout()):
+                        if key.fd == self._wake_fds[0]:
+                            self._drain_wake_pipe()
+                        else:
+                            self._read_subscription(selector)
+            finally:
+                if self._connected:
+                    self._disconnect(selector)
+
+    def _select_timeout(self) -> Optional[float]:
+        timers = [self._coalescer.due_at()]
+        if not self._connected:
+            timers.append(self._reconnect_at)
+        timers = [t for t in timers if t is not None]
+        if not timers:
+            return None
+        return max(0.0, min(timers) - self._clock())
+
+    def _run_timers(self, selector: selectors.BaseSelector):
+        now = self._clock()
+        if not self._connected and self._reconnect_at is not None and now >= self._reconnect_at:
+            self._connect(selector)
+
+        events = self._coalescer.flush(self._clock())
+        if events:
+            logger.debug(f"Flushing {len(events)} coalesced device event(s)")
+            try:
+                self._notifier.notify(events)
+            except Exception as e:
+                logger.warning(f"Error handling device events: {e}")
+
+    def _connect(self, selector: selectors.BaseSelector):
+        self._reconnect_at = None
+        try:
+            self._reader.start()
+        except Exception as e:
+            logger.warning(f"Failed to monitor devices: {e}")
+            self._schedule_reconnect()
+            return
+
+        self._connected = True
+        self._connected_at = self._clock()
+        self._received = False
+        selector.register(self._reader.fileno(), selectors.EVENT_READ)
+
+        self._set_freshness(CacheFreshness.RESYNCING)
+        if self._resync:
+            try:
+                self._resync()
+            except Exception as e:
+                logger.warning(f"Device resync failed: {e}")
+                self._disconnect(selector)
+                self._schedule_reconnect()
+                return
+
+        self._set_freshness(CacheFreshness.LIVE)
+
+    def _disconnect(self, selector: selectors.BaseSelector):
+        selector.unregister(self._reader.fileno())
+        self._reader.terminate()
+        self._connected = False
+        self._set_freshness(CacheFreshness.DEGRADED)
+
+    def _schedule_reconnect(self):
+        self._set_freshness(CacheFreshness.DEGRADED)
+        delay = self._backoff.next_delay()
+        self._reconnect_at = self._clock() + delay
+        logger.info(f"Device subscription ended, reconnecting in {delay:.2f}s")
+
+    def _read_subscription(self, selector: selectors.BaseSelector):
+        try:
+            lines = self._reader.read_lines()
+        except Exception as e:
+            logger.warning(f"Error reading pactl subscribe: {e}")
+            lines = None
+
+        if lines is None:
+            if self._received or self._clock() - self._connected_at >= self.STABLE_AFTER:
+                self._backoff.reset()
+            self._disconnect(selector)
+            self._schedule_reconnect()
+            return
+
+        self._received = self._received or bool(lines)
+        for line in lines:
+            self._process_monitor_line(line)
+
+    def _drain_wake_pipe(self):
+        try:
+            while os.read(self._wake_fds[0], 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _process_monitor_line(self, line: str):
+        event = self._parser.parse(line)
+        if not event or not event.affects_sources():
+            return
+
+        logger.debug(f"Device event detected: {event}")
+        self._coalescer.add(event, self._clock())
@@ -0,0 +1,68 @@
+"""Persistence of learned audio server latencies across runs."""
+import logging
+import socket
+import threading
+from typing import Optional
+from lib.domain.latency import BUCKET_BASE, BUCKET_RATIO, AdaptiveTimeouts
+from lib.infrastructure.state_file import JsonStateFile, user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+SAVE_EVERY = 32
+
+
+def default_latency_path() -> str:
+    return str(user_cache_dir() / "latency.json")
+
+
+class LatencyStore:
+    """Keeps the latency histograms of each host in one cache file.
+
+    Saved histograms are only reused with the bucket layout they were
+    recorded in.
+    """
+
+    def __init__(self, path: Optional[str] = None, host: Optional[str] = None):
+        self.path = path or default_latency_path()
+        self.host = host or socket.gethostname()
+        self._file = JsonStateFile(self.path)
+        self._lock = threading.Lock()
+
+    def load(self, timeouts: AdaptiveTimeouts) -> None:
+        """Restore what was learned on this host earlier."""
+        entry = self._file.read().get(self.host)
+        if not isinstance(entry, dict) or entry.get("buckets") != self._layout():
+            return
+
+        operations = entry.get("operations")
+        if not isinstance(operations, dict):
+            return
+        try:
+            timeouts.load({
+                str(operation): [int(bucket) for bucket in buckets]
+                for operation, buckets in operations.items()
+            })
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed latency state in {self.path}: {e}")
+
+    def save(self, timeouts: AdaptiveTimeouts) -> None:
+        """Write this host's histograms, keeping other hosts' entries."""
+        with self._lock:
+            state = self._file.read()
+            state[self.host] = {"buckets": self._layout(), "operations": timeouts.to_dict()}
+            if self._file.write(state):
+                timeouts.mark_saved()
+
+    def save_if_due(self, timeouts: AdaptiveTimeouts) -> None:
+        """Save once enough new samples have been recorded."""
+        if timeouts.unsaved >= SAVE_EVERY:
+            self.save(timeouts)
+
+    def flush(self, timeouts: AdaptiveTimeouts) -> None:
+        """Save any samples not written yet."""
+        if timeouts.unsaved:
+            self.save(timeouts)
+
+    @staticmethod
+    def _layout() -> list:
+        return [BUCKET_BASE, BUCKET_RATIO]
@@ -4,17 +4,26 @@ import shutil
 from typing import Optional
 from pathlib import Path
 from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.stream_move import StreamMoveReport
 from lib.infrastructure.audio_router_daemon import AudioRouterDaemon
+from lib.infrastructure.command_runner import CommandRunner, Deadline
 
 logger = logging.getLogger(__name__)
 
 
 class MacOSAudioClient:
     
-    def __init__(self, timeout: float = 0.5, set_source_timeout: float = 1.0, use_virtual_routing: bool = False):
+    def __init__(
+        self,
+        timeout: float = 0.5,
+        set_source_timeout: float = 1.0,
+        use_virtual_routing: bool = False,
+        runner: Optional[CommandRunner] = None,
+    ):
         self.timeout = timeout
         self.set_source_timeout = set_source_timeout
         self.use_virtual_routing = use_virtual_routing
+        self._runner = runner or CommandRunner()
         self._switch_audio_source_path = self._find_switch_audio_source()
         self._daemon: Optional[AudioRouterDaemon] = None
         
@@ -41,11 +50,10 @@ class MacOSAudioClient:
     
     def list_sources(self) -> AudioSourceList:
         try:
-            result = subprocess.run(
+            result = self._runner.run(
                 [self._switch_audio_source_path, "-a", "-t", "input"],
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
+                Deadline.after(self._runner.budget("list-sources", self.timeout)),
+                operation="list-sources"
             )
             
             if result.returncode != 0:
@@ -72,13 +80,34 @@ class MacOSAudioClient:
             logger.error(f"Error listing audio sources: {e}", exc_info=True)
             return AudioSourceList([])
     
+    def get_default_source(self) -> Optional[str]:
+        try:
+            result = self._runner.run(
+                [self._switch_audio_source_path, "-c", "-t", "input"],
+                Deadline.after(self._runner.budget("get-default-source", self.timeout)),
+                operation="get-default-source"
+            )
+            
+            if result.returncode != 0:
+                logger.warning(
+                    f"SwitchAudioSource current failed with return code {result.returncode}: {result.stderr}"
+                )
+                return None
+            
+            return result.stdout.strip() or None
+        except subprocess.TimeoutExpired:
+            logger.warning("Timeout while getting current audio source")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting current audio source: {e}", exc_info=True)
+            return None
+    
     def set_default_source(self, source_name: str) -> None:
         try:
-            result = subprocess.run(
+            result = self._runner.run(
                 [self._switch_audio_source_path, "-s", source_name, "-t", "input"],
-                capture_output=True,
-                text=True,
-                timeout=self.set_source_timeout
+                Deadline.after(self._runner.budget("set-default-source", self.set_source_timeout)),
+                operation="set-default-source"
             )
             
             if result.returncode != 0:
@@ -97,10 +126,11 @@ class MacOSAudioClient:
             logger.error(f"Error setting default source '{source_name}': {e}", exc_info=True)
             raise RuntimeError(f"Error switching audio source: {e}")
     
-    def move_streams_to_source(self, source_name: str) -> None:
+    def move_streams_to_source(self, source_name: str) -> StreamMoveReport:
         if self.use_virtual_routing and self._daemon:
             try:
                 self._daemon.switch_source(source_name)
                 logger.info(f"Routed {source_name} to virtual device")
             except Exception as e:
                 logger.error(f"Failed to route audio: {e}")
+        return StreamMoveReport(source_name)
@@ -0,0 +1,154 @@
+"""Parsers for `pactl list sources` and `pactl list short sources` output.
+
+Only the block offsets and the fields every caller needs (index, name,
+description) are extracted up front. Everything else in a block is parsed
+the first time it is asked for. Output is expected in the C locale; run
+pactl with ``LC_ALL=C`` so the field labels are not translated.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from lib.domain.audio_source import AudioSource
+
+_HEADER = b"Source #"
+_NEXT_HEADER = b"\n" + _HEADER
+
+
+def _decode(view: memoryview) -> str:
+    return str(view, "utf-8", "replace").strip()
+
+
+class PactlSourceRecord:
+    """One `Source #N` block of `pactl list sources` output."""
+
+    __slots__ = ("index", "name", "description", "_view", "_start", "_end", "_text")
+
+    def __init__(self, index: int, name: str, description: str, view: memoryview, start: int, end: int):
+        self.index = index
+        self.name = name
+        self.description = description
+        self._view = view
+        self._start = start
+        self._end = end
+        self._text: Optional[str] = None
+
+    def to_audio_source(self) -> AudioSource:
+        return AudioSource(name=self.name, index=self.index, description=self.description)
+
+    def field(self, label: str) -> Optional[str]:
+        """Value of a top-level ``<label>: <value>`` line, if present."""
+        prefix = f"\t{label}: "
+        for line in self._lines():
+            if line.startswith(prefix):
+                return line[len(prefix):].strip()
+        return None
+
+    @property
+    def state(self) -> Optional[str]:
+        return self.field("State")
+
+    @property
+    def sample_spec(self) -> Optional[str]:
+        return self.field("Sample Specification")
+
+    @property
+    def active_port(self) -> Optional[str]:
+        return self.field("Active Port")
+
+    @property
+    def properties(self) -> Dict[str, str]:
+        """The ``key = "value"`` entries of the Properties section."""
+        properties = {}
+        for line in self._section("Properties"):
+            key, separator, value = line.partition(" = ")
+            if separator:
+                properties[key.strip()] = value.strip().strip('"')
+        return properties
+
+    @property
+    def ports(self) -> Dict[str, str]:
+        """Port names mapped to their descriptions."""
+        ports = {}
+        for line in self._section("Ports"):
+            name, separator, description = line.partition(": ")
+            if separator:
+                ports[name.strip()] = description.partition(" (")[0].strip()
+        return ports
+
+    def _lines(self) -> List[str]:
+        if self._text is None:
+            self._text = str(self._view[self._start:self._end], "utf-8", "replace")
+        return self._text.split("\n")
+
+    def _section(self, label: str) -> List[str]:
+        lines = self._lines()
+        try:
+            start = lines.index(f"\t{label}:") + 1
+        except ValueError:
+            return []
+
+        section = []
+        for line in lines[start:]:
+            if not line.startswith("\t\t"):
+                break
+            section.append(line[2:])
+        return section
+
+
+def _find_field(data: bytes, view: memoryview, label: bytes, start: int, end: int) -> Optional[str]:
+    marker = b"\n\t" + label + b": "
+    position = data.find(marker, start, end)
+    if position == -1:
+        return None
+
+    value_start = position + len(marker)
+    value_end = data.find(b"\n", value_start, end)
+    return _decode(view[value_start:end if value_end == -1 else value_end])
+
+
+def parse_sources(output: Union[bytes, str]) -> List[PactlSourceRecord]:
+    """Split `pactl list sources` output into source records.
+
+    Accepts text as well as bytes so callers holding decoded output can use
+    it too. Blocks without a Name line are skipped; a header whose number
+    cannot be read falls back to the block's position.
+    """
+    data = output.encode("utf-8") if isinstance(output, str) else bytes(output)
+    view = memoryview(data)
+    records: List[PactlSourceRecord] = []
+
+    start = 0 if data.startswith(_HEADER) else data.find(_NEXT_HEADER)
+    if start > 0:
+        start += 1
+
+    while start != -1:
+        following = data.find(_NEXT_HEADER, start)
+        end = len(data) if following == -1 else following + 1
+
+        header_end = data.find(b"\n", start, end)
+        number = data[start + len(_HEADER):end if header_end == -1 else header_end].strip()
+
+        name = _find_field(data, view, b"Name", start, end)
+        if name:
+            records.append(PactlSourceRecord(
+                index=int(number) if number.isdigit() else len(records),
+                name=name,
+                description=_find_field(data, view, b"Description", start, end) or "",
+                view=view,
+                start=start,
+                end=end,
+            ))
+
+        start = -1 if following == -1 else following + 1
+
+    return records
+
+
+def parse_short_sources(output: Union[bytes, str]) -> List[Tuple[int, str]]:
+    """Index and name of every source in `pactl list short sources` output."""
+    data = output.encode("utf-8") if isinstance(output, str) else output
+    sources = []
+    for line in data.split(b"\n"):
+        index, _, rest = line.partition(b"\t")
+        name = rest.partition(b"\t")[0]
+        if index.strip().isdigit() and name:
+            sources.append((int(index), name.decode("utf-8", "replace")))
+    return sources
@@ -0,0 +1,410 @@
+"""PipeWire client reading whole-graph snapshots from `pw-dump`.
+
+One `pw-dump` call returns every object of the PipeWire graph as a JSON
+array: nodes (sources and capture streams), the links between them and the
+``default`` metadata holding the default source. The source list, the
+default source and the placement of every capture stream are therefore
+taken from one consistent snapshot instead of several pactl calls.
+"""
+import codecs
+import json
+import logging
+import re
+import subprocess
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+from lib.domain.stream_move import (
+    SourceOutput,
+    StreamExclusionPolicy,
+    StreamMovePlanner,
+    StreamMoveReport,
+    StreamMoveResult,
+)
+from lib.infrastructure.audio_service import ConcurrentStreamMover
+from lib.infrastructure.command_runner import CommandRunner, Deadline
+from lib.infrastructure.device_monitor import PactlSubscribeReader
+
+logger = logging.getLogger(__name__)
+
+NODE = "PipeWire:Interface:Node"
+LINK = "PipeWire:Interface:Link"
+METADATA = "PipeWire:Interface:Metadata"
+
+SOURCE_CLASS = "Audio/Source"
+CAPTURE_STREAM_CLASS = "Stream/Input/Audio"
+DEFAULT_METADATA = "default"
+DEFAULT_SOURCE_KEY = "default.audio.source"
+CONFIGURED_SOURCE_KEY = "default.configured.audio.source"
+
+_STRUCTURE = re.compile(r'["\\\[\]{}]')
+_CONTENT = re.compile(r"\S")
+
+
+def _props(obj: Dict[str, Any]) -> Dict[str, Any]:
+    info = obj.get("info") or {}
+    return info.get("props") or obj.get("props") or {}
+
+
+def _media_class(obj: Dict[str, Any]) -> str:
+    return str(_props(obj).get("media.class", ""))
+
+
+def _is_source(obj: Dict[str, Any]) -> bool:
+    return obj.get("type") == NODE and _media_class(obj).startswith(SOURCE_CLASS)
+
+
+def _is_default_metadata(obj: Dict[str, Any]) -> bool:
+    return obj.get("type") == METADATA and _props(obj).get("metadata.name") == DEFAULT_METADATA
+
+
+def _property_string(value: Any) -> str:
+    # Match the strings pactl shows, e.g. ``true`` rather than ``True``.
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def _metadata_name(value: Any) -> Optional[str]:
+    """Node name held by a ``{"name": ...}`` metadata value, which may still be JSON text."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value or None
+    if isinstance(value, dict):
+        return value.get("name") or None
+    return None
+
+
+class PipeWireSnapshot:
+    """Sources, default source and capture streams of one `pw-dump` snapshot."""
+
+    def __init__(self, objects: Iterable[Dict[str, Any]]):
+        self.sources: List[AudioSource] = []
+        self.default_source: Optional[str] = None
+        self.source_outputs: List[SourceOutput] = []
+
+        streams: List[Dict[str, Any]] = []
+        links: Dict[int, List[int]] = {}
+        for obj in objects:
+            if not isinstance(obj, dict) or not obj.get("info") and obj.get("metadata") is None:
+                continue
+
+            if _is_source(obj):
+                props = _props(obj)
+                name = props.get("node.name")
+                if name:
+                    self.sources.append(AudioSource(
+                        name=name,
+                        index=obj["id"],
+                        description=props.get("node.description") or props.get("node.nick") or "",
+                    ))
+            elif obj.get("type") == NODE and _media_class(obj) == CAPTURE_STREAM_CLASS:
+                streams.append(obj)
+            elif obj.get("type") == LINK:
+                info = obj["info"]
+                links.setdefault(info.get("input-node-id"), []).append(info.get("output-node-id"))
+            elif _is_default_metadata(obj):
+                self.default_source = self._default_from(obj.get("metadata") or [])
+
+        source_ids = {source.index for source in self.sources}
+        for stream in streams:
+            # A stream is linked once per channel; any link from a source tells where it records.
+            linked = [node for node in links.get(stream["id"], []) if node in source_ids]
+            self.source_outputs.append(SourceOutput(
+                index=stream["id"],
+                source_index=linked[0] if linked else -1,
+                properties={key: _property_string(value) for key, value in _props(stream).items()},
+            ))
+
+    @classmethod
+    def parse(cls, output: Union[bytes, str]) -> "PipeWireSnapshot":
+        """Build a snapshot from `pw-dump` output."""
+        objects = json.loads(output) if output.strip() else []
+        if not isinstance(objects, list):
+            raise ValueError("pw-dump output is not a JSON array")
+        return cls(objects)
+
+    def source_index(self, name: str) -> Optional[int]:
+        """Node id of the source with the given name, if it is in the snapshot."""
+        for source in self.sources:
+            if source.name == name:
+                return source.index
+        return None
+
+    @staticmethod
+    def _default_from(entries: List[Dict[str, Any]]) -> Optional[str]:
+        for entry in entries:
+            if entry.get("subject") == 0 and entry.get("key") == DEFAULT_SOURCE_KEY:
+                return _metadata_name(entry.get("value"))
+        return None
+
+
+class PipeWireDumpClient(ConcurrentStreamMover):
+    """PipeWire client using `pw-dump` snapshots and `pw-metadata`.
+
+    Streams are moved by setting their ``target.object`` metadata, which the
+    session manager acts on by relinking them.
+    """
+
+    MOVE_OPERATION = "set-target-object"
+
+    def __init__(
+        self,
+        timeout: float = 0.3,
+        set_source_timeout: float = 0.5,
+        move_stream_timeout: float = 0.5,
+        move_stream_workers: int = 4,
+        move_deadline: float = 1.5,
+        exclusion_policy: Optional[StreamExclusionPolicy] = None,
+        runner: Optional[CommandRunner] = None,
+    ):
+        self.timeout = timeout
+        self.set_source_timeout = set_source_timeout
+        self.move_stream_timeout = move_stream_timeout
+        self.move_stream_workers = move_stream_workers
+        self.move_deadline = move_deadline
+        self._runner = runner or CommandRunner()
+        self._planner = StreamMovePlanner(exclusion_policy)
+
+    def snapshot(self, deadline: Optional[Deadline] = None, cap: Optional[float] = None) -> Optional[PipeWireSnapshot]:
+        """Take a snapshot of the graph; None if pw-dump fails."""
+        result = self._runner.run(
+            ["pw-dump", "--no-colors"],
+            deadline or Deadline.after(self._runner.budget("pw-dump", self.timeout)),
+            cap=cap,
+            text=False,
+            operation="pw-dump"
+        )
+
+        if result.returncode != 0:
+            logger.warning(f"pw-dump failed with return code {result.returncode}: {result.stderr}")
+            return None
+
+        return PipeWireSnapshot.parse(result.stdout)
+
+    def list_sources(self) -> AudioSourceList:
+        """List audio input sources with descriptions."""
+        try:
+            snapshot = self.snapshot()
+            if snapshot is None:
+                return AudioSourceList([])
+            return AudioSourceList(snapshot.sources).filter_monitors()
+        except subprocess.TimeoutExpired:
+            logger.warning("Timeout while listing audio sources")
+            return AudioSourceList([])
+        except Exception as e:
+            logger.error(f"Error listing audio sources: {e}", exc_info=True)
+            return AudioSourceList([])
+
+    def get_default_source(self) -> Optional[str]:
+        """Get name of the default audio input source."""
+        try:
+            snapshot = self.snapshot()
+            return snapshot.default_source if snapshot else None
+        except subprocess.TimeoutExpired:
+            logger.warning("Timeout while getting default source")
+            return None
+        except Exception as e:
+            logger.error(f"Error getting default source: {e}", exc_info=True)
+            return None
+
+    def set_default_source(self, source_name: str) -> None:
+        """
+        Set default audio input source.
+
+        Raises:
+            RuntimeError: If pw-metadata failed, timed out or could not be run
+        """
+        try:
+            result = self._runner.run(
+                [
+                    "pw-metadata", "-n", DEFAULT_METADATA, "0", CONFIGURED_SOURCE_KEY,
+                    json.dumps({"name": source_name}), "Spa:String:JSON",
+                ],
+                Deadline.after(self._runner.budget("set-default-source", self.set_source_timeout)),
+                operation="set-default-source"
+            )
+        except subprocess.TimeoutExpired:
+            logger.error(f"Timeout setting default source '{source_name}'")
+            raise RuntimeError("Timeout while switching audio source")
+        except Exception as e:
+            logger.error(f"Error setting default source '{source_name}': {e}", exc_info=True)
+            raise RuntimeError(f"Error switching audio source: {e}")
+
+        if result.returncode != 0:
+            logger.warning(f"Failed to set default source '{source_name}': {result.stderr}")
+            raise RuntimeError(f"Failed to switch audio source: {result.stderr.strip() or 'Unknown error'}")
+
+    def move_streams_to_source(self, source_name: str) -> StreamMoveReport:
+        """
+        Move all active input streams to source.
+
+        Stream placement and the target's node id come from a single
+        snapshot. Planning, exclusions and the shared deadline are the same
+        as for ``PactlClient``.
+        """
+        started = time.monotonic()
+        deadline = Deadline.after(self.move_deadline)
+        results: List[StreamMoveResult] = []
+        skipped = 0
+        try:
+            snapshot = self.snapshot(deadline, cap=self._runner.budget("pw-dump", self.move_stream_timeout))
+            if snapshot and snapshot.source_outputs:
+                plan = self._planner.plan(snapshot.source_outputs, snapshot.source_index(source_name))
+                skipped = plan.skipped()
+                stream_ids = [output.index for output in plan.to_move]
+                if stream_ids:
+                    results = self._move_streams_concurrently(stream_ids, source_name, deadline)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Timeout moving streams to source '{source_name}'")
+        except Exception as e:
+            logger.error(f"Error moving streams to source '{source_name}': {e}", exc_info=True)
+
+        report = StreamMoveReport(source_name, results, time.monotonic() - started, skipped)
+        logger.debug(
+            f"Moved {len(report.moved())}/{len(results)} stream(s) to source '{source_name}' "
+            f"in {report.elapsed * 1000:.1f} ms, skipped {skipped}"
+        )
+        return report
+
+    def _move_command(self, stream_id: int, source_name: str) -> List[str]:
+        return ["pw-metadata", str(stream_id), "target.object", source_name]
+
+
+class PwDumpMonitorReader(PactlSubscribeReader):
+    """Runs `pw-dump --monitor` and reads its JSON arrays without blocking.
+
+    pw-dump prints the whole graph first, then an array of the objects that
+    changed after every update. Each object of a completed array is returned
+    as one line of compact JSON, so the reader can stand in for
+    ``PactlSubscribeReader`` in the device monitor.
+    """
+
+    COMMAND = ["pw-dump", "--monitor", "--no-colors"]
+
+    def __init__(self):
+        super().__init__()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")("replace")
+        self._reset()
+
+    def start(self):
+        self._reset()
+        self._utf8.reset()
+        super().start()
+
+    def read_lines(self) -> Optional[List[str]]:
+        """Read the objects of the arrays completed so far; None once the stream has ended."""
+        chunk = self.read_chunk()
+        if chunk is None:
+            return None
+
+        self._text += self._utf8.decode(chunk)
+        lines = []
+        while True:
+            end = self._document_end()
+            if end is None:
+                break
+            document_text, self._text, self._scan = self._text[:end], self._text[end:], 0
+            try:
+                document = json.loads(document_text)
+            except ValueError:
+                logger.debug("Skipping malformed pw-dump output")
+                continue
+
+            objects = document if isinstance(document, list) else [document]
+            lines.extend(json.dumps(obj, separators=(",", ":")) for obj in objects)
+        return lines
+
+    def _reset(self) -> None:
+        self._text = ""
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+
+    def _document_end(self) -> Optional[int]:
+        """Index just past the first complete top-level document, if there is one.
+
+        Only text not scanned by an earlier call is looked at, so a large
+        dump arriving in many chunks is scanned once rather than decoded
+        again on every chunk.
+        """
+        text = self._text
+        position = self._scan
+        while True:
+            if self._depth == 0:
+                first = _CONTENT.search(text, position)
+                if first is None:
+                    self._text, self._scan = "", 0
+                    return None
+                position = first.start()
+                if text[position] not in "[{":
+                    # Not JSON at all; skip to the next array so one bad line cannot wedge the feed.
+                    logger.debug("Skipping unexpected pw-dump output")
+                    next_array = text.find("\n[", position)
+                    self._text = text = "" if next_array == -1 else text[next_array + 1:]
+                    position = 0
+                    continue
+
+            token = _STRUCTURE.search(text, position)
+            if token is None:
+                self._scan = max(position, len(text))
+                return None
+            position = token.end()
+            character = token.group()
+            if self._in_string:
+                if character == "\\":
+                    position += 1
+                elif character == '"':
+                    self._in_string = False
+            elif character == '"':
+                self._in_string = True
+            elif character in "[{":
+                self._depth += 1
+            elif character in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return position
+
+
+class PwDumpEventParser:
+    """Turns objects from `pw-dump --monitor` into device events.
+
+    Updates carry the full object, removals only its id with ``info`` set to
+    null, so the parser remembers which ids are sources and which is the
+    default metadata.
+    """
+
+    def __init__(self):
+        self._facilities: Dict[int, DeviceFacility] = {}
+
+    def parse(self, line: str) -> Optional[DeviceEvent]:
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            return None
+        if not isinstance(obj, dict) or not isinstance(obj.get("id"), int):
+            return None
+
+        object_id = obj["id"]
+        if obj.get("info") is None and obj.get("metadata") is None:
+            facility = self._facilities.pop(object_id, None)
+            return DeviceEvent(DeviceEventType.REMOVE, facility, object_id) if facility else None
+
+        facility = self._facility_of(obj) or self._facilities.get(object_id)
+        if facility is None:
+            return None
+
+        event_type = DeviceEventType.CHANGE if object_id in self._facilities else DeviceEventType.NEW
+        self._facilities[object_id] = facility
+        if facility is DeviceFacility.SERVER:
+            return DeviceEvent(DeviceEventType.CHANGE, facility)
+        return DeviceEvent(event_type, facility, object_id)
+
+    @staticmethod
+    def _facility_of(obj: Dict[str, Any]) -> Optional[DeviceFacility]:
+        if _is_source(obj):
+            return DeviceFacility.SOURCE
+        if _is_default_metadata(obj):
+            return DeviceFacility.SERVER
+        return None
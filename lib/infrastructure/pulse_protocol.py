@@ -0,0 +1,436 @@
+"""Minimal PulseAudio native protocol codec and connection.
+
+Implements the subset of the wire protocol spoken by PulseAudio and by
+PipeWire's pipewire-pulse that mic-select needs: packet framing, the tagged
+"tagstruct" payload encoding, authentication and plain request/reply
+commands. No audio data is ever exchanged, so shared memory and stream
+channels are not supported.
+"""
+import logging
+import os
+import socket
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSION = 13
+INVALID_INDEX = 0xFFFFFFFF
+COMMAND_CHANNEL = 0xFFFFFFFF
+COOKIE_LENGTH = 256
+DESCRIPTOR = struct.Struct("!5I")
+MAX_PACKET_SIZE = 16 * 1024 * 1024
+
+COMMAND_ERROR = 0
+COMMAND_REPLY = 2
+COMMAND_AUTH = 8
+COMMAND_SET_CLIENT_NAME = 9
+COMMAND_GET_SERVER_INFO = 20
+COMMAND_GET_SOURCE_INFO = 23
+COMMAND_GET_SOURCE_INFO_LIST = 24
+COMMAND_GET_SOURCE_OUTPUT_INFO_LIST = 32
+COMMAND_SET_DEFAULT_SOURCE = 45
+COMMAND_MOVE_SOURCE_OUTPUT = 68
+
+TAG_STRING = b"t"
+TAG_STRING_NULL = b"N"
+TAG_U32 = b"L"
+TAG_U8 = b"B"
+TAG_U64 = b"R"
+TAG_S64 = b"r"
+TAG_SAMPLE_SPEC = b"a"
+TAG_ARBITRARY = b"x"
+TAG_BOOLEAN_TRUE = b"1"
+TAG_BOOLEAN_FALSE = b"0"
+TAG_TIMEVAL = b"T"
+TAG_USEC = b"U"
+TAG_CHANNEL_MAP = b"m"
+TAG_CVOLUME = b"v"
+TAG_PROPLIST = b"P"
+TAG_VOLUME = b"V"
+TAG_FORMAT_INFO = b"f"
+
+SOURCE_INFO_FIELDS = 15
+SOURCE_OUTPUT_INFO_FIELDS = 12
+
+
+class PulseProtocolError(Exception):
+    """Raised when the server rejects a request or the stream is malformed."""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+class TagStructWriter:
+    """Builds a tagstruct payload."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def put_u32(self, value: int) -> "TagStructWriter":
+        self._parts.append(TAG_U32 + struct.pack("!I", value))
+        return self
+
+    def put_u8(self, value: int) -> "TagStructWriter":
+        self._parts.append(TAG_U8 + struct.pack("!B", value))
+        return self
+
+    def put_usec(self, value: int) -> "TagStructWriter":
+        self._parts.append(TAG_USEC + struct.pack("!Q", value))
+        return self
+
+    def put_boolean(self, value: bool) -> "TagStructWriter":
+        self._parts.append(TAG_BOOLEAN_TRUE if value else TAG_BOOLEAN_FALSE)
+        return self
+
+    def put_string(self, value: Optional[str]) -> "TagStructWriter":
+        if value is None:
+            self._parts.append(TAG_STRING_NULL)
+        else:
+            self._parts.append(TAG_STRING + value.encode("utf-8") + b"\0")
+        return self
+
+    def put_arbitrary(self, value: bytes) -> "TagStructWriter":
+        self._parts.append(TAG_ARBITRARY + struct.pack("!I", len(value)) + value)
+        return self
+
+    def put_sample_spec(self, fmt: int, channels: int, rate: int) -> "TagStructWriter":
+        self._parts.append(TAG_SAMPLE_SPEC + struct.pack("!BBI", fmt, channels, rate))
+        return self
+
+    def put_channel_map(self, positions: Iterable[int]) -> "TagStructWriter":
+        positions = bytes(positions)
+        self._parts.append(TAG_CHANNEL_MAP + struct.pack("!B", len(positions)) + positions)
+        return self
+
+    def put_cvolume(self, volumes: Iterable[int]) -> "TagStructWriter":
+        volumes = list(volumes)
+        self._parts.append(
+            TAG_CVOLUME + struct.pack(f"!B{len(volumes)}I", len(volumes), *volumes)
+        )
+        return self
+
+    def put_proplist(self, properties: Dict[str, str]) -> "TagStructWriter":
+        self._parts.append(TAG_PROPLIST)
+        for key, value in properties.items():
+            raw = value.encode("utf-8") + b"\0"
+            self.put_string(key)
+            self.put_u32(len(raw))
+            self.put_arbitrary(raw)
+        self.put_string(None)
+        return self
+
+    def to_bytes(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class TagStructReader:
+    """Decodes a tagstruct payload value by value."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def eof(self) -> bool:
+        return self._pos >= len(self._data)
+
+    def get(self) -> Any:
+        """Read the next value, whatever its type."""
+        tag = self._take(1)
+
+        if tag == TAG_STRING:
+            end = self._data.find(b"\0", self._pos)
+            if end < 0:
+                raise PulseProtocolError("Unterminated string in tagstruct")
+            value = self._data[self._pos:end].decode("utf-8", errors="replace")
+            self._pos = end + 1
+            return value
+        if tag == TAG_STRING_NULL:
+            return None
+        if tag == TAG_U32 or tag == TAG_VOLUME:
+            return self._unpack("!I")
+        if tag == TAG_U8:
+            return self._unpack("!B")
+        if tag == TAG_U64 or tag == TAG_USEC:
+            return self._unpack("!Q")
+        if tag == TAG_S64:
+            return self._unpack("!q")
+        if tag == TAG_BOOLEAN_TRUE:
+            return True
+        if tag == TAG_BOOLEAN_FALSE:
+            return False
+        if tag == TAG_SAMPLE_SPEC:
+            return struct.unpack("!BBI", self._take(6))
+        if tag == TAG_ARBITRARY:
+            return self._take(self._unpack("!I"))
+        if tag == TAG_TIMEVAL:
+            return struct.unpack("!II", self._take(8))
+        if tag == TAG_CHANNEL_MAP:
+            return tuple(self._take(self._unpack("!B")))
+        if tag == TAG_CVOLUME:
+            channels = self._unpack("!B")
+            return struct.unpack(f"!{channels}I", self._take(4 * channels))
+        if tag == TAG_PROPLIST:
+            return self._read_proplist()
+        if tag == TAG_FORMAT_INFO:
+            return self.get(), self.get()
+
+        raise PulseProtocolError(f"Unknown tagstruct tag {tag!r}")
+
+    def get_u32(self) -> int:
+        return self._expect(int)
+
+    def get_string(self) -> Optional[str]:
+        value = self.get()
+        if value is not None and not isinstance(value, str):
+            raise PulseProtocolError(f"Expected string, got {type(value).__name__}")
+        return value
+
+    def get_proplist(self) -> Dict[str, str]:
+        return self._expect(dict)
+
+    def skip(self, count: int) -> None:
+        for _ in range(count):
+            self.get()
+
+    def _read_proplist(self) -> Dict[str, str]:
+        properties = {}
+        while True:
+            key = self.get_string()
+            if key is None:
+                return properties
+            self.get_u32()
+            raw = self.get()
+            properties[key] = raw.rstrip(b"\0").decode("utf-8", errors="replace")
+
+    def _expect(self, kind: type) -> Any:
+        value = self.get()
+        if not isinstance(value, kind) or isinstance(value, bool):
+            raise PulseProtocolError(f"Expected {kind.__name__}, got {type(value).__name__}")
+        return value
+
+    def _unpack(self, fmt: str) -> int:
+        return struct.unpack(fmt, self._take(struct.calcsize(fmt)))[0]
+
+    def _take(self, size: int) -> bytes:
+        if self._pos + size > len(self._data):
+            raise PulseProtocolError("Truncated tagstruct")
+        chunk = self._data[self._pos:self._pos + size]
+        self._pos += size
+        return chunk
+
+
+def encode_packet(payload: bytes) -> bytes:
+    """Frame a tagstruct payload as a control-channel packet."""
+    return DESCRIPTOR.pack(len(payload), COMMAND_CHANNEL, 0, 0, 0) + payload
+
+
+def encode_command(command: int, tag: int, body: Optional[TagStructWriter] = None) -> bytes:
+    """Encode a command packet with its request tag."""
+    header = TagStructWriter().put_u32(command).put_u32(tag).to_bytes()
+    return encode_packet(header + (body.to_bytes() if body else b""))
+
+
+def recv_packet(sock: socket.socket) -> bytes:
+    """Read one control-channel packet and return its payload."""
+    length, channel, _, _, _ = DESCRIPTOR.unpack(_recv_exactly(sock, DESCRIPTOR.size))
+    if length > MAX_PACKET_SIZE:
+        raise PulseProtocolError(f"Packet of {length} bytes exceeds limit")
+    payload = _recv_exactly(sock, length)
+    if channel != COMMAND_CHANNEL:
+        raise PulseProtocolError(f"Unexpected data on channel {channel}")
+    return payload
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(remaining)
+        if not chunk:
+            raise ConnectionError("Connection closed by audio server")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def default_socket_path() -> Optional[str]:
+    """Locate the native protocol socket of the running audio server."""
+    server = os.environ.get("PULSE_SERVER", "")
+    for entry in server.split():
+        if entry.startswith("unix:"):
+            return entry[len("unix:"):]
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or f"/run/user/{os.getuid()}"
+    path = Path(runtime_dir) / "pulse" / "native"
+    return str(path) if path.exists() else None
+
+
+def load_cookie() -> bytes:
+    """Read the authentication cookie, or return an all-zero one.
+
+    PipeWire ignores the cookie and PulseAudio accepts the peer credentials
+    sent alongside it, so a missing cookie file is not an error.
+    """
+    candidates = [
+        os.environ.get("PULSE_COOKIE"),
+        str(Path.home() / ".config" / "pulse" / "cookie"),
+        str(Path.home() / ".pulse-cookie"),
+    ]
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            cookie = Path(candidate).read_bytes()
+        except OSError:
+            continue
+        if len(cookie) == COOKIE_LENGTH:
+            return cookie
+    return bytes(COOKIE_LENGTH)
+
+
+class PulseConnection:
+    """Persistent authenticated connection to the audio server."""
+
+    def __init__(self, socket_path: str, timeout: float, client_name: str = "mic-select"):
+        self._socket_path = socket_path
+        self._timeout = timeout
+        self._client_name = client_name
+        self._sock: Optional[socket.socket] = None
+        self._next_tag = 0
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def request(self, command: int, body: Optional[TagStructWriter] = None) -> TagStructReader:
+        """Send one command and wait for its reply."""
+        return self.request_many([(command, body)])[0]
+
+    def request_many(
+        self, requests: List[Tuple[int, Optional[TagStructWriter]]]
+    ) -> List[TagStructReader]:
+        """Pipeline several commands and collect the replies in order.
+
+        All requests are written before any reply is read, so the batch
+        costs a single round trip. A server error on any request raises
+        after the remaining replies have been drained.
+        """
+        replies = self.request_batch(requests)
+        for reply in replies:
+            if isinstance(reply, PulseProtocolError):
+                raise reply
+        return replies
+
+    def request_batch(
+        self, requests: List[Tuple[int, Optional[TagStructWriter]]]
+    ) -> List[Union[TagStructReader, PulseProtocolError]]:
+        """Pipeline several commands and return each reply or server error.
+
+        Transport failures still raise, since they leave every reply in
+        the batch unknown.
+        """
+        with self._lock:
+            try:
+                self._ensure_connected()
+                return self._exchange(requests)
+            except (OSError, ConnectionError, PulseProtocolError):
+                self._close_locked()
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _ensure_connected(self) -> None:
+        if self._sock is not None:
+            return
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._socket_path)
+            self._sock = sock
+            self._authenticate()
+        except BaseException:
+            self._close_locked()
+            raise
+
+    def _authenticate(self) -> None:
+        tag = self._take_tag()
+        auth = TagStructWriter().put_u32(PROTOCOL_VERSION).put_arbitrary(load_cookie())
+        self._send_with_credentials(encode_command(COMMAND_AUTH, tag, auth))
+        reply = self._read_reply(tag)
+        self.version = min(PROTOCOL_VERSION, reply.get_u32() & 0xFFFF)
+        if self.version < PROTOCOL_VERSION:
+            raise PulseProtocolError(f"Audio server protocol {self.version} is too old")
+
+        name = TagStructWriter().put_proplist({"application.name": self._client_name})
+        self._exchange([(COMMAND_SET_CLIENT_NAME, name)])
+        logger.debug(f"Connected to audio server at {self._socket_path} (protocol {self.version})")
+
+    def _exchange(
+        self, requests: List[Tuple[int, Optional[TagStructWriter]]]
+    ) -> List[Union[TagStructReader, PulseProtocolError]]:
+        tags = []
+        packets = []
+        for command, body in requests:
+            tag = self._take_tag()
+            tags.append(tag)
+            packets.append(encode_command(command, tag, body))
+        self._sock.sendall(b"".join(packets))
+
+        replies: List[Union[TagStructReader, PulseProtocolError]] = []
+        for tag in tags:
+            try:
+                replies.append(self._read_reply(tag))
+            except PulseProtocolError as e:
+                if e.code is None:
+                    raise
+                replies.append(e)
+        return replies
+
+    def _read_reply(self, tag: int) -> TagStructReader:
+        while True:
+            reader = TagStructReader(recv_packet(self._sock))
+            command = reader.get_u32()
+            reply_tag = reader.get_u32()
+            if reply_tag != tag:
+                logger.debug(f"Ignoring packet {command} with tag {reply_tag}")
+                continue
+            if command == COMMAND_REPLY:
+                return reader
+            if command == COMMAND_ERROR:
+                code = reader.get_u32()
+                raise PulseProtocolError(f"Audio server returned error {code}", code)
+            raise PulseProtocolError(f"Unexpected reply command {command}")
+
+    def _send_with_credentials(self, packet: bytes) -> None:
+        if not hasattr(socket, "SCM_CREDENTIALS"):
+            self._sock.sendall(packet)
+            return
+
+        credentials = struct.pack("3i", os.getpid(), os.getuid(), os.getgid())
+        sent = self._sock.sendmsg(
+            [packet], [(socket.SOL_SOCKET, socket.SCM_CREDENTIALS, credentials)]
+        )
+        if sent < len(packet):
+            self._sock.sendall(packet[sent:])
+
+    def _take_tag(self) -> int:
+        tag = self._next_tag
+        self._next_tag = (self._next_tag + 1) & 0x7FFFFFFF
+        return tag
+
+    def _close_locked(self) -> None:
+        if self._sock is None:
+            return
+        try:
+            self._sock.close()
+        finally:
+            self._sock = None
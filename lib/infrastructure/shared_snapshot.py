@@ -0,0 +1,319 @@
+"""Source snapshot published through a memory-mapped file.
+
+One process owning a source cache publishes the current list and default
+source; any number of short-lived readers map the file and decode straight
+from it, without asking the audio server or the owner anything.
+
+Layout, little-endian::
+
+    header   magic "MSM2" | flags u32 | sequence u64 | generation u64
+             | default length u16 | body length u32 | stale u8 | pad
+             | owner pid u32
+    default  default source name, UTF-8
+    body     source snapshot as written by source_snapshot, with no token
+
+The sequence is a seqlock: the publisher makes it odd before changing
+anything and even again once done, and a reader only trusts what it read
+between two equal, even values. The generation counts publishes, so a
+reader holding the mapping decodes only when something changed.
+
+A publisher that needs more room, or takes over from another one, writes a
+new file and marks the old one retired; readers then map the new one. A
+publisher that dies without closing its file leaves the owner pid behind,
+and readers stop trusting the file once that process is gone. While that
+process is alive and has not closed the file, no other process takes it
+over, so each file has a single writer.
+
+The live flag is set while device events keep the owner's list current.
+Without it the list is only as recent as the owner's last fetch, and
+readers that need a current answer ask the owner instead.
+"""
+import logging
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+from lib.domain.audio_source import AudioSourceList
+from lib.infrastructure.source_snapshot import decode_snapshot, encode_snapshot
+from lib.infrastructure.state_file import user_runtime_dir
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MSM2"
+HEADER = struct.Struct("<4sIQQHIB1xI")
+FLAGS = struct.Struct("<I")
+SEQUENCE = struct.Struct("<Q")
+STATE = struct.Struct("<QHIB")
+OWNER = struct.Struct("<I")
+FLAGS_OFFSET = 4
+SEQUENCE_OFFSET = 8
+STATE_OFFSET = 16
+OWNER_OFFSET = HEADER.size - OWNER.size
+FLAG_CLOSED = 1
+FLAG_RETIRED = 2
+FLAG_LIVE = 4
+MIN_SIZE = 64 * 1024
+
+Published = Tuple[AudioSourceList, Optional[str]]
+
+
+def default_shared_snapshot_path() -> str:
+    return str(user_runtime_dir() / "sources.shm")
+
+
+class SharedSnapshotPublisher:
+    """Writes snapshots for readers in other processes; one per file."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_shared_snapshot_path()
+        self._mmap: Optional[mmap.mmap] = None
+        self._sequence = 0
+        self._generation = 0
+        self._live = False
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def set_live(self, live: bool) -> None:
+        """Tell readers whether device events keep the published list current."""
+        with self._lock:
+            self._live = live
+            if self._mmap is None:
+                return
+            if live:
+                self._set_flag(self._mmap, FLAG_LIVE)
+            else:
+                self._clear_flag(self._mmap, FLAG_LIVE)
+
+    def publish(self, sources: AudioSourceList, default_source: Optional[str]) -> None:
+        """Make the sources and default source visible to readers; failures are only logged."""
+        try:
+            default = (default_source or "").encode()
+            body = encode_snapshot(sources, b"")
+            if len(default) > 0xFFFF:
+                raise ValueError("Default source name is too long")
+        except ValueError as e:
+            logger.warning(f"Cannot publish source snapshot: {e}")
+            return
+
+        size = HEADER.size + len(default) + len(body)
+        with self._lock:
+            try:
+                if self._mmap is None or size > len(self._mmap):
+                    self._map(size)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot map shared snapshot {self.path}: {e}")
+                return
+
+            self._generation += 1
+            self._write_sequence(self._sequence + 1)
+            self._mmap[HEADER.size:size] = default + body
+            STATE.pack_into(self._mmap, STATE_OFFSET, self._generation, len(default), len(body), sources.stale)
+            self._write_sequence(self._sequence + 1)
+
+    def close(self) -> None:
+        """Tell readers nothing is published any more."""
+        with self._lock:
+            if self._mmap is None:
+                return
+            self._set_flag(self._mmap, FLAG_CLOSED)
+            self._mmap.close()
+            self._mmap = None
+
+    def _write_sequence(self, sequence: int) -> None:
+        self._sequence = sequence
+        SEQUENCE.pack_into(self._mmap, SEQUENCE_OFFSET, sequence)
+
+    def _map(self, size: int) -> None:
+        """Start a new file large enough for ``size`` bytes and retire the old one."""
+        capacity = MIN_SIZE
+        while capacity < size:
+            capacity *= 2
+
+        path = Path(self.path)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(partial, "w+b") as f:
+            f.truncate(capacity)
+            mapped = mmap.mmap(f.fileno(), capacity)
+        HEADER.pack_into(
+            mapped, 0, MAGIC, FLAG_LIVE if self._live else 0, self._sequence, self._generation, 0, 0, False, os.getpid()
+        )
+
+        previous = self._mmap
+        if previous is None:
+            try:
+                self._retire_existing()
+            except OSError:
+                mapped.close()
+                os.unlink(partial)
+                raise
+        os.replace(partial, path)
+        if previous is not None:
+            self._set_flag(previous, FLAG_RETIRED)
+            previous.close()
+        self._mmap = mapped
+
+    def _retire_existing(self) -> None:
+        """Point readers of a file left by an earlier publisher at ours.
+
+        Raises:
+            FileExistsError: If another running process still publishes it
+        """
+        try:
+            with open(self.path, "r+b") as f:
+                existing = mmap.mmap(f.fileno(), 0)
+        except (OSError, ValueError):
+            return
+        try:
+            if len(existing) < HEADER.size or existing[:len(MAGIC)] != MAGIC:
+                return
+            flags, = FLAGS.unpack_from(existing, FLAGS_OFFSET)
+            owner, = OWNER.unpack_from(existing, OWNER_OFFSET)
+            if not flags & FLAG_CLOSED and owner != os.getpid() and _process_alive(owner):
+                raise FileExistsError(f"{self.path} is published by process {owner}")
+            self._set_flag(existing, FLAG_RETIRED)
+        finally:
+            existing.close()
+
+    @staticmethod
+    def _set_flag(mapped: mmap.mmap, flag: int) -> None:
+        flags, = FLAGS.unpack_from(mapped, FLAGS_OFFSET)
+        FLAGS.pack_into(mapped, FLAGS_OFFSET, flags | flag)
+
+    @staticmethod
+    def _clear_flag(mapped: mmap.mmap, flag: int) -> None:
+        flags, = FLAGS.unpack_from(mapped, FLAGS_OFFSET)
+        FLAGS.pack_into(mapped, FLAGS_OFFSET, flags & ~flag)
+
+
+class _Retired(Exception):
+    pass
+
+
+def _process_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedSnapshotReader:
+    """Reads the published snapshot from a mapping kept open between reads.
+
+    Reads answer from the mapping alone, decoding only when the generation
+    changed. ``list_sources()`` and ``get_default_source()`` let it stand in
+    for an audio client in the listing and current-source use cases.
+    ``live`` tells whether the publisher's list was kept current by device
+    events at the last successful read.
+    """
+
+    RETRIES = 1000
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_shared_snapshot_path()
+        self._mmap: Optional[mmap.mmap] = None
+        self._generation: Optional[int] = None
+        self._published: Optional[Published] = None
+        self._live = False
+
+    @property
+    def live(self) -> bool:
+        return self._live
+
+    def read(self) -> Optional[Published]:
+        """
+        The published sources and default source.
+
+        Returns:
+            The snapshot, or None if nothing is published, the publisher
+            has closed it or it could not be read consistently
+        """
+        for _ in range(2):
+            if self._mmap is None and not self._open():
+                return None
+            try:
+                return self._read(self._mmap)
+            except _Retired:
+                self.close()
+        return None
+
+    def list_sources(self) -> AudioSourceList:
+        published = self.read()
+        return published[0] if published else AudioSourceList([])
+
+    def get_default_source(self) -> Optional[str]:
+        published = self.read()
+        return published[1] if published else None
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._generation = None
+        self._published = None
+        self._live = False
+
+    def _open(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if len(self._mmap) < HEADER.size or self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            return False
+        return True
+
+    def _read(self, mapped: mmap.mmap) -> Optional[Published]:
+        for _ in range(self.RETRIES):
+            _, flags, sequence, generation, default_length, body_length, stale, owner = HEADER.unpack_from(mapped)
+            if flags & FLAG_RETIRED:
+                raise _Retired()
+            if flags & FLAG_CLOSED or generation == 0 or not _process_alive(owner):
+                return None
+            if sequence & 1:
+                continue
+
+            published = self._published if generation == self._generation else None
+            if published is None:
+                published = self._decode(mapped, default_length, body_length, stale)
+            if SEQUENCE.unpack_from(mapped, SEQUENCE_OFFSET)[0] != sequence or published is None:
+                continue
+
+            self._generation, self._published = generation, published
+            self._live = bool(flags & FLAG_LIVE)
+            return published
+
+        logger.debug(f"Shared snapshot {self.path} kept changing while being read")
+        return None
+
+    @staticmethod
+    def _decode(mapped: mmap.mmap, default_length: int, body_length: int, stale: int) -> Optional[Published]:
+        start = HEADER.size
+        end = start + default_length + body_length
+        if end > len(mapped):
+            return None
+
+        view = memoryview(mapped)
+        try:
+            default = str(view[start:start + default_length], "utf-8")
+            sources = decode_snapshot(view[start + default_length:end], b"")
+        except UnicodeDecodeError:
+            return None
+        finally:
+            view.release()
+        if sources is None:
+            return None
+        if stale:
+            sources = sources.as_stale()
+        return sources, default or None
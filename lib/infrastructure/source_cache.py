@@ -0,0 +1,366 @@
+"""In-memory source list cache fed by device change events."""
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.circuit_breaker import CircuitBreaker
+from lib.domain.device_event import CacheFreshness, DeviceEvent, DeviceEventType, DeviceFacility
+from lib.domain.stream_move import StreamMoveReport
+from lib.infrastructure.audio_service import AudioSystemClient
+from lib.infrastructure.shared_snapshot import SharedSnapshotPublisher
+from lib.infrastructure.source_snapshot import SourceSnapshotFile
+from lib.infrastructure.ttl_cache import PendingFetch
+
+logger = logging.getLogger(__name__)
+
+
+class SourceCache:
+    """Audio client that serves the source list from an in-memory snapshot.
+
+    The snapshot is fetched once and only ever replaced as a whole, so
+    readers never take a lock and never observe a half-updated list.
+    Audio server events update it incrementally through ``apply_event()``.
+    Switching operations are delegated to the wrapped client unchanged.
+
+    Clients that implement ``get_source(index)`` let additions and changes
+    be fetched one source at a time; for others they trigger a full relist.
+    Clients that memoize per-source details are told which sources changed
+    through ``invalidate_source(index)``.
+
+    With the ``breaker`` guarding the client's calls, a listing that fails
+    while the server is timing out is answered with the last good list,
+    marked stale, and a background thread keeps retrying until the server
+    answers again.
+
+    Clients that implement ``snapshot_token()`` can have the first fetch go
+    through the ``snapshot_file`` shared with other runs: a saved list whose
+    token still matches is used instead of a full listing, and otherwise the
+    full listing is saved under the token taken before it. The token does
+    not cover descriptions, so later fetches never use the file, and
+    refreshes and source events discard it.
+
+    With a publisher attached through ``attach_publisher()``, every new
+    snapshot and default source is published for readers in other
+    processes, and so is whether device events keep them current, as
+    reported through ``set_freshness()``.
+    """
+
+    RECOVERY_INTERVAL = 0.25
+
+    def __init__(
+        self,
+        audio_client: AudioSystemClient,
+        breaker: Optional[CircuitBreaker] = None,
+        snapshot_file: Optional[SourceSnapshotFile] = None,
+    ):
+        self._audio_client = audio_client
+        self._breaker = breaker
+        self._snapshot_file = snapshot_file
+        self._publisher: Optional[SharedSnapshotPublisher] = None
+        self._install_listeners: List[Callable[[AudioSourceList], None]] = []
+        self._snapshot: Optional[AudioSourceList] = None
+        self._last_good: Optional[AudioSourceList] = None
+        self._recovery: Optional[threading.Thread] = None
+        self._default_source: Optional[str] = None
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
+        self._inflight_lock = threading.Lock()
+        self._inflight: Optional[PendingFetch] = None
+        self._resynced = False
+        self._live = False
+
+    @property
+    def generation(self) -> int:
+        """Number of snapshots swapped in so far."""
+        return self._generation
+
+    def list_sources(self) -> AudioSourceList:
+        """Return the cached snapshot, fetching it on first use."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        return self.fetch()
+
+    def prewarm(self) -> None:
+        """Start fetching the source list in the background.
+
+        Readers arriving while the fetch runs wait for it instead of
+        starting their own.
+        """
+        if self._snapshot is not None or self._inflight is not None:
+            return
+
+        threading.Thread(target=self._prewarm, daemon=True).start()
+
+    def _prewarm(self) -> None:
+        try:
+            self.fetch()
+        except Exception as e:
+            logger.warning(f"Prewarming the source cache failed: {e}")
+
+    def fetch(self) -> AudioSourceList:
+        """Fetch a fresh source list, joining a fetch already in flight."""
+        with self._inflight_lock:
+            pending = self._inflight
+            joined = pending is not None
+            if not joined:
+                pending = self._inflight = PendingFetch()
+
+        if joined:
+            return pending.wait()
+        return self._complete(pending, use_saved=True)
+
+    def refresh(self) -> AudioSourceList:
+        """Fetch the source list from the audio server and swap it in.
+
+        Unlike ``fetch()`` this always starts a new request, for callers
+        that know the server state changed after any fetch in flight began.
+        Clients caching the list themselves are told to drop it through
+        ``invalidate()``.
+
+        Empty results are returned but not cached: the audio client reports
+        failures as an empty list, and pinning that until the next device
+        event would hide every microphone. If the breaker saw the server
+        time out, the last good list is served as stale instead.
+        """
+        invalidate = getattr(self._audio_client, "invalidate", None)
+        if invalidate:
+            invalidate()
+        self._discard_saved()
+        with self._inflight_lock:
+            pending = self._inflight = PendingFetch()
+        return self._complete(pending, use_saved=False)
+
+    def resync(self) -> AudioSourceList:
+        """Bring the list up to date after the device event feed (re)connects.
+
+        The first connect follows the startup fetch, so it joins that fetch,
+        or keeps its result, instead of listing a second time. Later
+        reconnects may have missed events and always ``refresh()``.
+        """
+        if self._resynced:
+            return self.refresh()
+
+        self._resynced = True
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        return self.fetch()
+
+    def _complete(self, pending: PendingFetch, use_saved: bool) -> AudioSourceList:
+        try:
+            with self._refresh_lock:
+                sources = self._list_sources(use_saved and self._generation == 0)
+                if sources.is_empty() and self._server_failing() and self._last_good is not None:
+                    sources = self._last_good.as_stale()
+                    self._start_recovery()
+                self._install(sources)
+        except BaseException as e:
+            pending.fail(e)
+            raise
+        else:
+            pending.resolve(sources)
+        finally:
+            with self._inflight_lock:
+                if self._inflight is pending:
+                    self._inflight = None
+
+        logger.debug(f"Source cache refreshed with {len(sources.sources)} source(s)")
+        return sources
+
+    def _list_sources(self, use_saved: bool) -> AudioSourceList:
+        snapshot_token = getattr(self._audio_client, "snapshot_token", None)
+        token = snapshot_token() if use_saved and self._snapshot_file and snapshot_token else None
+        if token is None:
+            return self._audio_client.list_sources()
+
+        saved = self._snapshot_file.load(token)
+        if saved is not None:
+            logger.debug(f"Using saved snapshot of {len(saved.sources)} source(s)")
+            return saved
+
+        sources = self._audio_client.list_sources()
+        if not sources.is_empty():
+            self._snapshot_file.save(sources, token)
+        return sources
+
+    def _discard_saved(self) -> None:
+        if self._snapshot_file is not None:
+            self._snapshot_file.discard()
+
+    def _server_failing(self) -> bool:
+        return self._breaker is not None and not self._breaker.healthy
+
+    def on_install(self, listener: Callable[[AudioSourceList], None]) -> None:
+        """Call ``listener`` with every new snapshot as it is swapped in.
+
+        Listeners run on the fetching thread, so work such as building a
+        search index starts before the next query instead of in it.
+        """
+        self._install_listeners.append(listener)
+        snapshot = self._snapshot
+        if snapshot is not None:
+            listener(snapshot)
+
+    def _install(self, sources: AudioSourceList) -> None:
+        """Swap in a snapshot; call with the refresh lock held."""
+        self._snapshot = None if sources.is_empty() else sources
+        if self._snapshot is not None and not sources.stale:
+            self._last_good = sources
+        self._generation += 1
+        self._publish()
+        if self._snapshot is None:
+            return
+
+        for listener in self._install_listeners:
+            try:
+                listener(sources)
+            except Exception as e:
+                logger.warning(f"Preparing the source snapshot failed: {e}")
+
+    def set_freshness(self, freshness: CacheFreshness) -> None:
+        """Record whether the device event feed keeps this cache current."""
+        self._live = freshness is CacheFreshness.LIVE
+        publisher = self._publisher
+        if publisher is not None:
+            publisher.set_live(self._live)
+
+    def attach_publisher(self, publisher: SharedSnapshotPublisher) -> None:
+        """Publish this cache's snapshots from now on, starting with the current one."""
+        self._publisher = publisher
+        publisher.set_live(self._live)
+        if self._snapshot is not None:
+            self._publish()
+
+    def _publish(self) -> None:
+        """Publish the current snapshot; without one, readers keep the previous publication."""
+        publisher = self._publisher
+        snapshot = self._snapshot
+        if publisher is None or snapshot is None:
+            return
+
+        publisher.publish(snapshot, self.get_default_source())
+
+    def _start_recovery(self) -> None:
+        recovery = self._recovery
+        if recovery is not None and recovery.is_alive():
+            return
+
+        self._recovery = threading.Thread(target=self._recover, daemon=True)
+        self._recovery.start()
+
+    def _recover(self) -> None:
+        """Relist whenever the breaker lets a trial through, until one succeeds."""
+        while self._server_failing():
+            retry_at = self._breaker.retry_at
+            delay = 0.0 if retry_at is None else retry_at - time.monotonic()
+            time.sleep(max(self.RECOVERY_INTERVAL, delay))
+            try:
+                sources = self.refresh()
+            except Exception as e:
+                logger.warning(f"Retrying the source list failed: {e}")
+                return
+            if not sources.stale:
+                logger.info("Audio server answers again, source list is fresh")
+                return
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next read fetches a fresh list."""
+        self._snapshot = None
+
+    def apply_event(self, event: DeviceEvent) -> None:
+        """Update the cache for a single audio server event."""
+        self.apply_events([event])
+
+    def apply_events(self, events: List[DeviceEvent]) -> None:
+        """Update the cache for a batch of audio server events.
+
+        However many events the batch holds, it costs at most one default
+        source lookup and one full relist.
+        """
+        if any(e.facility is DeviceFacility.SERVER for e in events):
+            self._default_source = self._audio_client.get_default_source()
+            self._publish()
+
+        source_events = [e for e in events if e.facility is DeviceFacility.SOURCE]
+        if source_events:
+            self._discard_saved()
+        invalidate_source = getattr(self._audio_client, "invalidate_source", None)
+        if invalidate_source:
+            for event in source_events:
+                if event.index is not None:
+                    invalidate_source(event.index)
+
+        if not source_events or self._snapshot is None:
+            return
+
+        if any(e.index is None for e in source_events):
+            self.refresh()
+            return
+
+        removed = {e.index for e in source_events if e.type is DeviceEventType.REMOVE}
+        if removed:
+            self._swap(lambda sources: [s for s in sources if s.index not in removed])
+
+        updated = [e.index for e in source_events if e.type is not DeviceEventType.REMOVE]
+        if not updated:
+            return
+
+        get_source = getattr(self._audio_client, "get_source", None)
+        if get_source is None:
+            self.refresh()
+            return
+
+        try:
+            fetched = [(index, get_source(index)) for index in updated]
+        except Exception as e:
+            logger.debug(f"Fetching changed sources failed, relisting: {e}")
+            self.refresh()
+            return
+
+        def replace_all(sources: List[AudioSource]) -> List[AudioSource]:
+            for index, source in fetched:
+                sources = self._replace_source(sources, index, source)
+            return sources
+
+        self._swap(replace_all)
+
+    def get_default_source(self) -> Optional[str]:
+        """Get name of the default audio input source."""
+        if self._default_source is None:
+            self._default_source = self._audio_client.get_default_source()
+        return self._default_source
+
+    def invalidate_default(self) -> None:
+        """Forget the default source so the next read asks the server."""
+        self._default_source = None
+
+    def set_default_source(self, source_name: str) -> None:
+        """Set default audio input source; on failure the server is asked again on the next read."""
+        self._default_source = None
+        self._audio_client.set_default_source(source_name)
+        self._default_source = source_name
+        self._publish()
+
+    def _swap(self, update: Callable[[List[AudioSource]], List[AudioSource]]) -> None:
+        with self._refresh_lock:
+            if self._snapshot is None:
+                return
+            self._install(AudioSourceList(update(self._snapshot.sources), self._snapshot.stale))
+
+    @staticmethod
+    def _replace_source(
+        sources: List[AudioSource], index: int, source: Optional[AudioSource]
+    ) -> List[AudioSource]:
+        updated = [s for s in sources if s.index != index]
+        if source is None:
+            return updated
+        position = next((i for i, s in enumerate(sources) if s.index == index), len(updated))
+        updated.insert(position, source)
+        return updated
+
+    def move_streams_to_source(self, source_name: str) -> StreamMoveReport:
+        """Move all active input streams to source."""
+        return self._audio_client.move_streams_to_source(source_name)
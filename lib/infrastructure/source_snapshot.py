@@ -0,0 +1,123 @@
+"""Binary on-disk snapshot of the source list, shared across short-lived runs.
+
+The snapshot is tagged with a validity token taken from the audio server,
+such as a digest of pactl's short listing. A run whose token matches reuses
+the list, including the descriptions that are expensive to fetch, and only
+lists in full when the token differs.
+
+Layout, little-endian::
+
+    header   magic "MSS1" | token length u16 | source count u32
+    token    token bytes
+    sources  index u32 | name length u16 | description length u16 | name | description
+
+Strings are UTF-8. Loading decodes the buffer with ``struct`` and does no
+other parsing.
+"""
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Optional
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.infrastructure.state_file import user_runtime_dir
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"MSS1"
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<IHH")
+MAX_STRING = 0xFFFF
+
+
+def default_snapshot_path() -> str:
+    return str(user_runtime_dir() / "sources.bin")
+
+
+def encode_snapshot(sources: AudioSourceList, token: bytes) -> bytes:
+    """Encode the sources under ``token``.
+
+    Raises:
+        ValueError: If the token or a name or description is too long
+    """
+    if len(token) > MAX_STRING:
+        raise ValueError("Snapshot token is too long")
+
+    parts = [HEADER.pack(MAGIC, len(token), len(sources.sources)), token]
+    for source in sources.sources:
+        name = source.name.encode()
+        description = source.description.encode()
+        if len(name) > MAX_STRING or len(description) > MAX_STRING:
+            raise ValueError(f"Source {source.index} does not fit in a snapshot")
+        parts += [RECORD.pack(source.index, len(name), len(description)), name, description]
+    return b"".join(parts)
+
+
+def decode_snapshot(data: bytes, token: bytes) -> Optional[AudioSourceList]:
+    """Decode a snapshot taken under ``token``.
+
+    Returns:
+        The sources, or None if the data is not a snapshot, is truncated or
+        was taken under another token
+    """
+    if len(data) < HEADER.size:
+        return None
+    magic, token_length, count = HEADER.unpack_from(data)
+    offset = HEADER.size
+    if magic != MAGIC or data[offset:offset + token_length] != token:
+        return None
+    offset += token_length
+
+    buffer = memoryview(data)
+    sources = []
+    try:
+        for _ in range(count):
+            index, name_length, description_length = RECORD.unpack_from(buffer, offset)
+            offset += RECORD.size
+            name = str(buffer[offset:offset + name_length], "utf-8")
+            offset += name_length
+            description = str(buffer[offset:offset + description_length], "utf-8")
+            offset += description_length
+            sources.append(AudioSource(name=name, index=index, description=description))
+    except (struct.error, UnicodeDecodeError):
+        return None
+    if offset != len(data):
+        return None
+    return AudioSourceList(sources)
+
+
+class SourceSnapshotFile:
+    """The snapshot file, replaced atomically; unreadable files count as invalid."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_snapshot_path()
+
+    def load(self, token: bytes) -> Optional[AudioSourceList]:
+        """Sources saved under ``token``, if the file holds any."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return decode_snapshot(data, token)
+
+    def discard(self) -> None:
+        """Remove the snapshot so no later run trusts it; failures are only logged."""
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Cannot remove source snapshot {self.path}: {e}")
+
+    def save(self, sources: AudioSourceList, token: bytes) -> None:
+        """Replace the snapshot; failures are only logged."""
+        path = Path(self.path)
+        try:
+            data = encode_snapshot(sources, token)
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            partial.write_bytes(data)
+            os.replace(partial, path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot write source snapshot {self.path}: {e}")
@@ -0,0 +1,53 @@
+"""Small JSON state files kept in the user's cache directory."""
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def user_cache_dir() -> Path:
+    """mic-select's cache directory, preferring the XDG cache directory."""
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_dir) / "mic-select"
+
+
+def user_runtime_dir() -> Path:
+    """mic-select's per-session directory, preferring the XDG runtime directory."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "mic-select"
+    return Path(tempfile.gettempdir()) / f"mic-select-{os.getuid()}"
+
+
+class JsonStateFile:
+    """A JSON object on disk that is replaced atomically and never fatal to read or write."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self) -> dict:
+        """The stored object; empty if the file is missing or unreadable."""
+        try:
+            state = json.loads(Path(self.path).read_text())
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable state file {self.path}: {e}")
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def write(self, state: dict) -> bool:
+        """Replace the stored object; failures are only logged."""
+        path = Path(self.path)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            partial.write_text(json.dumps(state, indent=2, sort_keys=True) + "\n")
+            os.replace(partial, path)
+        except OSError as e:
+            logger.warning(f"Cannot write state file {self.path}: {e}")
+            return False
+        return True
@@ -0,0 +1,157 @@
+"""Time-based caching with stale-while-revalidate and shared fetches."""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PendingFetch:
+    """Result slot for a fetch other callers can wait on."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+
+    def resolve(self, result: Any) -> None:
+        self._result = result
+        self._done.set()
+
+    def fail(self, error: BaseException) -> None:
+        self._error = error
+        self._done.set()
+
+    def wait(self) -> Any:
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """How reads of a TtlCache were answered."""
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+
+
+class TtlCache(Generic[T]):
+    """Caches the result of ``load`` for ``ttl`` seconds.
+
+    A read within ``ttl`` of the last load is a hit. A read up to ``grace``
+    seconds later still gets the cached value at once, while a reload runs
+    in the background. Later reads are misses and load synchronously.
+    Concurrent loads are never started: callers join the one in flight.
+
+    Values for which ``cacheable`` is false, such as a failure reported as
+    an empty result, are returned but not kept; the value cached before
+    stays until it expires.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], T],
+        ttl: float,
+        grace: float = 0.0,
+        cacheable: Callable[[T], bool] = lambda value: True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if ttl < 0:
+            raise ValueError("ttl must be non-negative")
+        if grace < 0:
+            raise ValueError("grace must be non-negative")
+
+        self._load = load
+        self._ttl = ttl
+        self._grace = grace
+        self._cacheable = cacheable
+        self._clock = clock
+        self._entry: Optional[Tuple[T, float]] = None
+        self._epoch = 0
+        self._inflight: Optional[PendingFetch] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+
+    def get(self) -> T:
+        """Cached value if fresh enough, loading it otherwise."""
+        entry = self._entry
+        if entry is not None:
+            value, loaded_at = entry
+            age = self._clock() - loaded_at
+            if age < self._ttl:
+                self._count(hit=True)
+                return value
+            if age < self._ttl + self._grace:
+                self._count(stale=True)
+                self._revalidate()
+                return value
+
+        self._count()
+        return self._fetch()
+
+    def invalidate(self) -> None:
+        """Drop the cached value; the next read loads, without joining older loads."""
+        with self._lock:
+            self._entry = None
+            self._epoch += 1
+            self._inflight = None
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._stale_hits, self._misses)
+
+    def _count(self, hit: bool = False, stale: bool = False) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            elif stale:
+                self._stale_hits += 1
+            else:
+                self._misses += 1
+
+    def _revalidate(self) -> None:
+        if self._inflight is not None:
+            return
+        threading.Thread(target=self._background_fetch, daemon=True).start()
+
+    def _background_fetch(self) -> None:
+        try:
+            self._fetch()
+        except Exception as e:
+            logger.warning(f"Revalidating cached value failed: {e}")
+
+    def _fetch(self) -> T:
+        with self._lock:
+            pending = self._inflight
+            joined = pending is not None
+            if not joined:
+                pending = self._inflight = PendingFetch()
+            epoch = self._epoch
+
+        if joined:
+            return pending.wait()
+
+        try:
+            value = self._load()
+        except BaseException as e:
+            with self._lock:
+                if self._inflight is pending:
+                    self._inflight = None
+            pending.fail(e)
+            raise
+
+        with self._lock:
+            if epoch == self._epoch and self._cacheable(value):
+                self._entry = (value, self._clock())
+            if self._inflight is pending:
+                self._inflight = None
+        pending.resolve(value)
+        return value
@@ -0,0 +1,328 @@
+"""Long-lived mic-select service answering launcher requests over a unix socket.
+
+The service owns a Container with a warm source cache, so launcher entry
+points that start a fresh interpreter per keystroke can get their answer
+with one local round trip instead of building everything from scratch.
+
+Requests and responses are single-line JSON objects::
+
+    {"op": "list", "query": "usb", "limit": 10}
+    {"ok": true, "sources": [{"name": "...", "index": 3, "description": "..."}], "stale": false}
+
+    {"op": "switch", "name": "alsa_input.usb"}
+    {"ok": true, "source_name": "alsa_input.usb", "elapsed": 0.012, ...}
+
+    {"op": "current"}
+    {"ok": true, "name": "alsa_input.usb"}
+
+    {"op": "latency"}
+    {"ok": true, "operations": {"list-sources": {"p50": 0.004, "p90": 0.007, "p99": 0.011, ...}}}
+
+``stale`` is true while the audio server is not responding and the last
+known list is served instead. Failures are answered with
+``{"ok": false, "error": "..."}``.
+"""
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from lib.application.current_source_use_case import CurrentSourceUseCase
+from lib.application.list_sources_use_case import ListSourcesUseCase
+from lib.application.switch_source_use_case import SwitchSourceUseCase
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.device_event import CacheFreshness
+from lib.domain.latency import AdaptiveTimeouts
+from lib.infrastructure.device_monitor import PulseAudioDeviceMonitor
+from lib.infrastructure.source_cache import SourceCache
+from lib.infrastructure.state_file import user_runtime_dir
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_SIZE = 64 * 1024
+
+
+class ServiceUnavailable(Exception):
+    """Raised when no service is listening on the socket."""
+
+
+class ServiceError(RuntimeError):
+    """Raised when the service answers a request with an error."""
+
+
+def default_socket_path() -> str:
+    """Per-user socket path, preferring the session runtime directory."""
+    return str(user_runtime_dir() / "service.sock")
+
+
+class SourceService:
+    """Dispatches service requests to the application use cases."""
+
+    def __init__(
+        self,
+        list_use_case: ListSourcesUseCase,
+        switch_use_case: SwitchSourceUseCase,
+        current_use_case: CurrentSourceUseCase,
+        socket_path: Optional[str] = None,
+        source_cache: Optional[SourceCache] = None,
+        device_monitor: Optional[PulseAudioDeviceMonitor] = None,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+    ):
+        self._list_use_case = list_use_case
+        self._switch_use_case = switch_use_case
+        self._current_use_case = current_use_case
+        self.socket_path = socket_path or default_socket_path()
+        self._source_cache = source_cache
+        self._device_monitor = device_monitor
+        self._timeouts = timeouts
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._close_lock = threading.Lock()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one decoded request."""
+        op = request.get("op")
+        try:
+            if op == "list":
+                self._refresh_if_stale()
+                sources = self._list_use_case.execute(
+                    query=str(request.get("query", "")),
+                    limit=int(request.get("limit", 10)),
+                )
+                return {
+                    "ok": True,
+                    "sources": [self._encode_source(s) for s in sources.sources],
+                    "stale": sources.stale,
+                }
+
+            if op == "switch":
+                result = self._switch_use_case.execute(str(request.get("name", "")).strip())
+                return {
+                    "ok": True,
+                    "source_name": result.source_name,
+                    "elapsed": result.elapsed,
+                    "moved": len(result.streams.moved()),
+                    "failed": len(result.streams.failed()),
+                    "timed_out": len(result.streams.timed_out()),
+                    "skipped": result.streams.skipped,
+                }
+
+            if op == "current":
+                if self._source_cache and not self._events_live():
+                    self._source_cache.invalidate_default()
+                return {"ok": True, "name": self._current_use_case.execute()}
+
+            if op == "latency":
+                return {"ok": True, "operations": self._timeouts.percentiles() if self._timeouts else {}}
+
+            return {"ok": False, "error": f"Unknown operation: {op}"}
+        except (ValueError, RuntimeError) as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Error handling '{op}' request: {e}", exc_info=True)
+            return {"ok": False, "error": f"Internal error: {e}"}
+
+    def _refresh_if_stale(self) -> None:
+        """Fetch synchronously unless a live event stream keeps the cache current."""
+        if not self._source_cache or self._events_live():
+            return
+
+        self._source_cache.fetch()
+
+    def _events_live(self) -> bool:
+        return self._device_monitor is not None and self._device_monitor.freshness is CacheFreshness.LIVE
+
+    def start(self) -> None:
+        """Bind the socket and serve requests on a background thread."""
+        self._bind()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve requests until ``shutdown()``."""
+        self._bind()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._close()
+
+    def shutdown(self) -> None:
+        """Stop serving and remove the socket."""
+        server = self._server
+        if not server:
+            return
+
+        server.shutdown()
+        self._close()
+
+    def _close(self) -> None:
+        with self._close_lock:
+            if not self._server:
+                return
+
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+    def _bind(self) -> None:
+        path = Path(self.socket_path)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if path.exists():
+            if _is_listening(self.socket_path):
+                raise RuntimeError(f"mic-select service already running on {self.socket_path}")
+            path.unlink()
+
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in iter(lambda: self.rfile.readline(MAX_MESSAGE_SIZE), b""):
+                    try:
+                        request = json.loads(line)
+                        response = service.handle(request) if isinstance(request, dict) else None
+                    except ValueError:
+                        response = None
+                    if response is None:
+                        response = {"ok": False, "error": "Malformed request"}
+                    self.wfile.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"mic-select service listening on {self.socket_path}")
+
+    @staticmethod
+    def _encode_source(source: AudioSource) -> Dict[str, Any]:
+        return {"name": source.name, "index": source.index, "description": source.description}
+
+
+class SourceServiceClient:
+    """Thin client for a running SourceService."""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = 2.0):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+
+    def list_sources(self, query: str = "", limit: int = 10) -> AudioSourceList:
+        response = self._request({"op": "list", "query": query, "limit": limit})
+        return AudioSourceList([
+            AudioSource(name=s["name"], index=s["index"], description=s.get("description", ""))
+            for s in response["sources"]
+        ], stale=bool(response.get("stale", False)))
+
+    def switch(self, source_name: str) -> Dict[str, Any]:
+        return self._request({"op": "switch", "name": source_name}, idempotent=False)
+
+    def current(self) -> Optional[str]:
+        return self._request({"op": "current"})["name"]
+
+    def _request(self, request: Dict[str, Any], idempotent: bool = True) -> Dict[str, Any]:
+        """
+        Send one request and read its response.
+
+        Raises:
+            ServiceUnavailable: If the request can safely be handled
+                elsewhere: nothing was sent, or it may be repeated
+            ServiceError: If the service answered with an error, or a
+                request that must not run twice was sent but not answered
+        """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                raise ServiceUnavailable(f"No mic-select service on {self.socket_path}: {e}") from e
+
+            try:
+                sock.sendall(json.dumps(request, separators=(",", ":")).encode() + b"\n")
+            except OSError as e:
+                raise ServiceUnavailable(f"mic-select service did not take the request: {e}") from e
+
+            try:
+                response = json.loads(_read_line(sock))
+            except (OSError, ServiceUnavailable) as e:
+                if not idempotent:
+                    raise ServiceError(f"mic-select service did not confirm '{request['op']}': {e}") from e
+                raise ServiceUnavailable(f"mic-select service did not answer: {e}") from e
+        finally:
+            sock.close()
+
+        if not response.get("ok"):
+            raise ServiceError(response.get("error", "Unknown service error"))
+        return response
+
+
+def _read_line(sock: socket.socket) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ServiceUnavailable("Service closed the connection")
+        chunks.append(chunk)
+        size += len(chunk)
+        if chunk.endswith(b"\n"):
+            return b"".join(chunks)
+        if size > MAX_MESSAGE_SIZE:
+            raise ServiceUnavailable("Service response too large")
+
+
+def _is_listening(socket_path: str) -> bool:
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def main() -> None:
+    """Run the service in the foreground until SIGTERM/SIGINT."""
+    from lib.dependency_injection.container import Container
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)8s] %(name)s: %(message)s"
+    )
+
+    container = Container()
+    monitor = container.device_monitor()
+    service = SourceService(
+        container.list_sources_use_case(),
+        container.switch_source_use_case(),
+        container.current_source_use_case(),
+        source_cache=container.source_cache(),
+        device_monitor=monitor,
+        timeouts=container.command_runner().timeouts,
+    )
+
+    container.publish_shared_snapshot()
+    container.source_cache().prewarm()
+    if monitor:
+        monitor.start()
+
+    def stop(signum, frame):
+        threading.Thread(target=service.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        service.serve_forever()
+    finally:
+        if monitor:
+            monitor.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
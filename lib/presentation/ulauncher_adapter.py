@@ -1,140 +1,55 @@
 """Ulauncher extension adapter."""
-import shlex
-import threading
-import subprocess
 import logging
-from typing import Callable, Optional
+import subprocess
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
 from ulauncher.api.client.Extension import Extension
 from ulauncher.api.client.EventListener import EventListener
-from ulauncher.api.shared.event import KeywordQueryEvent
+from ulauncher.api.shared.event import ItemEnterEvent, KeywordQueryEvent
 from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
-from ulauncher.api.shared.action.RunScriptAction import RunScriptAction
+from ulauncher.api.shared.action.ExtensionCustomAction import ExtensionCustomAction
 from ulauncher.api.shared.action.RenderResultListAction import RenderResultListAction
 
 from lib.application.list_sources_use_case import ListSourcesUseCase
 from lib.application.switch_source_use_case import SwitchSourceUseCase
 from lib.domain.audio_source import AudioSourceList
+from lib.domain.device_event import CacheFreshness, DeviceEvent
+from lib.domain.event_coalescer import EventCoalescer
+from lib.domain.stream_move import SwitchResult
+from lib.infrastructure.command_runner import CommandRunner, Deadline
+from lib.infrastructure.device_monitor import (
+    DeviceChangeNotifier,
+    PactlEventParser,
+    PactlSubscribeReader,
+    PulseAudioDeviceMonitor,
+)
+from lib.infrastructure.source_cache import SourceCache
 
 logger = logging.getLogger(__name__)
 
 
-class DeviceChangeNotifier:
-    def __init__(self, callback: Optional[Callable[[], None]] = None):
-        self._callback = callback
-
-    def notify(self):
-        if not self._callback:
-            return
-
-        self._callback()
-
-
-class PactlSubscribeReader:
-    def __init__(self):
-        self._process: Optional[subprocess.Popen] = None
-
-    def start(self):
-        self._process = subprocess.Popen(
-            ["pactl", "subscribe"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
-        )
-
-    def read_line(self) -> Optional[str]:
-        if not self._process:
-            return None
-
-        return self._process.stdout.readline()
-
-    def terminate(self):
-        if not self._process:
-            return
-
-        self._process.terminate()
-
-
-class SourceEventDetector:
-    def detect(self, line: str) -> bool:
-        return "source" in line.lower()
-
-
-class PulseAudioDeviceMonitor:
-    def __init__(
-        self,
-        notifier: DeviceChangeNotifier,
-        reader: PactlSubscribeReader,
-        detector: SourceEventDetector,
-    ):
-        self._notifier = notifier
-        self._reader = reader
-        self._detector = detector
-        self._monitor_thread: Optional[threading.Thread] = None
-        self._running = False
-
-    def start(self):
-        if self._running:
-            return
+class SwitchNotifier:
+    TIMEOUT = 1.0
 
-        self._running = True
-        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._monitor_thread.start()
-        logger.debug("PulseAudio device monitor started")
+    def __init__(self, expire_time: int, runner: Optional[CommandRunner] = None):
+        self._expire_time = expire_time
+        self._runner = runner or CommandRunner()
 
-    def stop(self):
-        self._running = False
-        if not self._monitor_thread:
-            return
-
-        self._monitor_thread.join(timeout=1)
-        logger.debug("PulseAudio device monitor stopped")
-
-    def _monitor_loop(self):
+    def notify(self, title: str, body: str) -> None:
         try:
-            self._reader.start()
-        except Exception as e:
-            logger.warning(f"Failed to monitor devices: {e}")
-            return
-
-        while self._running:
-            self._process_monitor_line()
-
-        self._reader.terminate()
-
-    def _process_monitor_line(self):
-        try:
-            line = self._reader.read_line()
-        except Exception as e:
-            logger.warning(f"Error reading pactl subscribe: {e}")
-            self._running = False
-            return
-
-        if not line:
-            self._running = False
-            return
-
-        if not self._detector.detect(line):
-            return
-
-        logger.debug(f"Device event detected: {line.strip()}")
-        self._notifier.notify()
-
-
-class SwitchCommandBuilder:
-    def __init__(self, notification_expire_time: int):
-        self._notification_expire_time = notification_expire_time
-
-    def build(self, source_name: str, display_name: str) -> str:
-        escaped_name = shlex.quote(source_name)
-        safe_display_name = shlex.quote(display_name[:50] if display_name else source_name)
-
-        return f"""pactl set-default-source {escaped_name} 2>&1 && \
-for stream_id in $(pactl list short source-outputs 2>/dev/null | cut -f1); do
-    if [ -n "$stream_id" ]; then
-        pactl move-source-output "$stream_id" {escaped_name} 2>&1 || true
-    fi
-done && notify-send 'Microphone Changed' {safe_display_name} --icon=audio-input-microphone --expire-time={self._notification_expire_time}"""
+            self._runner.run(
+                [
+                    "notify-send",
+                    title,
+                    body,
+                    "--icon=audio-input-microphone",
+                    f"--expire-time={self._expire_time}",
+                ],
+                Deadline.after(self.TIMEOUT),
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.debug(f"Cannot show notification: {e}")
 
 
 class QuerySanitizer:
@@ -148,19 +63,14 @@ class SourcesItemFactory:
     ICON_PATH = "icon.png"
     DEFAULT_DESCRIPTION = "Set as default microphone"
 
-    def create_source_items(
-        self,
-        sources: AudioSourceList,
-        command_builder: SwitchCommandBuilder,
-    ) -> list:
+    def create_source_items(self, sources: AudioSourceList) -> list:
         return [
             ExtensionResultItem(
                 icon=self.ICON_PATH,
                 name=source.display_name(),
                 description=self.DEFAULT_DESCRIPTION,
-                on_enter=RunScriptAction(
-                    command_builder.build(source.name, source.display_name()),
-                    None
+                on_enter=ExtensionCustomAction(
+                    {"source_name": source.name, "display_name": source.display_name()}
                 ),
             )
             for source in sources.sources
@@ -174,6 +84,14 @@ class SourcesItemFactory:
             on_enter=None
         )
 
+    def create_stale_item(self) -> ExtensionResultItem:
+        return ExtensionResultItem(
+            icon=self.ICON_PATH,
+            name="Audio server not responding",
+            description="Showing the last known microphones, they may be out of date",
+            on_enter=None
+        )
+
     def create_no_matches_item(self, total_sources: int) -> ExtensionResultItem:
         return ExtensionResultItem(
             icon=self.ICON_PATH,
@@ -197,12 +115,22 @@ class SourcesPresentationStrategy:
         sources: AudioSourceList,
         query: str,
         factory: SourcesItemFactory,
-        command_builder: SwitchCommandBuilder,
+    ) -> list:
+        items = self._present(sources, query, factory)
+        if sources.stale:
+            return [factory.create_stale_item()] + items
+        return items
+
+    def _present(
+        self,
+        sources: AudioSourceList,
+        query: str,
+        factory: SourcesItemFactory,
     ) -> list:
         if sources.is_empty():
             return [factory.create_empty_sources_item()]
 
-        items = factory.create_source_items(sources, command_builder)
+        items = factory.create_source_items(sources)
 
         if items:
             return items
@@ -220,28 +148,71 @@ class MicSwitcherPresenter:
         switch_use_case: SwitchSourceUseCase,
         max_sources: int = 10,
         notification_expire_time: int = 1500,
+        source_cache: Optional[SourceCache] = None,
+        event_coalescer: Optional[EventCoalescer] = None,
+        event_feed: Optional[Tuple[PactlSubscribeReader, PactlEventParser]] = None,
+        refresh_interval: float = 1.0,
     ):
         self._list_use_case = list_use_case
         self._switch_use_case = switch_use_case
+        self._source_cache = source_cache
         self._max_sources = max_sources
-        self._notification_expire_time = notification_expire_time
+        self._refresh_interval = refresh_interval
+        self._fetched_at: Optional[float] = None
 
         self._sanitizer = QuerySanitizer()
-        self._command_builder = SwitchCommandBuilder(notification_expire_time)
+        self._notifier = SwitchNotifier(notification_expire_time)
+        self._switch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mic-switch")
         self._item_factory = SourcesItemFactory()
         self._presentation_strategy = SourcesPresentationStrategy()
+        self._first_query_latency: Optional[float] = None
+
+        if self._source_cache:
+            self._source_cache.prewarm()
 
-        notifier = DeviceChangeNotifier(self._on_device_change)
-        reader = PactlSubscribeReader()
-        detector = SourceEventDetector()
+        notifier = DeviceChangeNotifier(self._on_device_changes)
+        reader, parser = event_feed or (PactlSubscribeReader(), PactlEventParser())
 
-        self._device_monitor = PulseAudioDeviceMonitor(notifier, reader, detector)
+        self._device_monitor = PulseAudioDeviceMonitor(
+            notifier,
+            reader,
+            parser,
+            resync=self._resync,
+            coalescer=event_coalescer,
+            on_freshness=self._on_freshness,
+        )
         self._device_monitor.start()
 
-    def _on_device_change(self):
-        logger.debug("Device change detected")
+    def _resync(self):
+        if not self._source_cache:
+            return
+
+        self._source_cache.resync()
+        self._fetched_at = time.monotonic()
+
+    def _on_freshness(self, freshness: CacheFreshness):
+        if not self._source_cache:
+            return
+
+        self._source_cache.set_freshness(freshness)
+
+    def _on_device_changes(self, events: List[DeviceEvent]):
+        logger.debug(f"Device changes detected: {events}")
+        if not self._source_cache:
+            return
+
+        self._source_cache.apply_events(events)
+
+    @property
+    def first_query_latency(self) -> Optional[float]:
+        """Seconds it took to answer the first query, once there was one."""
+        return self._first_query_latency
 
     def present_sources(self, query: str) -> RenderResultListAction:
+        started_at = time.perf_counter()
+        if self._source_cache and self._device_monitor.freshness is not CacheFreshness.LIVE:
+            self._fetch_if_due()
+
         sanitized_query = self._sanitizer.sanitize(query)
         sources = self._list_use_case.execute(query=sanitized_query, limit=self._max_sources)
 
@@ -249,11 +220,51 @@ class MicSwitcherPresenter:
             sources,
             sanitized_query,
             self._item_factory,
-            self._command_builder,
         )
 
+        if self._first_query_latency is None:
+            self._first_query_latency = time.perf_counter() - started_at
+            logger.info(f"First query answered in {self._first_query_latency * 1000:.1f}ms")
+
         return RenderResultListAction(items)
 
+    def _fetch_if_due(self) -> None:
+        """Fetch for a query made without live events, once per interval.
+
+        Keystrokes arrive faster than the list can change, so a fetch, or a
+        resync after the feed reconnects, covers the queries that follow it
+        for ``refresh_interval`` seconds.
+        """
+        now = time.monotonic()
+        if self._fetched_at is not None and now - self._fetched_at < self._refresh_interval:
+            return
+
+        self._fetched_at = now
+        self._source_cache.fetch()
+
+    def switch_source(self, source_name: str, display_name: Optional[str] = None) -> Future:
+        """Switch on the worker thread, so the launcher is never kept waiting.
+
+        Switches run one at a time, in the order they were chosen.
+        """
+        return self._switch_executor.submit(self._switch, source_name, display_name or source_name)
+
+    def _switch(self, source_name: str, display_name: str) -> Optional[SwitchResult]:
+        try:
+            result = self._switch_use_case.execute(source_name)
+        except Exception as e:
+            logger.error(f"Switching to '{source_name}' failed: {e}", exc_info=True)
+            self._notifier.notify("Microphone Not Changed", display_name[:50])
+            return None
+
+        logger.info(f"Switched to '{source_name}' in {result.elapsed * 1000:.1f}ms")
+        self._notifier.notify("Microphone Changed", display_name[:50])
+        return result
+
+    def shutdown(self) -> None:
+        self._device_monitor.stop()
+        self._switch_executor.shutdown(wait=False)
+
 
 class KeywordQueryEventListener(EventListener):
     def __init__(self, presenter: MicSwitcherPresenter):
@@ -264,11 +275,26 @@ class KeywordQueryEventListener(EventListener):
         return self._presenter.present_sources(query)
 
 
+class ItemEnterEventListener(EventListener):
+    def __init__(self, presenter: MicSwitcherPresenter):
+        self._presenter = presenter
+
+    def on_event(self, event: ItemEnterEvent, extension) -> None:
+        data = event.get_data() or {}
+        source_name = data.get("source_name")
+        if not source_name:
+            logger.warning(f"Ignoring selected item without a source: {data}")
+            return
+
+        self._presenter.switch_source(source_name, data.get("display_name"))
+
+
 class MicSwitcherExtension(Extension):
     def __init__(self, presenter: MicSwitcherPresenter):
         super(MicSwitcherExtension, self).__init__()
         self._presenter = presenter
         self.subscribe(KeywordQueryEvent, KeywordQueryEventListener(presenter))
+        self.subscribe(ItemEnterEvent, ItemEnterEventListener(presenter))
 
     def __del__(self):
         if not hasattr(self, "_presenter"):
@@ -277,4 +303,4 @@ class MicSwitcherExtension(Extension):
         if not self._presenter:
             return
 
-        self._presenter._device_monitor.stop()
+        self._presenter.shutdown()
@@ -19,7 +19,7 @@ sys.modules['ulauncher.api.shared.event'] = MagicMock()
 sys.modules['ulauncher.api.shared.item'] = MagicMock()
 sys.modules['ulauncher.api.shared.item.ExtensionResultItem'] = MagicMock()
 sys.modules['ulauncher.api.shared.action'] = MagicMock()
-sys.modules['ulauncher.api.shared.action.RunScriptAction'] = MagicMock()
+sys.modules['ulauncher.api.shared.action.ExtensionCustomAction'] = MagicMock()
 sys.modules['ulauncher.api.shared.action.RenderResultListAction'] = MagicMock()
 
 
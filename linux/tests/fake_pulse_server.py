@@ -0,0 +1,229 @@
+"""Stand-in PulseAudio server speaking enough native protocol for tests."""
+import socket
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from lib.infrastructure import pulse_protocol
+from lib.infrastructure.pulse_protocol import (
+    TagStructReader,
+    TagStructWriter,
+    encode_packet,
+    recv_packet,
+)
+
+ERROR_ACCESS = 1
+ERROR_NOENTITY = 5
+ERROR_NOTSUPPORTED = 19
+FORMAT_S16LE = 3
+
+
+@dataclass
+class FakeSource:
+    index: int
+    name: str
+    description: str
+    monitor_of_sink: int = pulse_protocol.INVALID_INDEX
+
+
+@dataclass
+class FakeSourceOutput:
+    index: int
+    source: int
+    properties: Dict[str, str] = field(default_factory=dict)
+
+
+class FakePulseServer:
+    """Threaded unix-socket server holding a mutable fake audio graph."""
+
+    def __init__(self, server_version: int = 35):
+        self._dir = tempfile.TemporaryDirectory()
+        self.socket_path = str(Path(self._dir.name) / "native")
+        self.server_version = server_version
+        self.sources: List[FakeSource] = []
+        self.source_outputs: List[FakeSourceOutput] = []
+        self.default_source: Optional[str] = None
+        self.commands: List[int] = []
+        self.connections = 0
+        self.reject_auth = False
+        self._listener: Optional[socket.socket] = None
+        self._threads: List[threading.Thread] = []
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> "FakePulseServer":
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen()
+        thread = threading.Thread(target=self._accept_loop, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        if self._listener:
+            self._listener.close()
+        for client in list(self._clients):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            client.close()
+        self._dir.cleanup()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            self._clients.append(client)
+            thread = threading.Thread(target=self._serve, args=(client,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _serve(self, client: socket.socket) -> None:
+        authenticated = False
+        while True:
+            try:
+                payload = recv_packet(client)
+            except (OSError, ConnectionError):
+                return
+            request = TagStructReader(payload)
+            command = request.get_u32()
+            tag = request.get_u32()
+            self.commands.append(command)
+
+            if command == pulse_protocol.COMMAND_AUTH:
+                if self.reject_auth:
+                    self._send_error(client, tag, ERROR_ACCESS)
+                    continue
+                authenticated = True
+                self._send_reply(client, tag, TagStructWriter().put_u32(self.server_version))
+                continue
+
+            if not authenticated:
+                self._send_error(client, tag, ERROR_ACCESS)
+                continue
+
+            with self._lock:
+                reply = self._dispatch(command, request)
+            if isinstance(reply, int):
+                self._send_error(client, tag, reply)
+            else:
+                self._send_reply(client, tag, reply)
+
+    def _dispatch(self, command: int, request: TagStructReader):
+        if command == pulse_protocol.COMMAND_SET_CLIENT_NAME:
+            request.get_proplist()
+            return TagStructWriter().put_u32(1)
+
+        if command == pulse_protocol.COMMAND_GET_SERVER_INFO:
+            return self._server_info()
+
+        if command == pulse_protocol.COMMAND_GET_SOURCE_INFO_LIST:
+            reply = TagStructWriter()
+            for source in self.sources:
+                self._put_source_info(reply, source)
+            return reply
+
+        if command == pulse_protocol.COMMAND_GET_SOURCE_INFO:
+            index = request.get_u32()
+            name = request.get_string()
+            for source in self.sources:
+                if source.index == index or (name is not None and source.name == name):
+                    reply = TagStructWriter()
+                    self._put_source_info(reply, source)
+                    return reply
+            return ERROR_NOENTITY
+
+        if command == pulse_protocol.COMMAND_SET_DEFAULT_SOURCE:
+            name = request.get_string()
+            if not self._find_source(name):
+                return ERROR_NOENTITY
+            self.default_source = name
+            return TagStructWriter()
+
+        if command == pulse_protocol.COMMAND_GET_SOURCE_OUTPUT_INFO_LIST:
+            reply = TagStructWriter()
+            for output in self.source_outputs:
+                self._put_source_output_info(reply, output)
+            return reply
+
+        if command == pulse_protocol.COMMAND_MOVE_SOURCE_OUTPUT:
+            index = request.get_u32()
+            request.get_u32()
+            target = self._find_source(request.get_string())
+            output = next((o for o in self.source_outputs if o.index == index), None)
+            if not target or not output:
+                return ERROR_NOENTITY
+            output.source = target.index
+            return TagStructWriter()
+
+        return ERROR_NOTSUPPORTED
+
+    def _find_source(self, name: Optional[str]) -> Optional[FakeSource]:
+        return next((s for s in self.sources if s.name == name), None)
+
+    def _server_info(self) -> TagStructWriter:
+        return (
+            TagStructWriter()
+            .put_string("user")
+            .put_string("host")
+            .put_string("15.0.0")
+            .put_string("PulseAudio (on PipeWire 1.0.5)")
+            .put_sample_spec(FORMAT_S16LE, 2, 48000)
+            .put_string(None)
+            .put_string(self.default_source)
+            .put_u32(0)
+        )
+
+    @staticmethod
+    def _put_source_info(reply: TagStructWriter, source: FakeSource) -> None:
+        (
+            reply.put_u32(source.index)
+            .put_string(source.name)
+            .put_string(source.description)
+            .put_sample_spec(FORMAT_S16LE, 2, 48000)
+            .put_channel_map([1, 2])
+            .put_u32(pulse_protocol.INVALID_INDEX)
+            .put_cvolume([0x10000, 0x10000])
+            .put_boolean(False)
+            .put_u32(source.monitor_of_sink)
+            .put_string(None)
+            .put_usec(0)
+            .put_string("PipeWire")
+            .put_u32(0)
+            .put_proplist({"device.description": source.description})
+            .put_usec(0)
+        )
+
+    @staticmethod
+    def _put_source_output_info(reply: TagStructWriter, output: FakeSourceOutput) -> None:
+        (
+            reply.put_u32(output.index)
+            .put_string(output.properties.get("media.name", "capture"))
+            .put_u32(pulse_protocol.INVALID_INDEX)
+            .put_u32(1)
+            .put_u32(output.source)
+            .put_sample_spec(FORMAT_S16LE, 1, 48000)
+            .put_channel_map([0])
+            .put_usec(0)
+            .put_usec(0)
+            .put_string("speex-float-1")
+            .put_string("PipeWire")
+            .put_proplist(output.properties)
+        )
+
+    @staticmethod
+    def _send_reply(client: socket.socket, tag: int, body: TagStructWriter) -> None:
+        header = TagStructWriter().put_u32(pulse_protocol.COMMAND_REPLY).put_u32(tag)
+        client.sendall(encode_packet(header.to_bytes() + body.to_bytes()))
+
+    @staticmethod
+    def _send_error(client: socket.socket, tag: int, code: int) -> None:
+        packet = TagStructWriter().put_u32(pulse_protocol.COMMAND_ERROR).put_u32(tag).put_u32(code)
+        client.sendall(encode_packet(packet.to_bytes()))
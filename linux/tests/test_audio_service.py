@@ -4,13 +4,25 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from lib.domain.stream_move import StreamMoveOutcome
 from lib.infrastructure.audio_service import PactlClient
 
 
+def source_outputs_listing(*stream_ids, source=1, properties=None):
+    """Build `pactl list source-outputs` output for the given streams."""
+    blocks = []
+    for stream_id in stream_ids:
+        lines = [f"Source Output #{stream_id}", "\tDriver: PipeWire", f"\tSource: {source}", "\tProperties:"]
+        for key, value in (properties or {}).get(stream_id, {}).items():
+            lines.append(f'\t\t{key} = "{value}"')
+        blocks.append("\n".join(lines) + "\n")
+    return "\n".join(blocks)
+
+
 class TestPactlClientListSources:
     """Tests for PactlClient.list_sources method."""
 
-    @patch("lib.infrastructure.audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_success(self, mock_run):
         """Test successful source listing and monitor filtering."""
         mock_run.return_value = MagicMock(
@@ -30,11 +42,29 @@ class TestPactlClientListSources:
 
         assert len(result.sources) == 1
         assert result.sources[0].name == "alsa_input.pci-0000_00_1f.3.analog-stereo"
+        assert result.sources[0].index == 0
         assert result.sources[0].description == "Built-in Audio Analog Stereo"
         for source in result.sources:
             assert "monitor" not in source.name.lower()
 
-    @patch("lib.infrastructure.audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_list_sources_uses_server_indices(self, mock_run):
+        """Test that source indices come from the Source #N headers."""
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout=(
+                "Source #57\n"
+                "\tName: alsa_input.usb-ME6S-00.mono-fallback\n"
+                "Source #61\n"
+                "\tName: alsa_input.usb-Webcam-00.mono-fallback\n"
+            ),
+        )
+
+        result = PactlClient().list_sources()
+
+        assert [s.index for s in result.sources] == [57, 61]
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_timeout(self, mock_run):
         """Test handling of timeout exception."""
         mock_run.side_effect = subprocess.TimeoutExpired("pactl", 0.5)
@@ -44,7 +74,7 @@ class TestPactlClientListSources:
 
         assert result.sources == []
 
-    @patch("lib.infrastructure.audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_file_not_found(self, mock_run):
         """Test handling of missing pactl command."""
         mock_run.side_effect = FileNotFoundError()
@@ -54,7 +84,7 @@ class TestPactlClientListSources:
 
         assert result.sources == []
 
-    @patch("lib.infrastructure.audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_command_failure(self, mock_run):
         """Test handling of command failure or empty output."""
         mock_run.return_value = MagicMock(returncode=1, stdout="")
@@ -68,9 +98,10 @@ class TestPactlClientListSources:
 class TestPactlClientSetDefaultSource:
     """Tests for PactlClient.set_default_source method."""
 
-    @patch("lib.infrastructure.audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_set_default_source(self, mock_run):
         """Test setting default source."""
+        mock_run.return_value = MagicMock(returncode=0, stderr="")
         client = PactlClient()
         source_name = "alsa_input.test.mono-fallback"
 
@@ -84,10 +115,26 @@ class TestPactlClientSetDefaultSource:
         assert source_name in call_args
 
 
+    @pytest.mark.parametrize("outcome", [
+        MagicMock(returncode=1, stderr="No such entity"),
+        subprocess.TimeoutExpired(["pactl"], 0.5),
+    ])
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_failed_switch_is_raised(self, mock_run, outcome):
+        """Test that a refused or timed-out switch is not reported as done."""
+        if isinstance(outcome, Exception):
+            mock_run.side_effect = outcome
+        else:
+            mock_run.return_value = outcome
+
+        with pytest.raises(RuntimeError):
+            PactlClient().set_default_source("alsa_input.missing")
+
+
 class TestPactlClientMoveStreams:
     """Tests for PactlClient.move_streams_to_source method."""
 
-    @patch("lib.infrastructure.audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_move_streams_to_source(self, mock_run):
         """Test moving streams to source."""
         from unittest.mock import MagicMock
@@ -107,3 +154,89 @@ class TestPactlClientMoveStreams:
         assert "pactl" in first_call
         assert "list" in first_call
         assert "source-outputs" in first_call
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_move_streams_reports_each_stream(self, mock_run):
+        """Test that every stream gets its own outcome in the report."""
+        def fake_run(args, deadline, **kwargs):
+            if "list" in args:
+                return MagicMock(returncode=0, stdout=source_outputs_listing(10, 11, 12))
+            if args[2] == "11":
+                return MagicMock(returncode=1, stderr="No such entity\n")
+            if args[2] == "12":
+                raise subprocess.TimeoutExpired(args, deadline.remaining(kwargs["cap"]))
+            return MagicMock(returncode=0, stderr="")
+        mock_run.side_effect = fake_run
+
+        report = PactlClient().move_streams_to_source("alsa_input.test")
+
+        outcomes = {r.stream_id: r.outcome for r in report.results}
+        assert outcomes == {
+            10: StreamMoveOutcome.MOVED,
+            11: StreamMoveOutcome.FAILED,
+            12: StreamMoveOutcome.TIMED_OUT,
+        }
+        assert report.failed()[0].error == "No such entity"
+        assert report.elapsed >= 0
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_move_streams_share_one_deadline(self, mock_run):
+        """Test that slow moves run concurrently under the overall deadline."""
+        import time
+
+        def fake_run(args, deadline, **kwargs):
+            if "list" in args:
+                return MagicMock(returncode=0, stdout=source_outputs_listing(*range(8)))
+            time.sleep(0.05)
+            return MagicMock(returncode=0, stderr="")
+        mock_run.side_effect = fake_run
+
+        client = PactlClient(move_stream_workers=8, move_deadline=1.0)
+        report = client.move_streams_to_source("alsa_input.test")
+
+        assert len(report.moved()) == 8
+        assert report.elapsed < 0.3
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_move_streams_past_deadline_time_out(self, mock_run):
+        """Test that moves still pending at the deadline are reported as timed out."""
+        import time
+
+        def fake_run(args, deadline, **kwargs):
+            if "list" in args:
+                return MagicMock(returncode=0, stdout=source_outputs_listing(1, 2))
+            time.sleep(min(deadline.remaining(kwargs["cap"]), 0.2))
+            return MagicMock(returncode=0, stderr="")
+        mock_run.side_effect = fake_run
+
+        client = PactlClient(move_stream_workers=1, move_deadline=0.1)
+        report = client.move_streams_to_source("alsa_input.test")
+
+        assert len(report.results) == 2
+        assert len(report.timed_out()) >= 1
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_move_streams_skips_target_and_excluded(self, mock_run):
+        """Test that only streams needing a move are touched."""
+        listing = (
+            source_outputs_listing(20, source=57)
+            + "\n" + source_outputs_listing(21, source=3)
+            + "\n" + source_outputs_listing(
+                22, source=3, properties={22: {"media.name": "Peak detect"}}
+            )
+        )
+
+        def fake_run(args, deadline, **kwargs):
+            if args[1:] == ["list", "source-outputs"]:
+                return MagicMock(returncode=0, stdout=listing)
+            if args[1:] == ["list", "short", "sources"]:
+                return MagicMock(returncode=0, stdout="3\talsa_input.pci\tPipeWire\n57\talsa_input.test\tPipeWire\n")
+            return MagicMock(returncode=0, stderr="")
+        mock_run.side_effect = fake_run
+
+        report = PactlClient().move_streams_to_source("alsa_input.test")
+
+        moves = [c[0][0] for c in mock_run.call_args_list if "move-source-output" in c[0][0]]
+        assert moves == [["pactl", "move-source-output", "21", "alsa_input.test"]]
+        assert [r.stream_id for r in report.moved()] == [21]
+        assert report.skipped == 2
@@ -0,0 +1,218 @@
+"""Tests for audio backend probing and selection."""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from lib.config import Config
+from lib.dependency_injection import container as container_module
+from lib.dependency_injection.container import Backend, Capability, Container
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.infrastructure.backend_probe import BackendChoiceStore, probe_latency, server_identity
+from lib.infrastructure.command_runner import CommandRunner
+
+SERVER = "PulseAudio (on PipeWire 1.0.5) 15.0.0"
+
+
+def fake_client(latency, working=True):
+    """Client whose list_sources takes ``latency`` seconds on a patched clock."""
+    client = MagicMock()
+    sources = AudioSourceList([AudioSource("mic", 1)] if working else [])
+
+    def list_sources():
+        fake_client.now += latency
+        return sources
+
+    client.list_sources.side_effect = list_sources
+    return client
+
+
+fake_client.now = 0.0
+
+
+def fake_backend(name, latency=0.01, working=True, available=True, feed=None):
+    client = fake_client(latency, working)
+    backend = Backend(
+        name, "linux", Capability.EVENT_FEED if feed else Capability.NONE,
+        MagicMock(return_value=available), MagicMock(return_value=client), feed,
+    )
+    return backend, client
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Install backends in the registry, bypassing the real clock and server lookup."""
+    monkeypatch.setattr(container_module.sys, "platform", "linux")
+    monkeypatch.setattr("lib.infrastructure.backend_probe.time.perf_counter", lambda: fake_client.now)
+    identity = MagicMock(return_value=SERVER)
+    monkeypatch.setattr(container_module, "server_identity", identity)
+
+    def install(*backends):
+        monkeypatch.setattr(container_module, "BACKENDS", tuple(backends))
+        return identity
+
+    return install
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackendChoiceStore(str(tmp_path / "backend.json"))
+
+
+class TestBackendSelection:
+    """Tests for Container.backend and audio_client."""
+
+    def test_picks_fastest_working_backend_and_saves_it(self, registry, store):
+        """Test that the fastest backend wins and its probed client is reused."""
+        slow, _ = fake_backend("pactl", latency=0.02)
+        broken, _ = fake_backend("pw-dump", latency=0.001, working=False)
+        fast, fast_client = fake_backend("pulse-native", latency=0.005)
+        registry(fast, broken, slow)
+        container = Container(backend_store=store)
+
+        assert container.audio_client() is fast_client
+        assert container.backend() is fast
+        assert fast.create.call_count == 1
+        assert store.load(SERVER) == "pulse-native"
+
+    def test_saved_choice_skips_probe(self, registry, store):
+        """Test that a saved backend is used without creating the others."""
+        native, _ = fake_backend("pulse-native")
+        pactl, _ = fake_backend("pactl")
+        registry(native, pactl)
+        store.save(SERVER, "pactl", 0.02)
+
+        assert Container(backend_store=store).backend() is pactl
+        native.create.assert_not_called()
+
+    def test_saved_choice_no_longer_available_is_reprobed(self, registry, store):
+        """Test that a saved backend that went away triggers a new probe."""
+        native, _ = fake_backend("pulse-native", latency=0.01)
+        dump, _ = fake_backend("pw-dump", available=False)
+        pactl, _ = fake_backend("pactl", latency=0.02)
+        registry(native, dump, pactl)
+        store.save(SERVER, "pw-dump", 0.001)
+
+        assert Container(backend_store=store).backend() is native
+        assert store.load(SERVER) == "pulse-native"
+
+    def test_no_working_backend_falls_back_without_saving(self, registry, store):
+        """Test falling back to the most compatible available backend."""
+        native, _ = fake_backend("pulse-native", working=False)
+        pactl, _ = fake_backend("pactl", working=False)
+        registry(native, pactl)
+
+        assert Container(backend_store=store).backend() is pactl
+        assert store.load(SERVER) is None
+
+    def test_single_available_backend_is_not_probed(self, registry, store):
+        """Test that probing is skipped when there is nothing to choose from."""
+        native, _ = fake_backend("pulse-native", available=False)
+        pactl, _ = fake_backend("pactl")
+        identity = registry(native, pactl)
+
+        assert Container(backend_store=store).backend() is pactl
+        identity.assert_not_called()
+
+    def test_config_forces_backend(self, registry, store):
+        """Test that a configured backend is used as is."""
+        native, _ = fake_backend("pulse-native")
+        pactl, _ = fake_backend("pactl", available=False)
+        registry(native, pactl)
+
+        container = Container(Config(audio_backend="pactl"), backend_store=store)
+
+        assert container.backend() is pactl
+        pactl.is_available.assert_not_called()
+        native.create.assert_not_called()
+
+    def test_forced_backend_of_other_platform(self, registry, store):
+        """Test that forcing a backend the platform lacks is an error."""
+        registry(fake_backend("pactl")[0])
+
+        with pytest.raises(RuntimeError, match="macos"):
+            Container(Config(audio_backend="macos"), backend_store=store).backend()
+
+    def test_event_feed_follows_backend(self, registry, store):
+        """Test that a backend's own feed is used, and pactl subscribe otherwise."""
+        feed = MagicMock(return_value=("reader", "parser"))
+        dump, _ = fake_backend("pw-dump", feed=feed)
+        native, _ = fake_backend("pulse-native")
+        registry(dump, native)
+
+        assert Container(Config(audio_backend="pw-dump"), backend_store=store).event_feed() == ("reader", "parser")
+        reader, parser = Container(Config(audio_backend="pulse-native"), backend_store=store).event_feed()
+        assert type(reader).__name__ == "PactlSubscribeReader"
+
+    def test_rejects_unknown_backend_name(self):
+        """Test Config validation of audio_backend."""
+        with pytest.raises(ValueError, match="audio_backend"):
+            Config(audio_backend="jack")
+
+
+class TestBackendProbe:
+    """Tests for the probe helpers and the choice store."""
+
+    def test_probe_latency_takes_best_attempt(self, monkeypatch):
+        """Test that the best of several round trips is reported."""
+        times = iter([0.0, 0.05, 1.0, 1.01, 2.0, 2.03])
+        monkeypatch.setattr("lib.infrastructure.backend_probe.time.perf_counter", lambda: next(times))
+        client = MagicMock()
+        client.list_sources.return_value = AudioSourceList([AudioSource("mic", 1)])
+
+        assert probe_latency(client) == pytest.approx(0.01)
+
+    def test_probe_latency_bypasses_client_cache(self):
+        """Test that a client caching its list is made to list anew on every attempt."""
+        client = MagicMock()
+        client.list_sources.return_value = AudioSourceList([AudioSource("mic", 1)])
+
+        probe_latency(client, attempts=3)
+
+        assert client.invalidate.call_count == 3
+
+    def test_probe_latency_empty_list_is_not_working(self):
+        """Test that a backend listing nothing does not qualify."""
+        client = MagicMock()
+        client.list_sources.return_value = AudioSourceList([])
+
+        assert probe_latency(client) is None
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_server_identity(self, mock_run):
+        """Test reading server name and version from pactl info."""
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout=(
+                "Server String: /run/user/1000/pulse/native\n"
+                "Server Name: PulseAudio (on PipeWire 1.0.5)\n"
+                "Server Version: 15.0.0\n"
+                "Default Source: alsa_input.pci-0000_00_1f.3.analog-stereo\n"
+            ),
+        )
+
+        assert server_identity(CommandRunner()) == SERVER
+        assert mock_run.call_args.kwargs["operation"] == "info"
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run", side_effect=FileNotFoundError("pactl"))
+    def test_server_identity_without_pactl(self, mock_run):
+        """Test that a missing pactl leaves the server unidentified."""
+        assert server_identity(CommandRunner()) is None
+
+    def test_store_round_trip_keeps_other_servers(self, store):
+        """Test that choices are kept per server."""
+        store.save(SERVER, "pulse-native", 0.0012345678)
+        store.save("PulseAudio 17.0", "pactl", 0.02)
+
+        assert store.load(SERVER) == "pulse-native"
+        assert store.load("PulseAudio 17.0") == "pactl"
+        assert json.loads(open(store.path).read())[SERVER]["latency"] == 0.001235
+
+    def test_store_ignores_corrupt_file(self, store):
+        """Test that an unreadable file counts as no saved choice."""
+        with open(store.path, "w") as f:
+            f.write("{not json")
+
+        assert store.load(SERVER) is None
+        store.save(SERVER, "pactl", 0.02)
+        assert store.load(SERVER) == "pactl"
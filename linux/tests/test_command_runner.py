@@ -0,0 +1,255 @@
+"""Tests for running commands under a shared deadline."""
+import json
+import subprocess
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from lib.domain.circuit_breaker import CircuitBreaker, CircuitState
+from lib.domain.latency import AdaptiveTimeouts
+from lib.infrastructure.audio_service import PactlClient
+from lib.infrastructure.command_runner import CircuitOpenError, CommandRunner, Deadline, operation_deadline
+from lib.infrastructure.latency_store import LatencyStore
+
+
+def process_running(pid):
+    """Check for a live process; killed orphans may linger as zombies until reaped."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rpartition(")")[2].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+class TestDeadline:
+    """Tests for Deadline and operation budgets."""
+
+    def test_remaining_is_capped(self):
+        """Test that a cap bounds the time left for one call."""
+        deadline = Deadline.after(10)
+
+        assert 9 < deadline.remaining() <= 10
+        assert deadline.remaining(0.5) == 0.5
+        assert not deadline.expired()
+
+    def test_expired_deadline_has_nothing_left(self):
+        """Test a deadline in the past."""
+        deadline = Deadline(time.monotonic() - 1)
+
+        assert deadline.remaining() == 0
+        assert deadline.expired()
+
+    def test_operation_bounds_later_deadlines(self):
+        """Test that deadlines created inside an operation never outlast it."""
+        with operation_deadline(0.2) as operation:
+            assert Deadline.after(5) is operation
+            assert Deadline.after(0.05).expires_at < operation.expires_at
+
+        assert Deadline.after(5).remaining() > 4
+
+
+class TestCommandRunner:
+    """Tests for CommandRunner against real processes."""
+
+    def test_returns_output_and_timings(self):
+        """Test that output, exit code and spawn and wait times are reported."""
+        result = CommandRunner().run(["sh", "-c", "echo out; echo err >&2; exit 3"], Deadline.after(5))
+
+        assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "err\n")
+        assert result.spawn_time > 0
+        assert result.wait_time > 0
+
+    def test_bytes_output(self):
+        """Test that output can be kept as bytes."""
+        result = CommandRunner().run(["printf", "caf\\303\\251"], Deadline.after(5), text=False)
+
+        assert result.stdout == "café".encode()
+
+    def test_passes_environment(self):
+        """Test that the given environment reaches the command."""
+        result = CommandRunner().run(["sh", "-c", "echo $LC_ALL"], Deadline.after(5), env={"LC_ALL": "C"})
+
+        assert result.stdout == "C\n"
+
+    def test_kills_process_group_when_budget_runs_out(self, tmp_path):
+        """Test that the command and its children are killed at the deadline."""
+        pid_file = tmp_path / "child.pid"
+        started = time.monotonic()
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            CommandRunner().run(
+                ["sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait"], Deadline.after(5), cap=0.3
+            )
+
+        assert time.monotonic() - started < 2
+        assert not process_running(int(pid_file.read_text()))
+
+    def test_kills_children_ignoring_terminate(self, tmp_path):
+        """Test that a command ignoring SIGTERM is killed after the grace period."""
+        with pytest.raises(subprocess.TimeoutExpired):
+            CommandRunner().run(["sh", "-c", "trap '' TERM; sleep 30"], Deadline.after(0.2))
+
+    def test_spent_budget_does_not_spawn(self, tmp_path):
+        """Test that no process is started once the deadline has passed."""
+        marker = tmp_path / "ran"
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            CommandRunner().run(["touch", str(marker)], Deadline(time.monotonic() - 1))
+
+        assert not marker.exists()
+
+    def test_missing_command(self):
+        """Test that a missing executable raises OSError."""
+        with pytest.raises(OSError):
+            CommandRunner().run(["mic-select-no-such-command"], Deadline.after(5))
+
+
+class TestRunnerCircuitBreaker:
+    """Tests for failing fast while commands keep timing out."""
+
+    def test_timeouts_open_breaker_and_fail_fast(self, tmp_path):
+        """Test that once the breaker opens, commands are skipped without waiting."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        runner = CommandRunner(breaker=breaker)
+        for _ in range(2):
+            with pytest.raises(subprocess.TimeoutExpired):
+                runner.run(["sleep", "30"], Deadline.after(5), cap=0.05)
+        assert breaker.state is CircuitState.OPEN
+
+        marker = tmp_path / "ran"
+        started = time.monotonic()
+        with pytest.raises(CircuitOpenError):
+            runner.run(["touch", str(marker)], Deadline.after(5))
+
+        assert time.monotonic() - started < 0.05
+        assert not marker.exists()
+
+    def test_timeout_cut_short_by_operation_is_not_a_failure(self):
+        """Test that running out of a shared deadline does not open the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        runner = CommandRunner(breaker=breaker)
+
+        with operation_deadline(0.05) as deadline:
+            with pytest.raises(subprocess.TimeoutExpired):
+                runner.run(["sleep", "5"], deadline, cap=1)
+
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_completed_trial_closes_breaker(self):
+        """Test that a command finishing after the reset timeout closes the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        runner = CommandRunner(breaker=breaker)
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run(["sleep", "30"], Deadline.after(5), cap=0.05)
+        time.sleep(0.02)
+
+        assert runner.run(["true"], Deadline.after(5)).returncode == 0
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_open_breaker_reads_as_timeout(self):
+        """Test that clients handle a skipped command like a timeout."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure(time.monotonic())
+        client = PactlClient(runner=CommandRunner(breaker=breaker))
+
+        assert client.list_sources().is_empty()
+        assert client.get_default_source() is None
+
+
+class TestAdaptiveRunner:
+    """Tests for recording latencies and handing out learned timeouts."""
+
+    def test_records_named_operations(self):
+        """Test that successful and timed-out commands are both recorded."""
+        observed = []
+        timeouts = AdaptiveTimeouts(min_samples=1)
+        runner = CommandRunner(timeouts, on_observed=lambda: observed.append(timeouts.unsaved))
+
+        runner.run(["true"], Deadline.after(5), operation="true")
+        runner.run(["true"], Deadline.after(5))
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner.run(["sleep", "5"], Deadline.after(5), cap=0.1, operation="sleep")
+
+        stats = timeouts.percentiles()
+        assert stats["true"]["samples"] == 1
+        assert stats["sleep"]["p50"] >= 0.1
+        assert observed == [1, 2]
+
+    def test_timeout_cut_short_by_operation_is_not_recorded(self):
+        """Test that a timeout caused by the operation's deadline is not taken as a latency."""
+        timeouts = AdaptiveTimeouts(min_samples=1)
+        runner = CommandRunner(timeouts)
+
+        with operation_deadline(0.05):
+            with pytest.raises(subprocess.TimeoutExpired):
+                runner.run(["sleep", "5"], Deadline.after(1), operation="sleep")
+        with operation_deadline(0.05) as deadline:
+            with pytest.raises(subprocess.TimeoutExpired):
+                runner.run(["sleep", "5"], deadline, cap=1, operation="sleep")
+
+        assert "sleep" not in timeouts.percentiles()
+
+    def test_budget_falls_back_to_default(self):
+        """Test budgets without adaptive timeouts or before learning."""
+        assert CommandRunner().budget("list", 0.3) == 0.3
+        assert CommandRunner(AdaptiveTimeouts()).budget("list", 0.3) == 0.3
+
+    def test_pactl_client_uses_learned_timeout(self):
+        """Test that a slow host gets a longer listing timeout than the configured one."""
+        timeouts = AdaptiveTimeouts(ceiling=2.0, min_samples=1)
+        timeouts.observe("list-sources", 0.4)
+        runner = CommandRunner(timeouts)
+        deadlines = []
+        runner.run = lambda args, deadline, **kwargs: deadlines.append(deadline) or Mock(returncode=1, stderr=b"")
+
+        PactlClient(timeout=0.3, runner=runner).list_sources()
+
+        assert deadlines[0].remaining() > 1.0
+
+
+class TestLatencyStore:
+    """Tests for persisting learned latencies."""
+
+    def test_round_trip_per_host(self, tmp_path):
+        """Test that each host keeps its own histograms."""
+        path = str(tmp_path / "latency.json")
+        timeouts = AdaptiveTimeouts(min_samples=1)
+        timeouts.observe("list-sources", 0.02)
+        LatencyStore(path, host="laptop").save(timeouts)
+        other = AdaptiveTimeouts(min_samples=1)
+        other.observe("list-sources", 0.5)
+        LatencyStore(path, host="desktop").save(other)
+
+        restored = AdaptiveTimeouts(min_samples=1)
+        LatencyStore(path, host="laptop").load(restored)
+
+        assert restored.timeout("list-sources", 9) == timeouts.timeout("list-sources", 9)
+        assert timeouts.unsaved == 0
+
+    def test_ignores_other_bucket_layout_and_garbage(self, tmp_path):
+        """Test that incompatible or malformed state is not loaded."""
+        path = tmp_path / "latency.json"
+        path.write_text(json.dumps({
+            "laptop": {"buckets": [0.002, 2], "operations": {"list-sources": [30] * 50}},
+            "desktop": {"buckets": LatencyStore._layout(), "operations": {"list-sources": ["x"]}},
+        }))
+
+        for host in ["laptop", "desktop"]:
+            timeouts = AdaptiveTimeouts(min_samples=1)
+            LatencyStore(str(path), host=host).load(timeouts)
+            assert timeouts.percentiles() == {}
+
+    def test_saves_in_batches(self, tmp_path):
+        """Test that samples are written every SAVE_EVERY observations and on flush."""
+        path = tmp_path / "latency.json"
+        store = LatencyStore(str(path), host="laptop")
+        timeouts = AdaptiveTimeouts()
+
+        timeouts.observe("list-sources", 0.01)
+        store.save_if_due(timeouts)
+        assert not path.exists()
+
+        store.flush(timeouts)
+        assert path.exists()
+        assert timeouts.unsaved == 0
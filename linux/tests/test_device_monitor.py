@@ -0,0 +1,291 @@
+"""Unit tests for the pactl subscribe device monitor."""
+import os
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from lib.domain.device_event import CacheFreshness, DeviceEvent, DeviceEventType, DeviceFacility
+from lib.domain.event_coalescer import EventCoalescer
+from lib.infrastructure.device_monitor import (
+    DeviceChangeNotifier,
+    PactlEventParser,
+    PactlSubscribeReader,
+    PulseAudioDeviceMonitor,
+    ReconnectBackoff,
+)
+
+
+class FakeReader:
+    """Reader serving fixed subscribe lines through a real pipe."""
+
+    def __init__(self, lines, close=True):
+        self._data = "".join(lines).encode()
+        self._close = close
+        self._read_fd = None
+        self._write_fd = None
+        self.starts = 0
+        self.terminations = 0
+
+    def start(self):
+        self.starts += 1
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.write(self._write_fd, self._data)
+        if self._close:
+            os.close(self._write_fd)
+            self._write_fd = None
+
+    def fileno(self):
+        return self._read_fd
+
+    def read_lines(self):
+        try:
+            chunk = os.read(self._read_fd, 4096)
+        except BlockingIOError:
+            return []
+        return chunk.decode().splitlines() if chunk else None
+
+    def terminate(self):
+        self.terminations += 1
+        os.close(self._read_fd)
+        if self._write_fd is not None:
+            os.close(self._write_fd)
+            self._write_fd = None
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+class TestPactlEventParser:
+    """Tests for PactlEventParser."""
+
+    @pytest.fixture
+    def parser(self):
+        return PactlEventParser()
+
+    def test_parse_source_event(self, parser):
+        """Test parsing type, facility and index."""
+        event = parser.parse("Event 'remove' on source #57\n")
+
+        assert event == DeviceEvent(DeviceEventType.REMOVE, DeviceFacility.SOURCE, 57)
+
+    def test_parse_source_output_is_distinct_from_source(self, parser):
+        """Test that capture stream events are not mistaken for source events."""
+        event = parser.parse("Event 'new' on source-output #88")
+
+        assert event.facility is DeviceFacility.SOURCE_OUTPUT
+        assert not event.affects_sources()
+
+    def test_parse_server_event_without_index(self, parser):
+        """Test that the invalid index sentinel is mapped to None."""
+        event = parser.parse("Event 'change' on server #4294967295")
+
+        assert event == DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SERVER, None)
+        assert event.affects_sources()
+
+    def test_parse_card_event(self, parser):
+        """Test that card events are parsed but do not touch sources."""
+        event = parser.parse("Event 'change' on card #3")
+
+        assert event.facility is DeviceFacility.CARD
+        assert not event.affects_sources()
+
+    @pytest.mark.parametrize("line", ["", "garbage", "Event 'explode' on source #1", "Event 'new' on toaster #1"])
+    def test_parse_rejects_unknown_lines(self, parser, line):
+        """Test that unrecognised lines are ignored."""
+        assert parser.parse(line) is None
+
+
+class TestPulseAudioDeviceMonitor:
+    """Tests for PulseAudioDeviceMonitor event delivery."""
+
+    def test_only_source_and_server_events_are_notified(self):
+        """Test that stream churn does not reach the notifier."""
+        callback = Mock()
+        reader = FakeReader([
+            "Event 'new' on source-output #88\n",
+            "Event 'remove' on source-output #88\n",
+            "Event 'new' on source #12\n",
+            "Event 'change' on server #4294967295\n",
+        ], close=False)
+        monitor = PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(callback),
+            reader,
+            PactlEventParser(),
+            coalescer=EventCoalescer(window=0.0, min_interval=0.0),
+        )
+
+        monitor.start()
+        assert wait_until(lambda: callback.called)
+        monitor.stop()
+
+        events = callback.call_args.args[0]
+        assert [e.facility for e in events] == [DeviceFacility.SOURCE, DeviceFacility.SERVER]
+
+    def test_burst_is_delivered_as_one_batch(self):
+        """Test that a hot-plug burst reaches the notifier once."""
+        callback = Mock()
+        lines = ["Event 'change' on source #3\n"] * 40 + ["Event 'change' on server #4294967295\n"]
+        monitor = PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(callback),
+            FakeReader(lines, close=False),
+            PactlEventParser(),
+            coalescer=EventCoalescer(window=0.05, min_interval=0.0),
+        )
+
+        monitor.start()
+        assert wait_until(lambda: callback.called)
+        time.sleep(0.1)
+        monitor.stop()
+
+        callback.assert_called_once()
+        assert len(callback.call_args.args[0]) == 2
+
+    def test_stop_is_immediate_and_terminates_reader(self):
+        """Test that stop wakes the loop instead of waiting for output."""
+        reader = FakeReader([], close=False)
+        monitor = PulseAudioDeviceMonitor(DeviceChangeNotifier(), reader, PactlEventParser())
+        monitor.start()
+        assert wait_until(lambda: monitor.freshness is CacheFreshness.LIVE)
+
+        started = time.monotonic()
+        monitor.stop()
+
+        assert time.monotonic() - started < 0.2
+        assert not monitor._monitor_thread.is_alive()
+        assert reader.terminations == 1
+        assert monitor.freshness is CacheFreshness.DEGRADED
+
+
+class TestMonitorRecovery:
+    """Tests for subscription restart, resync and freshness reporting."""
+
+    def test_subscription_is_restarted_and_resynced(self):
+        """Test that every (re)connect is followed by a full resync."""
+        reader = FakeReader(["Event 'new' on source #12\n"])
+        resyncs = []
+        monitor = PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(Mock()),
+            reader,
+            PactlEventParser(),
+            resync=lambda: resyncs.append(monitor.freshness),
+            backoff=ReconnectBackoff(base=0.001, cap=0.001),
+        )
+
+        monitor.start()
+        assert wait_until(lambda: len(resyncs) >= 3)
+        monitor.stop()
+
+        assert reader.starts >= 3
+        assert reader.terminations == reader.starts
+        assert resyncs[0] is CacheFreshness.RESYNCING
+
+    def test_failed_resync_does_not_go_live(self):
+        """Test that a resync error drops the connection for a retry."""
+        reader = FakeReader([], close=False)
+        resync = Mock(side_effect=RuntimeError("boom"))
+        monitor = PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(),
+            reader,
+            PactlEventParser(),
+            resync=resync,
+            backoff=ReconnectBackoff(base=60, cap=60, rand=lambda: 1.0),
+        )
+
+        monitor.start()
+        assert wait_until(lambda: reader.terminations == 1)
+        assert monitor.freshness is CacheFreshness.DEGRADED
+        monitor.stop()
+
+        assert reader.starts == 1
+
+    def test_freshness_changes_are_reported(self):
+        """Test that every freshness change reaches the callback, once."""
+        reader = FakeReader([], close=False)
+        changes = []
+        monitor = PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(),
+            reader,
+            PactlEventParser(),
+            resync=Mock(),
+            on_freshness=changes.append,
+        )
+
+        monitor.start()
+        assert wait_until(lambda: monitor.freshness is CacheFreshness.LIVE)
+        monitor.stop()
+
+        assert changes == [CacheFreshness.RESYNCING, CacheFreshness.LIVE, CacheFreshness.DEGRADED]
+
+    def test_stop_interrupts_backoff(self):
+        """Test that stop does not wait for a pending reconnect delay."""
+        monitor = PulseAudioDeviceMonitor(
+            DeviceChangeNotifier(),
+            FakeReader([]),
+            PactlEventParser(),
+            backoff=ReconnectBackoff(base=60, cap=60, rand=lambda: 1.0),
+        )
+        monitor.start()
+        assert wait_until(lambda: monitor._reconnect_at is not None)
+
+        started = time.monotonic()
+        monitor.stop()
+
+        assert time.monotonic() - started < 0.2
+
+
+class TestReconnectBackoff:
+    """Tests for ReconnectBackoff."""
+
+    def test_delays_grow_exponentially_up_to_cap(self):
+        """Test the jitter ceiling doubling and capping."""
+        backoff = ReconnectBackoff(base=0.5, cap=4.0, rand=lambda: 1.0)
+
+        assert [backoff.next_delay() for _ in range(6)] == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+
+    def test_jitter_and_reset(self):
+        """Test that delays are scaled by the jitter and reset after recovery."""
+        backoff = ReconnectBackoff(base=1.0, cap=30.0, rand=lambda: 0.25)
+        backoff.next_delay()
+        backoff.next_delay()
+
+        backoff.reset()
+
+        assert backoff.next_delay() == 0.25
+
+
+class TestPactlSubscribeReader:
+    """Tests for PactlSubscribeReader against a stand-in pactl."""
+
+    @pytest.fixture
+    def fake_pactl(self, tmp_path, monkeypatch):
+        script = tmp_path / "pactl"
+        script.write_text(
+            "#!/bin/sh\n"
+            "printf \"Event 'new' on source #5\\nEvent 'remove' on sou\"\n"
+            "exec sleep 30\n"
+        )
+        script.chmod(0o755)
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    def test_reads_complete_lines_and_reaps_child(self, fake_pactl):
+        """Test non-blocking reads and that terminate reaps the process."""
+        reader = PactlSubscribeReader()
+        reader.start()
+        process = reader._process
+        try:
+            lines = []
+            assert wait_until(lambda: lines.extend(reader.read_lines()) or lines)
+            assert lines == ["Event 'new' on source #5"]
+            assert reader.read_lines() == []
+        finally:
+            reader.terminate()
+
+        assert process.returncode is not None
@@ -0,0 +1,175 @@
+"""Unit tests for the pactl list sources parser."""
+from unittest.mock import MagicMock, patch
+
+from lib.infrastructure.audio_service import PactlClient
+from lib.infrastructure.pactl_parser import parse_short_sources, parse_sources
+
+LISTING = (
+    "Source #0\n"
+    "\tState: SUSPENDED\n"
+    "\tName: alsa_output.pci-0000_00_1f.3.analog-stereo.monitor\n"
+    "\tDescription: Monitor of Built-in Audio Analog Stereo\n"
+    "\tDriver: PipeWire\n"
+    "\tSample Specification: s32le 2ch 48000Hz\n"
+    "\tProperties:\n"
+    "\t\tdevice.class = \"monitor\"\n"
+    "\tFormats:\n"
+    "\t\tpcm\n"
+    "\n"
+    "Source #57\n"
+    "\tState: RUNNING\n"
+    "\tName: alsa_input.usb-ME6S-00.mono-fallback\n"
+    "\tDescription: Mikrofón ME6S\n"
+    "\tSample Specification: s16le 1ch 48000Hz\n"
+    "\tProperties:\n"
+    "\t\talsa.card = \"2\"\n"
+    "\t\tdevice.description = \"Mikrofón ME6S\"\n"
+    "\tPorts:\n"
+    "\t\tanalog-input-mic: Microphone (type: Mic, priority: 8700, available)\n"
+    "\tActive Port: analog-input-mic\n"
+    "\tFormats:\n"
+    "\t\tpcm\n"
+)
+
+
+class TestParseSources:
+    """Tests for parse_sources."""
+
+    def test_eager_fields(self):
+        """Test index, name and description extraction."""
+        records = parse_sources(LISTING.encode())
+
+        assert [(r.index, r.name) for r in records] == [
+            (0, "alsa_output.pci-0000_00_1f.3.analog-stereo.monitor"),
+            (57, "alsa_input.usb-ME6S-00.mono-fallback"),
+        ]
+        assert records[1].description == "Mikrofón ME6S"
+
+    def test_accepts_text(self):
+        """Test that decoded output parses the same as bytes."""
+        assert [r.name for r in parse_sources(LISTING)] == [r.name for r in parse_sources(LISTING.encode())]
+
+    def test_lazy_fields(self):
+        """Test state, sample spec, properties and ports on demand."""
+        record = parse_sources(LISTING.encode())[1]
+
+        assert record.state == "RUNNING"
+        assert record.sample_spec == "s16le 1ch 48000Hz"
+        assert record.properties == {"alsa.card": "2", "device.description": "Mikrofón ME6S"}
+        assert record.ports == {"analog-input-mic": "Microphone"}
+        assert record.active_port == "analog-input-mic"
+
+    def test_lazy_fields_stay_inside_their_block(self):
+        """Test that a block without ports does not see the next block's."""
+        record = parse_sources(LISTING.encode())[0]
+
+        assert record.ports == {}
+        assert record.active_port is None
+        assert record.properties == {"device.class": "monitor"}
+
+    def test_block_without_name_is_skipped(self):
+        """Test that incomplete blocks are ignored."""
+        records = parse_sources(b"Source #1\n\tState: IDLE\nSource #2\n\tName: alsa_input.x\n")
+
+        assert [r.index for r in records] == [2]
+
+    def test_garbage_before_first_block(self):
+        """Test that leading noise is skipped."""
+        records = parse_sources(b"warning: something\nSource #3\n\tName: alsa_input.x\n")
+
+        assert [r.index for r in records] == [3]
+
+    def test_empty_output(self):
+        """Test that empty output yields no records."""
+        assert parse_sources(b"") == []
+
+
+    def test_parse_short_sources(self):
+        """Test index and name extraction from the short listing."""
+        output = (
+            b"0\talsa_output.pci.monitor\tPipeWire\ts32le 2ch 48000Hz\tSUSPENDED\n"
+            b"57\talsa_input.usb-ME6S-00.mono-fallback\tPipeWire\ts16le 1ch 48000Hz\tRUNNING\n"
+            b"garbage\n"
+        )
+
+        assert parse_short_sources(output) == [
+            (0, "alsa_output.pci.monitor"),
+            (57, "alsa_input.usb-ME6S-00.mono-fallback"),
+        ]
+
+
+SHORT_LISTING = (
+    "0\talsa_output.pci-0000_00_1f.3.analog-stereo.monitor\tPipeWire\ts32le 2ch 48000Hz\tSUSPENDED\n"
+    "57\talsa_input.usb-ME6S-00.mono-fallback\tPipeWire\ts16le 1ch 48000Hz\tRUNNING\n"
+)
+
+
+def pactl_listings(calls):
+    """CommandRunner.run stand-in serving the short and full listings."""
+    def run(args, deadline, **kwargs):
+        calls.append(args)
+        stdout = SHORT_LISTING if "short" in args else LISTING
+        return MagicMock(returncode=0, stdout=stdout.encode())
+    return run
+
+
+class TestPactlClientTwoTierListing:
+    """Tests for the short-listing-first mode of PactlClient."""
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_full_listing_only_when_descriptions_are_missing(self, mock_run):
+        """Test that descriptions are memoized by index and a cold memo lists in full once."""
+        calls = []
+        mock_run.side_effect = pactl_listings(calls)
+        client = PactlClient(two_tier_listing=True)
+
+        first = client.list_sources()
+        second = client.list_sources()
+
+        assert first == second
+        assert second.sources[0].description == "Mikrofón ME6S"
+        assert calls == [
+            ["pactl", "list", "sources"],
+            ["pactl", "list", "short", "sources"],
+        ]
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_invalidated_source_is_described_again(self, mock_run):
+        """Test that a change event for an index drops its description."""
+        calls = []
+        mock_run.side_effect = pactl_listings(calls)
+        client = PactlClient(two_tier_listing=True)
+        client.list_sources()
+
+        client.invalidate_source(57)
+        client.list_sources()
+
+        assert calls[-1] == ["pactl", "list", "sources"]
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_reused_index_is_described_again(self, mock_run):
+        """Test that a different name under a known index is not trusted."""
+        calls = []
+        mock_run.side_effect = pactl_listings(calls)
+        client = PactlClient(two_tier_listing=True)
+        client.list_sources()
+
+        client._descriptions[57] = ("alsa_input.other", "Other")
+        client.list_sources()
+
+        assert calls[-1] == ["pactl", "list", "sources"]
+
+
+class TestPactlClientLocale:
+    """Tests for the forced C locale."""
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_list_sources_forces_c_locale(self, mock_run, monkeypatch):
+        """Test that pactl runs untranslated and bytes output is parsed."""
+        monkeypatch.setenv("LANG", "de_DE.UTF-8")
+        mock_run.return_value = MagicMock(returncode=0, stdout=LISTING.encode())
+
+        result = PactlClient().list_sources()
+
+        assert mock_run.call_args.kwargs["env"]["LC_ALL"] == "C"
+        assert [s.index for s in result.sources] == [57]
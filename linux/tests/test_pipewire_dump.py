@@ -0,0 +1,213 @@
+"""Tests for the pw-dump PipeWire client against recorded fixtures."""
+import json
+import os
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+from lib.domain.stream_move import DEFAULT_STREAM_EXCLUSIONS, StreamExclusionPolicy, StreamMoveOutcome
+from lib.infrastructure.pipewire_dump import (
+    PipeWireDumpClient,
+    PipeWireSnapshot,
+    PwDumpEventParser,
+    PwDumpMonitorReader,
+)
+from tests.test_device_monitor import wait_until
+
+FIXTURES = Path(__file__).parent / "fixtures"
+USB_MIC = "alsa_input.usb-Blue_Microphones_Yeti_Stereo_Microphone-00.analog-stereo"
+BUILTIN_MIC = "alsa_input.pci-0000_00_1f.3.analog-stereo"
+
+
+@pytest.fixture
+def fake_pipewire(tmp_path, monkeypatch):
+    """Put the stand-in pw-dump and pw-metadata first on PATH; yields the pw-metadata call log."""
+    log = tmp_path / "pw-metadata.log"
+    log.write_text("")
+    monkeypatch.setenv("PATH", f"{FIXTURES / 'bin'}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("PW_METADATA_LOG", str(log))
+    return log
+
+
+def recorded_snapshot():
+    return PipeWireSnapshot.parse((FIXTURES / "pw-dump.json").read_bytes())
+
+
+class TestPipeWireSnapshot:
+    """Tests for building the client's view from one pw-dump snapshot."""
+
+    def test_sources_from_source_nodes(self):
+        """Test that only Audio/Source nodes become sources, described by description or nick."""
+        sources = recorded_snapshot().sources
+
+        assert [(s.index, s.name, s.description) for s in sources] == [
+            (56, BUILTIN_MIC, "Built-in Audio Analog Stereo"),
+            (61, USB_MIC, "Yeti Stereo Microphone"),
+            (70, "echo-cancel-source", "Echo-Cancel Source"),
+        ]
+
+    def test_default_source_from_metadata(self):
+        """Test reading the default source from the default metadata."""
+        assert recorded_snapshot().default_source == USB_MIC
+
+    def test_default_source_value_given_as_json_text(self):
+        """Test metadata values that pw-dump leaves as JSON strings."""
+        snapshot = PipeWireSnapshot([{
+            "id": 1,
+            "type": "PipeWire:Interface:Metadata",
+            "props": {"metadata.name": "default"},
+            "metadata": [{"subject": 0, "key": "default.audio.source", "value": '{"name": "mic"}'}],
+        }])
+
+        assert snapshot.default_source == "mic"
+
+    def test_stream_placement_from_links(self):
+        """Test that capture streams are placed on the source they are linked from."""
+        outputs = {output.index: output for output in recorded_snapshot().source_outputs}
+
+        assert {index: output.source_index for index, output in outputs.items()} == {80: 56, 85: 61, 90: -1}
+        assert outputs[85].properties["stream.monitor"] == "true"
+        assert StreamExclusionPolicy.from_strings(DEFAULT_STREAM_EXCLUSIONS).excludes(outputs[85])
+
+    def test_rejects_non_array_output(self):
+        """Test that output other than an object array is an error."""
+        with pytest.raises(ValueError):
+            PipeWireSnapshot.parse(b'{"id": 1}')
+
+
+class TestPipeWireDumpClient:
+    """Tests for PipeWireDumpClient against the stand-in pw-dump."""
+
+    def test_list_sources(self, fake_pipewire):
+        """Test listing sources from a real pw-dump process."""
+        sources = PipeWireDumpClient(timeout=5).list_sources()
+
+        assert [s.name for s in sources.sources] == [BUILTIN_MIC, USB_MIC, "echo-cancel-source"]
+
+    def test_get_default_source(self, fake_pipewire):
+        """Test getting the default source from the same snapshot format."""
+        assert PipeWireDumpClient(timeout=5).get_default_source() == USB_MIC
+
+    def test_set_default_source(self, fake_pipewire):
+        """Test that the configured default is written to the default metadata."""
+        PipeWireDumpClient(set_source_timeout=5).set_default_source(BUILTIN_MIC)
+
+        assert fake_pipewire.read_text().splitlines() == [
+            f'-n default 0 default.configured.audio.source {{"name": "{BUILTIN_MIC}"}} Spa:String:JSON'
+        ]
+
+    def test_move_streams_uses_one_snapshot(self, fake_pipewire):
+        """Test that streams on other sources are retargeted and excluded ones skipped."""
+        client = PipeWireDumpClient(
+            move_stream_timeout=5,
+            move_deadline=10,
+            exclusion_policy=StreamExclusionPolicy.from_strings(DEFAULT_STREAM_EXCLUSIONS),
+        )
+
+        report = client.move_streams_to_source(USB_MIC)
+
+        assert [(r.stream_id, r.outcome) for r in sorted(report.results, key=lambda r: r.stream_id)] == [
+            (80, StreamMoveOutcome.MOVED),
+            (90, StreamMoveOutcome.MOVED),
+        ]
+        assert report.skipped == 1
+        assert sorted(fake_pipewire.read_text().splitlines()) == [
+            f"80 target.object {USB_MIC}",
+            f"90 target.object {USB_MIC}",
+        ]
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_list_sources_failure(self, mock_run):
+        """Test that a failing pw-dump yields an empty list."""
+        mock_run.return_value.returncode = 1
+        mock_run.return_value.stderr = b"no pipewire"
+
+        assert PipeWireDumpClient().list_sources().is_empty()
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_list_sources_bad_json(self, mock_run):
+        """Test that unparsable output yields an empty list."""
+        mock_run.return_value.returncode = 0
+        mock_run.return_value.stdout = b"[{"
+
+        assert PipeWireDumpClient().list_sources().is_empty()
+
+
+class TestPwDumpMonitorReader:
+    """Tests for reading pw-dump --monitor output."""
+
+    def test_reads_objects_of_complete_arrays(self, fake_pipewire):
+        """Test that every object of the streamed arrays is returned once."""
+        reader = PwDumpMonitorReader()
+        reader.start()
+        try:
+            lines = []
+            assert wait_until(lambda: lines.extend(reader.read_lines()) or len(lines) >= 16)
+            assert reader.read_lines() == []
+        finally:
+            reader.terminate()
+
+        ids = [json.loads(line)["id"] for line in lines]
+        assert ids[-4:] == [61, 70, 103, 42]
+
+    def test_keeps_partial_array_for_next_read(self):
+        """Test that an array split across reads is decoded once complete."""
+        reader = PwDumpMonitorReader()
+        chunks = [b'[\n  {"id": 1, "info": nu', b'll}\n]\n[ {"id"', b": 2}]\n", b""]
+        reader.read_chunk = lambda: chunks.pop(0) or None
+
+        assert reader.read_lines() == []
+        assert reader.read_lines() == ['{"id":1,"info":null}']
+        assert reader.read_lines() == ['{"id":2}']
+        assert reader.read_lines() is None
+
+    def test_partial_array_is_decoded_once(self, monkeypatch):
+        """Test that a dump arriving in small chunks is only decoded when complete."""
+        text = json.dumps([{"id": i, "info": {"props": {"node.description": 'Mic "[x]" \\ {y}'}}} for i in range(50)])
+        data = text.encode()
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)] + [b""]
+        reader = PwDumpMonitorReader()
+        reader.read_chunk = lambda: chunks.pop(0) or None
+        loads = Mock(wraps=json.loads)
+        monkeypatch.setattr("lib.infrastructure.pipewire_dump.json.loads", loads)
+
+        lines = []
+        while (read := reader.read_lines()) is not None:
+            lines.extend(read)
+
+        assert loads.call_count == 1
+        assert [json.loads(line)["id"] for line in lines] == list(range(50))
+
+
+class TestPwDumpEventParser:
+    """Tests for turning pw-dump objects into device events."""
+
+    def events(self, parser, path):
+        reader = PwDumpMonitorReader()
+        chunks = [path.read_bytes(), b""]
+        reader.read_chunk = lambda: chunks.pop(0) or None
+        return [event for event in map(parser.parse, reader.read_lines()) if event]
+
+    def test_monitor_feed(self):
+        """Test new sources, the source change and removal, and the default change."""
+        events = self.events(PwDumpEventParser(), FIXTURES / "pw-dump-monitor.json")
+
+        assert events == [
+            DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SERVER),
+            DeviceEvent(DeviceEventType.NEW, DeviceFacility.SOURCE, 56),
+            DeviceEvent(DeviceEventType.NEW, DeviceFacility.SOURCE, 61),
+            DeviceEvent(DeviceEventType.NEW, DeviceFacility.SOURCE, 70),
+            DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SOURCE, 61),
+            DeviceEvent(DeviceEventType.REMOVE, DeviceFacility.SOURCE, 70),
+            DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SERVER),
+        ]
+
+    def test_ignores_unknown_removals_and_garbage(self):
+        """Test that removals of untracked objects and bad lines yield nothing."""
+        parser = PwDumpEventParser()
+
+        assert parser.parse('{"id": 5, "info": null}') is None
+        assert parser.parse("not json") is None
+        assert parser.parse("[1, 2]") is None
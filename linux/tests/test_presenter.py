@@ -1,10 +1,15 @@
 """Unit tests for Ulauncher presenter."""
-from unittest.mock import Mock
+import threading
+from unittest.mock import Mock, patch
 
 import pytest
 
 from lib.domain.audio_source import AudioSource, AudioSourceList
-from lib.presentation.ulauncher_adapter import MicSwitcherPresenter
+from lib.presentation.ulauncher_adapter import (
+    MicSwitcherPresenter,
+    SourcesItemFactory,
+    SourcesPresentationStrategy,
+)
 
 
 @pytest.fixture
@@ -28,19 +33,38 @@ def presenter(mock_list_use_case, mock_switch_use_case):
 class TestMicSwitcherPresenter:
     """Tests for MicSwitcherPresenter."""
 
-    def test_command_builder_creates_valid_script(self):
-        """Test that SwitchCommandBuilder creates correct structure."""
-        from lib.presentation.ulauncher_adapter import SwitchCommandBuilder
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_switch_runs_use_case_on_worker(self, mock_run, presenter, mock_switch_use_case):
+        """Test that a chosen source is switched in-process and announced once."""
+        workers = []
+        mock_switch_use_case.execute.side_effect = lambda name: workers.append(threading.current_thread()) or Mock(elapsed=0.01)
 
-        builder = SwitchCommandBuilder(notification_expire_time=1500)
-        source = "alsa_input.test.mono-fallback"
-        script = builder.build(source, "Test Microphone")
+        presenter.switch_source("alsa_input.test.mono-fallback", "Test Microphone").result(5)
 
-        assert source in script
-        assert "set-default-source" in script
-        assert "move-source-output" in script
-        assert "source-outputs" in script
-        assert "notify-send" in script
+        assert workers and workers[0] is not threading.current_thread()
+        mock_switch_use_case.execute.assert_called_once_with("alsa_input.test.mono-fallback")
+        command = mock_run.call_args[0][0]
+        assert command[:3] == ["notify-send", "Microphone Changed", "Test Microphone"]
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_failed_switch_is_announced(self, mock_run, presenter, mock_switch_use_case):
+        """Test that a failing switch is logged and reported instead of raised."""
+        mock_switch_use_case.execute.side_effect = ValueError("Source name cannot be empty")
+
+        assert presenter.switch_source("alsa_input.test.mono-fallback").result(5) is None
+        assert mock_run.call_args[0][0][1] == "Microphone Not Changed"
+
+    def test_source_items_carry_switch_data(self):
+        """Test that items ask the extension to switch instead of running a script."""
+        sources = AudioSourceList([AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=0)])
+
+        with patch("lib.presentation.ulauncher_adapter.ExtensionCustomAction") as action:
+            SourcesItemFactory().create_source_items(sources)
+
+        action.assert_called_once_with({
+            "source_name": "alsa_input.usb-ME6S-00.mono-fallback",
+            "display_name": sources.sources[0].display_name(),
+        })
 
     def test_present_sources_empty_list(self, presenter, mock_list_use_case):
         """Test presenting when no sources are found."""
@@ -63,6 +87,27 @@ class TestMicSwitcherPresenter:
         assert result is not None
         mock_list_use_case.execute.assert_called_once()
 
+    def test_stale_sources_are_shown_with_notice(self):
+        """Test that a stale list is presented after a notice instead of being hidden."""
+        factory = Mock()
+        factory.create_source_items.return_value = ["usb", "pci"]
+        sources = AudioSourceList([
+            AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=0),
+            AudioSource(name="alsa_input.pci-0000_00_1f.3.analog-stereo", index=1),
+        ]).as_stale()
+
+        items = SourcesPresentationStrategy().present(sources, "", factory)
+
+        assert items == [factory.create_stale_item.return_value, "usb", "pci"]
+
+    def test_fresh_sources_have_no_notice(self):
+        """Test that the notice only appears for stale lists."""
+        factory = Mock()
+        factory.create_source_items.return_value = ["usb"]
+        sources = AudioSourceList([AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=0)])
+
+        assert SourcesPresentationStrategy().present(sources, "", factory) == ["usb"]
+
     def test_present_sources_passes_query_and_limit(self, presenter, mock_list_use_case):
         """Test that query and limit are passed to use case."""
         sources = AudioSourceList([
@@ -74,3 +119,104 @@ class TestMicSwitcherPresenter:
 
         mock_list_use_case.execute.assert_called_once_with(query="usb", limit=10)
         assert result is not None
+
+    def test_device_changes_update_source_cache(self, mock_list_use_case, mock_switch_use_case):
+        """Test that a batch of device events is applied to the source cache."""
+        from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+
+        source_cache = Mock()
+        presenter = MicSwitcherPresenter(
+            mock_list_use_case,
+            mock_switch_use_case,
+            source_cache=source_cache,
+        )
+
+        events = [DeviceEvent(DeviceEventType.REMOVE, DeviceFacility.SOURCE, 57)]
+        presenter._on_device_changes(events)
+
+        source_cache.apply_events.assert_called_once_with(events)
+
+    @pytest.mark.parametrize("freshness, refreshed", [
+        ("LIVE", False),
+        ("RESYNCING", True),
+        ("DEGRADED", True),
+    ])
+    def test_present_sources_fetches_unless_cache_is_live(
+        self, mock_list_use_case, mock_switch_use_case, freshness, refreshed
+    ):
+        """Test that a stale event stream forces a synchronous fetch."""
+        from lib.domain.device_event import CacheFreshness
+
+        source_cache = Mock()
+        presenter = MicSwitcherPresenter(
+            mock_list_use_case,
+            mock_switch_use_case,
+            source_cache=source_cache,
+        )
+        presenter._device_monitor.stop()
+        presenter._device_monitor._freshness = CacheFreshness[freshness]
+        mock_list_use_case.execute.return_value = AudioSourceList([])
+
+        presenter.present_sources("")
+
+        assert source_cache.fetch.called is refreshed
+
+    @pytest.mark.parametrize("refresh_interval, fetches", [(60.0, 1), (0.0, 3)])
+    def test_present_sources_fetches_once_per_interval(
+        self, mock_list_use_case, mock_switch_use_case, refresh_interval, fetches
+    ):
+        """Test that keystrokes without live events share one fetch per interval."""
+        source_cache = Mock()
+        presenter = MicSwitcherPresenter(
+            mock_list_use_case,
+            mock_switch_use_case,
+            source_cache=source_cache,
+            event_feed=(Mock(start=Mock(side_effect=OSError)), Mock()),
+            refresh_interval=refresh_interval,
+        )
+        presenter._device_monitor.stop()
+        mock_list_use_case.execute.return_value = AudioSourceList([])
+
+        for query in ["u", "us", "usb"]:
+            presenter.present_sources(query)
+
+        assert source_cache.fetch.call_count == fetches
+
+    def test_resync_counts_as_fetch(self, mock_list_use_case, mock_switch_use_case):
+        """Test that queries right after a reconnect reuse the resynced list."""
+        source_cache = Mock()
+        presenter = MicSwitcherPresenter(
+            mock_list_use_case,
+            mock_switch_use_case,
+            source_cache=source_cache,
+            event_feed=(Mock(start=Mock(side_effect=OSError)), Mock()),
+            refresh_interval=60.0,
+        )
+        presenter._device_monitor.stop()
+        mock_list_use_case.execute.return_value = AudioSourceList([])
+
+        presenter._resync()
+        presenter.present_sources("usb")
+
+        source_cache.resync.assert_called()
+        source_cache.fetch.assert_not_called()
+
+    def test_source_cache_is_prewarmed_at_construction(self, mock_list_use_case, mock_switch_use_case):
+        """Test that building the presenter starts the background fetch."""
+        source_cache = Mock()
+
+        MicSwitcherPresenter(mock_list_use_case, mock_switch_use_case, source_cache=source_cache)
+
+        source_cache.prewarm.assert_called_once()
+
+    def test_first_query_latency_is_recorded_once(self, presenter, mock_list_use_case):
+        """Test the cold-start latency metric."""
+        mock_list_use_case.execute.return_value = AudioSourceList([])
+        assert presenter.first_query_latency is None
+
+        presenter.present_sources("")
+        first = presenter.first_query_latency
+        presenter.present_sources("usb")
+
+        assert first is not None and first >= 0
+        assert presenter.first_query_latency == first
@@ -0,0 +1,162 @@
+"""Unit tests for the native protocol audio client."""
+import pytest
+
+from lib.infrastructure import pulse_protocol
+from lib.infrastructure.audio_service import PulseNativeClient
+from lib.infrastructure.pulse_protocol import TagStructReader, TagStructWriter
+
+from .fake_pulse_server import FakePulseServer, FakeSource, FakeSourceOutput
+
+
+@pytest.fixture
+def pulse_server():
+    """Running stand-in server with two sources, one monitor and two streams."""
+    server = FakePulseServer()
+    server.sources = [
+        FakeSource(0, "alsa_input.pci-0000_00_1f.3.analog-stereo", "Built-in Audio Analog Stereo"),
+        FakeSource(1, "alsa_output.pci-0000_00_1f.3.iec958-stereo.monitor", "Monitor of Built-in Audio", 0),
+        FakeSource(2, "alsa_input.usb-ME6S-00.mono-fallback", "ME6S Mono"),
+    ]
+    server.source_outputs = [
+        FakeSourceOutput(40, 0, {"application.name": "Firefox"}),
+        FakeSourceOutput(41, 0, {"application.name": "Zoom"}),
+    ]
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(pulse_server):
+    """Native client connected to the stand-in server."""
+    client = PulseNativeClient(socket_path=pulse_server.socket_path, timeout=1.0)
+    yield client
+    client.close()
+
+
+class TestTagStruct:
+    """Tests for tagstruct encoding."""
+
+    def test_round_trip(self):
+        """Test that every written value reads back unchanged."""
+        payload = (
+            TagStructWriter()
+            .put_u32(7)
+            .put_string("alsa_input.usb")
+            .put_string(None)
+            .put_boolean(True)
+            .put_usec(1234)
+            .put_proplist({"application.name": "Zoom"})
+            .to_bytes()
+        )
+
+        reader = TagStructReader(payload)
+
+        assert reader.get_u32() == 7
+        assert reader.get_string() == "alsa_input.usb"
+        assert reader.get_string() is None
+        assert reader.get() is True
+        assert reader.get() == 1234
+        assert reader.get_proplist() == {"application.name": "Zoom"}
+        assert reader.eof()
+
+    def test_truncated_payload_raises(self):
+        """Test that a short payload is reported as a protocol error."""
+        payload = TagStructWriter().put_u32(7).to_bytes()[:-1]
+
+        with pytest.raises(pulse_protocol.PulseProtocolError):
+            TagStructReader(payload).get_u32()
+
+
+class TestPulseNativeClient:
+    """Tests for PulseNativeClient against the stand-in server."""
+
+    def test_list_sources_filters_monitors(self, client):
+        """Test listing sources with real indices and descriptions."""
+        result = client.list_sources()
+
+        assert [s.name for s in result.sources] == [
+            "alsa_input.pci-0000_00_1f.3.analog-stereo",
+            "alsa_input.usb-ME6S-00.mono-fallback",
+        ]
+        assert result.sources[1].index == 2
+        assert result.sources[1].description == "ME6S Mono"
+
+    def test_get_source_by_index(self, client):
+        """Test fetching a single source, skipping monitors and missing ones."""
+        assert client.get_source(2).name == "alsa_input.usb-ME6S-00.mono-fallback"
+        assert client.get_source(1) is None
+        assert client.get_source(99) is None
+
+    def test_get_default_source(self, client, pulse_server):
+        """Test reading the default source from the server info."""
+        pulse_server.default_source = "alsa_input.pci-0000_00_1f.3.analog-stereo"
+
+        assert client.get_default_source() == "alsa_input.pci-0000_00_1f.3.analog-stereo"
+
+    def test_connection_is_reused(self, client, pulse_server):
+        """Test that repeated operations share one authenticated connection."""
+        client.list_sources()
+        client.list_sources()
+        client.set_default_source("alsa_input.usb-ME6S-00.mono-fallback")
+
+        assert pulse_server.connections == 1
+        assert pulse_server.commands.count(pulse_protocol.COMMAND_AUTH) == 1
+
+    def test_set_default_source(self, client, pulse_server):
+        """Test setting the default source."""
+        client.set_default_source("alsa_input.usb-ME6S-00.mono-fallback")
+
+        assert pulse_server.default_source == "alsa_input.usb-ME6S-00.mono-fallback"
+
+    def test_move_streams_to_source(self, client, pulse_server):
+        """Test moving every capture stream to the target source."""
+        report = client.move_streams_to_source("alsa_input.usb-ME6S-00.mono-fallback")
+
+        assert [o.source for o in pulse_server.source_outputs] == [2, 2]
+        assert [r.stream_id for r in report.moved()] == [40, 41]
+
+    def test_move_streams_reports_server_errors(self, client, pulse_server):
+        """Test that a refused move is reported without failing the batch."""
+        report = client.move_streams_to_source("alsa_input.missing")
+
+        assert len(report.failed()) == 2
+        assert [o.source for o in pulse_server.source_outputs] == [0, 0]
+
+    def test_move_streams_skips_target_and_excluded(self, client, pulse_server):
+        """Test that streams on the target and peak meters are left alone."""
+        pulse_server.source_outputs.append(
+            FakeSourceOutput(42, 0, {"application.id": "org.PulseAudio.pavucontrol"})
+        )
+        pulse_server.source_outputs[0].source = 2
+
+        report = client.move_streams_to_source("alsa_input.usb-ME6S-00.mono-fallback")
+
+        assert [r.stream_id for r in report.moved()] == [41]
+        assert report.skipped == 2
+        assert pulse_server.source_outputs[2].source == 0
+
+    def test_reconnects_after_server_drops_connection(self, client, pulse_server):
+        """Test that a dropped connection is re-established on next use."""
+        client.list_sources()
+        for connection in list(pulse_server._clients):
+            connection.close()
+
+        client.list_sources()
+        result = client.list_sources()
+
+        assert len(result.sources) == 2
+        assert pulse_server.connections == 2
+
+    def test_rejected_auth_returns_empty_list(self, pulse_server):
+        """Test that an authentication failure degrades to an empty list."""
+        pulse_server.reject_auth = True
+        client = PulseNativeClient(socket_path=pulse_server.socket_path, timeout=1.0)
+
+        assert client.list_sources().is_empty()
+
+    def test_missing_socket_returns_empty_list(self, tmp_path):
+        """Test behaviour when no audio server is listening."""
+        client = PulseNativeClient(socket_path=str(tmp_path / "native"), timeout=0.1)
+
+        assert client.list_sources().is_empty()
@@ -0,0 +1,256 @@
+"""Unit tests for the memory-mapped shared snapshot."""
+import struct
+import subprocess
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.device_event import CacheFreshness
+from lib.infrastructure import shared_snapshot
+from lib.infrastructure.shared_snapshot import SharedSnapshotPublisher, SharedSnapshotReader
+from lib.infrastructure.source_cache import SourceCache
+
+
+PID = struct.Struct("<I")
+PID_OFFSET = shared_snapshot.HEADER.size - PID.size
+
+
+def source_list(count, prefix="alsa_input.usb"):
+    return AudioSourceList([
+        AudioSource(name=f"{prefix}-{i}.mono-fallback", index=i, description=f"Microphone {i}")
+        for i in range(count)
+    ])
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "run" / "sources.shm")
+
+
+@pytest.fixture
+def publisher(path):
+    publisher = SharedSnapshotPublisher(path)
+    yield publisher
+    publisher.close()
+
+
+class TestSharedSnapshot:
+    """Tests for publishing and reading the shared snapshot."""
+
+    def test_round_trip(self, path, publisher):
+        """Test that readers see the published sources and default source."""
+        sources = source_list(3)
+        publisher.publish(sources, "alsa_input.usb-1.mono-fallback")
+
+        published, default = SharedSnapshotReader(path).read()
+
+        assert published.sources == sources.sources
+        assert default == "alsa_input.usb-1.mono-fallback"
+        assert not published.stale
+
+    def test_nothing_published(self, path):
+        """Test that a missing file reads as nothing published."""
+        reader = SharedSnapshotReader(path)
+
+        assert reader.read() is None
+        assert reader.list_sources().is_empty()
+        assert reader.get_default_source() is None
+
+    def test_held_mapping_follows_updates(self, path, publisher):
+        """Test that a reader keeping its mapping sees later publishes."""
+        reader = SharedSnapshotReader(path)
+        publisher.publish(source_list(1), None)
+        reader.read()
+
+        publisher.publish(source_list(2), "alsa_input.usb-0.mono-fallback")
+
+        assert len(reader.list_sources().sources) == 2
+        assert reader.get_default_source() == "alsa_input.usb-0.mono-fallback"
+
+    def test_unchanged_generation_is_not_decoded_again(self, path, publisher, monkeypatch):
+        """Test that repeated reads of the same publish reuse the decoded snapshot."""
+        publisher.publish(source_list(2), None)
+        reader = SharedSnapshotReader(path)
+        first = reader.read()
+        decode = Mock(side_effect=AssertionError("decoded again"))
+        monkeypatch.setattr(shared_snapshot, "decode_snapshot", decode)
+
+        assert reader.read() is first
+
+    def test_growing_retires_old_file(self, path, publisher, monkeypatch):
+        """Test that a reader of an outgrown file moves on to the new one."""
+        monkeypatch.setattr(shared_snapshot, "MIN_SIZE", 256)
+        publisher.publish(source_list(1), None)
+        reader = SharedSnapshotReader(path)
+        reader.read()
+
+        publisher.publish(source_list(40), None)
+
+        assert len(reader.list_sources().sources) == 40
+
+    def test_new_publisher_takes_over(self, path, publisher):
+        """Test that readers follow a publisher replacing an earlier one."""
+        publisher.publish(source_list(1), None)
+        reader = SharedSnapshotReader(path)
+        reader.read()
+
+        successor = SharedSnapshotPublisher(path)
+        successor.publish(source_list(3), None)
+
+        assert len(reader.list_sources().sources) == 3
+        successor.close()
+
+    def test_running_owner_is_not_taken_over(self, path, publisher):
+        """Test that a second process does not publish over a live owner's file."""
+        publisher.publish(source_list(1), None)
+        owner = subprocess.Popen(["sleep", "30"])
+        try:
+            PID.pack_into(publisher._mmap, PID_OFFSET, owner.pid)
+            successor = SharedSnapshotPublisher(path)
+            successor.publish(source_list(3), None)
+
+            assert len(SharedSnapshotReader(path).list_sources().sources) == 1
+
+            publisher.close()
+            successor.publish(source_list(3), None)
+
+            assert len(SharedSnapshotReader(path).list_sources().sources) == 3
+            successor.close()
+        finally:
+            owner.kill()
+            owner.wait()
+
+    def test_live_flag_is_published(self, path, publisher):
+        """Test that readers see whether device events keep the list current."""
+        publisher.set_live(True)
+        publisher.publish(source_list(1), None)
+        reader = SharedSnapshotReader(path)
+
+        reader.read()
+        assert reader.live
+
+        publisher.set_live(False)
+        reader.read()
+        assert not reader.live
+
+    def test_closed_snapshot_is_not_served(self, path, publisher):
+        """Test that readers stop using a snapshot once the publisher closes it."""
+        publisher.publish(source_list(1), None)
+        reader = SharedSnapshotReader(path)
+        reader.read()
+
+        publisher.close()
+
+        assert reader.read() is None
+
+    def test_snapshot_of_dead_publisher_is_not_served(self, path, publisher):
+        """Test that a file left by a killed publisher is not trusted."""
+        publisher.publish(source_list(1), None)
+        reader = SharedSnapshotReader(path)
+        assert reader.read() is not None
+
+        child = subprocess.Popen(["true"])
+        child.wait()
+        PID.pack_into(publisher._mmap, PID_OFFSET, child.pid)
+
+        assert reader.read() is None
+
+    def test_write_in_progress_is_not_read(self, path, publisher):
+        """Test that a reader gives up on a snapshot whose sequence stays odd."""
+        publisher.publish(source_list(1), None)
+        publisher._write_sequence(publisher._sequence + 1)
+        reader = SharedSnapshotReader(path)
+        reader.RETRIES = 5
+
+        assert reader.read() is None
+
+    def test_stale_flag_is_published(self, path, publisher):
+        """Test that a stale list reads back as stale."""
+        publisher.publish(source_list(1).as_stale(), None)
+
+        assert SharedSnapshotReader(path).list_sources().stale
+
+    def test_concurrent_reads_are_consistent(self, path, publisher):
+        """Test that readers never see a mix of two publishes."""
+        publisher.publish(source_list(30, "a"), "a")
+        stop = threading.Event()
+
+        def publish():
+            flip = False
+            while not stop.is_set():
+                prefix = "b" if flip else "a"
+                publisher.publish(source_list(5 if flip else 30, prefix), prefix)
+                flip = not flip
+
+        writer = threading.Thread(target=publish)
+        writer.start()
+        try:
+            reader = SharedSnapshotReader(path)
+            for _ in range(500):
+                published = reader.read()
+                if published is None:
+                    continue
+                sources, default = published
+                assert {s.name.split("-")[0] for s in sources.sources} == {default}
+                assert len(sources.sources) == (5 if default == "b" else 30)
+        finally:
+            stop.set()
+            writer.join(5)
+
+
+class TestSourceCachePublishing:
+    """Tests for publishing from the source cache."""
+
+    def test_cache_publishes_snapshots_and_default(self, path, publisher):
+        """Test that fetches, refreshes and switches are published."""
+        client = Mock(spec=["list_sources", "get_default_source", "set_default_source", "move_streams_to_source"])
+        client.list_sources.return_value = source_list(2)
+        client.get_default_source.return_value = "alsa_input.usb-0.mono-fallback"
+        cache = SourceCache(client)
+        cache.list_sources()
+        reader = SharedSnapshotReader(path)
+
+        cache.attach_publisher(publisher)
+        assert reader.read() == (client.list_sources.return_value, "alsa_input.usb-0.mono-fallback")
+
+        client.list_sources.return_value = source_list(3)
+        cache.refresh()
+        assert len(reader.list_sources().sources) == 3
+
+        client.get_default_source.return_value = "alsa_input.usb-2.mono-fallback"
+        cache.set_default_source("alsa_input.usb-2.mono-fallback")
+        assert reader.get_default_source() == "alsa_input.usb-2.mono-fallback"
+
+    def test_cache_publishes_freshness(self, path, publisher):
+        """Test that only a LIVE event feed marks the publication live."""
+        client = Mock(spec=["list_sources", "get_default_source", "set_default_source", "move_streams_to_source"])
+        client.list_sources.return_value = source_list(2)
+        client.get_default_source.return_value = None
+        cache = SourceCache(client)
+        cache.set_freshness(CacheFreshness.LIVE)
+        cache.attach_publisher(publisher)
+        cache.list_sources()
+        reader = SharedSnapshotReader(path)
+
+        reader.read()
+        assert reader.live
+
+        cache.set_freshness(CacheFreshness.DEGRADED)
+        reader.read()
+        assert not reader.live
+
+    def test_failed_listing_keeps_previous_publication(self, path, publisher):
+        """Test that readers keep the last list while a relist comes back empty."""
+        client = Mock(spec=["list_sources", "get_default_source", "set_default_source", "move_streams_to_source"])
+        client.list_sources.return_value = source_list(2)
+        client.get_default_source.return_value = None
+        cache = SourceCache(client)
+        cache.attach_publisher(publisher)
+        cache.list_sources()
+
+        client.list_sources.return_value = AudioSourceList([])
+        cache.refresh()
+
+        assert len(SharedSnapshotReader(path).list_sources().sources) == 2
@@ -0,0 +1,365 @@
+"""Unit tests for the in-memory source cache."""
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.circuit_breaker import CircuitBreaker
+from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+from lib.infrastructure.source_cache import SourceCache
+
+
+def source_event(event_type, index):
+    return DeviceEvent(event_type, DeviceFacility.SOURCE, index)
+
+
+@pytest.fixture
+def audio_client():
+    """Mock audio client returning two sources."""
+    client = Mock(spec=["list_sources", "get_default_source", "set_default_source", "move_streams_to_source"])
+    client.list_sources.return_value = AudioSourceList([
+        AudioSource(name="alsa_input.pci-0000_00_1f.3.analog-stereo", index=0),
+        AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=1),
+    ])
+    return client
+
+
+class TestSourceCache:
+    """Tests for SourceCache."""
+
+    def test_list_sources_fetches_once(self, audio_client):
+        """Test that repeated reads are served from the snapshot."""
+        cache = SourceCache(audio_client)
+
+        first = cache.list_sources()
+        second = cache.list_sources()
+
+        assert first is second
+        audio_client.list_sources.assert_called_once()
+
+    def test_refresh_swaps_snapshot(self, audio_client):
+        """Test that refresh replaces the snapshot and bumps the generation."""
+        cache = SourceCache(audio_client)
+        first = cache.list_sources()
+        generation = cache.generation
+
+        audio_client.list_sources.return_value = AudioSourceList([
+            AudioSource(name="alsa_input.usb-Webcam-00.mono-fallback", index=2),
+        ])
+        cache.refresh()
+
+        assert cache.list_sources() is not first
+        assert cache.list_sources().sources[0].index == 2
+        assert cache.generation == generation + 1
+
+    def test_empty_result_is_not_cached(self, audio_client):
+        """Test that an empty listing is retried on the next read."""
+        audio_client.list_sources.return_value = AudioSourceList([])
+        cache = SourceCache(audio_client)
+
+        cache.list_sources()
+        cache.list_sources()
+
+        assert audio_client.list_sources.call_count == 2
+
+    def test_switch_operations_are_delegated(self, audio_client):
+        """Test that switching goes straight to the wrapped client."""
+        cache = SourceCache(audio_client)
+
+        cache.set_default_source("alsa_input.test")
+        cache.move_streams_to_source("alsa_input.test")
+
+        audio_client.set_default_source.assert_called_once_with("alsa_input.test")
+        audio_client.move_streams_to_source.assert_called_once_with("alsa_input.test")
+
+
+    def test_install_listeners_see_new_snapshots(self, audio_client):
+        """Test that listeners get the current and every later non-empty snapshot."""
+        cache = SourceCache(audio_client)
+        first = cache.list_sources()
+        seen = []
+
+        cache.on_install(seen.append)
+        second = cache.refresh()
+        audio_client.list_sources.return_value = AudioSourceList([])
+        cache.refresh()
+
+        assert seen == [first, second]
+
+    def test_switch_sets_cached_default(self, audio_client):
+        """Test that a switch is remembered without asking the server again."""
+        cache = SourceCache(audio_client)
+
+        cache.set_default_source("alsa_input.test")
+
+        assert cache.get_default_source() == "alsa_input.test"
+        audio_client.get_default_source.assert_not_called()
+
+    def test_failed_switch_forgets_default(self, audio_client):
+        """Test that after a failed switch the default is read from the server."""
+        audio_client.set_default_source.side_effect = RuntimeError("Failed to switch audio source")
+        audio_client.get_default_source.return_value = "alsa_input.old"
+        cache = SourceCache(audio_client)
+
+        with pytest.raises(RuntimeError):
+            cache.set_default_source("alsa_input.test")
+
+        assert cache.get_default_source() == "alsa_input.old"
+
+
+class TestSourceCachePrewarm:
+    """Tests for background prewarming and shared in-flight fetches."""
+
+    @pytest.fixture
+    def slow_client(self, audio_client):
+        """Client whose listing blocks until released."""
+        listing = audio_client.list_sources.return_value
+        self.release = threading.Event()
+        self.entered = threading.Event()
+
+        def list_sources():
+            self.entered.set()
+            self.release.wait(timeout=2)
+            return listing
+
+        audio_client.list_sources.side_effect = list_sources
+        return audio_client
+
+    def test_first_read_joins_prewarm_fetch(self, slow_client):
+        """Test that a read during prewarm waits for it instead of refetching."""
+        cache = SourceCache(slow_client)
+        cache.prewarm()
+        assert self.entered.wait(timeout=2)
+
+        threading.Timer(0.05, self.release.set).start()
+        sources = cache.list_sources()
+
+        assert len(sources.sources) == 2
+        slow_client.list_sources.assert_called_once()
+
+    def test_prewarm_is_skipped_when_warm(self, audio_client):
+        """Test that an existing snapshot is not fetched again."""
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.prewarm()
+
+        audio_client.list_sources.assert_called_once()
+
+    def test_refresh_does_not_join_inflight_fetch(self, slow_client):
+        """Test that refresh always starts a new request."""
+        cache = SourceCache(slow_client)
+        cache.prewarm()
+        assert self.entered.wait(timeout=2)
+
+        self.release.set()
+        cache.refresh()
+
+        assert slow_client.list_sources.call_count == 2
+
+    def test_first_resync_joins_prewarm_fetch(self, slow_client):
+        """Test that the feed's first connect does not list again behind the prewarm."""
+        cache = SourceCache(slow_client)
+        cache.prewarm()
+        assert self.entered.wait(timeout=2)
+
+        threading.Timer(0.05, self.release.set).start()
+        cache.resync()
+        assert slow_client.list_sources.call_count == 1
+
+        cache.resync()
+        assert slow_client.list_sources.call_count == 2
+
+    def test_fetch_errors_are_raised(self, audio_client):
+        """Test that a failed fetch is raised, not cached."""
+        audio_client.list_sources.side_effect = RuntimeError("server gone")
+        cache = SourceCache(audio_client)
+
+        with pytest.raises(RuntimeError):
+            cache.fetch()
+
+
+class TestSourceCacheEvents:
+    """Tests for incremental cache updates from device events."""
+
+    def test_remove_drops_only_that_source(self, audio_client):
+        """Test that a remove event drops exactly one entry without relisting."""
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_event(source_event(DeviceEventType.REMOVE, 0))
+
+        assert [s.index for s in cache.list_sources().sources] == [1]
+        audio_client.list_sources.assert_called_once()
+
+    def test_new_fetches_single_source_when_supported(self, audio_client):
+        """Test that a new source is fetched by index when the client can."""
+        audio_client.get_source = Mock(
+            return_value=AudioSource(name="alsa_input.usb-Webcam-00.mono-fallback", index=57)
+        )
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_event(source_event(DeviceEventType.NEW, 57))
+
+        audio_client.get_source.assert_called_once_with(57)
+        assert [s.index for s in cache.list_sources().sources] == [0, 1, 57]
+        audio_client.list_sources.assert_called_once()
+
+    def test_change_replaces_source_in_place(self, audio_client):
+        """Test that a changed source keeps its position."""
+        audio_client.get_source = Mock(
+            return_value=AudioSource(name="alsa_input.pci-0000_00_1f.3.analog-stereo", index=0, description="Renamed")
+        )
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_event(source_event(DeviceEventType.CHANGE, 0))
+
+        assert cache.list_sources().sources[0].description == "Renamed"
+
+    def test_new_without_single_fetch_relists(self, audio_client):
+        """Test the full-relist fallback for clients without get_source."""
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_event(source_event(DeviceEventType.NEW, 57))
+
+        assert audio_client.list_sources.call_count == 2
+
+    def test_server_change_updates_only_default(self, audio_client):
+        """Test that server events refresh the cached default source only."""
+        audio_client.get_default_source.return_value = "alsa_input.usb-ME6S-00.mono-fallback"
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_event(DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SERVER))
+
+        assert cache.get_default_source() == "alsa_input.usb-ME6S-00.mono-fallback"
+        audio_client.get_default_source.assert_called_once()
+        audio_client.list_sources.assert_called_once()
+
+    def test_source_output_events_are_ignored(self, audio_client):
+        """Test that capture stream churn leaves the cache alone."""
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+        generation = cache.generation
+
+        cache.apply_event(DeviceEvent(DeviceEventType.NEW, DeviceFacility.SOURCE_OUTPUT, 88))
+
+        assert cache.generation == generation
+        audio_client.list_sources.assert_called_once()
+
+    def test_batch_costs_at_most_one_relist(self, audio_client):
+        """Test that a coalesced burst without get_source relists once."""
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_events([
+            source_event(DeviceEventType.REMOVE, 0),
+            source_event(DeviceEventType.NEW, 57),
+            source_event(DeviceEventType.NEW, 58),
+            DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SERVER),
+        ])
+
+        assert audio_client.list_sources.call_count == 2
+        audio_client.get_default_source.assert_called_once()
+
+    def test_changed_sources_are_invalidated_in_client(self, audio_client):
+        """Test that clients memoizing per-source data hear about changes."""
+        audio_client.invalidate_source = Mock()
+        cache = SourceCache(audio_client)
+        cache.list_sources()
+
+        cache.apply_events([source_event(DeviceEventType.CHANGE, 1), source_event(DeviceEventType.REMOVE, 0)])
+
+        assert [c.args[0] for c in audio_client.invalidate_source.call_args_list] == [1, 0]
+
+
+class TestSourceCacheLastKnownGood:
+    """Tests for serving the last good list while the server times out."""
+
+    @staticmethod
+    def hang(breaker):
+        """Make the next listing fail as a timed-out call would."""
+        def list_sources():
+            breaker.record_failure(time.monotonic())
+            return AudioSourceList([])
+        return list_sources
+
+    def test_failed_refresh_serves_stale_list(self, audio_client):
+        """Test that a timed-out relist keeps the last good sources, marked stale."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        cache = SourceCache(audio_client, breaker=breaker)
+        good = cache.list_sources()
+
+        audio_client.list_sources.side_effect = self.hang(breaker)
+        stale = cache.refresh()
+
+        assert stale.stale
+        assert stale.sources == good.sources
+        assert cache.list_sources() is stale
+
+    def test_empty_answer_from_healthy_server_is_not_replaced(self, audio_client):
+        """Test that a server answering with no sources is believed."""
+        breaker = CircuitBreaker()
+        cache = SourceCache(audio_client, breaker=breaker)
+        cache.list_sources()
+
+        audio_client.list_sources.return_value = AudioSourceList([])
+
+        assert cache.refresh().is_empty()
+
+    def test_nothing_to_fall_back_on(self, audio_client):
+        """Test that without an earlier good list the failure is returned as is."""
+        breaker = CircuitBreaker(failure_threshold=1)
+        audio_client.list_sources.side_effect = self.hang(breaker)
+        cache = SourceCache(audio_client, breaker=breaker)
+
+        result = cache.list_sources()
+
+        assert result.is_empty()
+        assert not result.stale
+
+    def test_recovers_in_background(self, audio_client):
+        """Test that the cache keeps retrying and swaps in a fresh list once the server answers."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+        cache = SourceCache(audio_client, breaker=breaker)
+        cache.RECOVERY_INTERVAL = 0.01
+        good = cache.list_sources().sources
+
+        attempts = []
+
+        def list_sources():
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                breaker.record_failure(time.monotonic())
+                return AudioSourceList([])
+            breaker.record_success()
+            return AudioSourceList(good)
+
+        audio_client.list_sources.side_effect = list_sources
+        assert cache.refresh().stale
+
+        deadline = time.monotonic() + 5
+        while cache.list_sources().stale and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert not cache.list_sources().stale
+        assert cache.list_sources().sources == good
+        assert len(attempts) == 3
+
+    def test_events_keep_stale_flag(self, audio_client):
+        """Test that a removal applied to a stale list leaves it stale."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        cache = SourceCache(audio_client, breaker=breaker)
+        cache.list_sources()
+        audio_client.list_sources.side_effect = self.hang(breaker)
+        cache.refresh()
+
+        cache.apply_event(source_event(DeviceEventType.REMOVE, 0))
+
+        assert cache.list_sources().stale
+        assert [s.index for s in cache.list_sources().sources] == [1]
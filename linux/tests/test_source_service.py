@@ -0,0 +1,209 @@
+"""Tests for the unix-socket source service."""
+import socket
+import threading
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from lib.application.current_source_use_case import CurrentSourceUseCase
+from lib.application.list_sources_use_case import ListSourcesUseCase
+from lib.application.switch_source_use_case import SwitchSourceUseCase
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.device_event import CacheFreshness
+from lib.domain.latency import AdaptiveTimeouts
+from lib.domain.stream_move import StreamMoveReport
+from lib.infrastructure.audio_service import PactlClient
+from lib.infrastructure.source_cache import SourceCache
+from lib.presentation.source_service import (
+    ServiceError,
+    ServiceUnavailable,
+    SourceService,
+    SourceServiceClient,
+)
+
+
+def start_service(audio_client, socket_path):
+    """Start a service on a background thread for the given client."""
+    cache = SourceCache(audio_client)
+    service = SourceService(
+        ListSourcesUseCase(cache),
+        SwitchSourceUseCase(audio_client),
+        CurrentSourceUseCase(audio_client),
+        socket_path=socket_path,
+    )
+    service.start()
+    return service
+
+
+@pytest.fixture
+def audio_client():
+    """Mock audio client with two sources."""
+    client = Mock()
+    client.list_sources.return_value = AudioSourceList([
+        AudioSource(name="alsa_input.pci-0000_00_1f.3.analog-stereo", index=0, description="Built-in"),
+        AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=1, description="ME6S"),
+    ])
+    client.move_streams_to_source.return_value = StreamMoveReport("alsa_input.usb-ME6S-00.mono-fallback")
+    client.get_default_source.return_value = "alsa_input.pci-0000_00_1f.3.analog-stereo"
+    return client
+
+
+@pytest.fixture
+def service_client(audio_client, tmp_path):
+    """Client connected to a running service."""
+    socket_path = str(tmp_path / "service.sock")
+    service = start_service(audio_client, socket_path)
+    yield SourceServiceClient(socket_path, timeout=1.0)
+    service.shutdown()
+
+
+class TestSourceService:
+    """Tests for SourceService and SourceServiceClient."""
+
+    def test_list_sources(self, service_client, audio_client):
+        """Test listing through the service uses the warm cache."""
+        first = service_client.list_sources(query="usb", limit=5)
+        second = service_client.list_sources()
+
+        assert [s.name for s in first.sources] == ["alsa_input.usb-ME6S-00.mono-fallback"]
+        assert first.sources[0].description == "ME6S"
+        assert len(second.sources) == 2
+        audio_client.list_sources.assert_called_once()
+
+    def test_switch(self, service_client, audio_client):
+        """Test switching through the service."""
+        response = service_client.switch("alsa_input.usb-ME6S-00.mono-fallback")
+
+        audio_client.set_default_source.assert_called_once_with("alsa_input.usb-ME6S-00.mono-fallback")
+        assert response["source_name"] == "alsa_input.usb-ME6S-00.mono-fallback"
+        assert response["moved"] == 0
+
+    def test_current(self, service_client):
+        """Test reading the default source through the service."""
+        assert service_client.current() == "alsa_input.pci-0000_00_1f.3.analog-stereo"
+
+    def test_errors_are_reported(self, service_client):
+        """Test that use case validation errors reach the client."""
+        with pytest.raises(ServiceError, match="cannot be empty"):
+            service_client.switch("  ")
+
+    def test_client_without_service_is_unavailable(self, tmp_path):
+        """Test that a missing service is reported so callers can fall back."""
+        client = SourceServiceClient(str(tmp_path / "missing.sock"), timeout=0.1)
+
+        with pytest.raises(ServiceUnavailable):
+            client.list_sources()
+
+    @pytest.mark.parametrize("request_name, error", [
+        ("list_sources", ServiceUnavailable),
+        ("switch", ServiceError),
+    ])
+    def test_dropped_connection(self, tmp_path, request_name, error):
+        """Test that only requests safe to repeat fall back after the service dies mid-request."""
+        socket_path = str(tmp_path / "dying.sock")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen(1)
+
+        def accept_and_close():
+            connection, _ = server.accept()
+            connection.recv(4096)
+            connection.close()
+
+        threading.Thread(target=accept_and_close, daemon=True).start()
+        client = SourceServiceClient(socket_path, timeout=1.0)
+        try:
+            with pytest.raises(error):
+                if request_name == "switch":
+                    client.switch("alsa_input.usb")
+                else:
+                    client.list_sources()
+        finally:
+            server.close()
+
+    def test_current_uses_cached_default_while_events_are_live(self, audio_client, tmp_path):
+        """Test that the default source is only asked for again when events may have been missed."""
+        cache = SourceCache(audio_client)
+        monitor = Mock(freshness=CacheFreshness.LIVE)
+        service = SourceService(
+            ListSourcesUseCase(cache),
+            SwitchSourceUseCase(cache),
+            CurrentSourceUseCase(cache),
+            source_cache=cache,
+            device_monitor=monitor,
+        )
+
+        service.handle({"op": "current"})
+        service.handle({"op": "current"})
+        assert audio_client.get_default_source.call_count == 1
+
+        monitor.freshness = CacheFreshness.RESYNCING
+        service.handle({"op": "current"})
+        assert audio_client.get_default_source.call_count == 2
+
+    def test_stale_socket_is_replaced(self, audio_client, tmp_path):
+        """Test that a leftover socket file from a dead service is removed."""
+        socket_path = tmp_path / "service.sock"
+        socket_path.touch()
+
+        service = start_service(audio_client, str(socket_path))
+        try:
+            assert SourceServiceClient(str(socket_path)).current() is not None
+        finally:
+            service.shutdown()
+
+        assert not socket_path.exists()
+
+    @pytest.mark.parametrize("freshness, fetches", [
+        (CacheFreshness.LIVE, 1),
+        (CacheFreshness.RESYNCING, 2),
+        (CacheFreshness.DEGRADED, 2),
+    ])
+    def test_list_fetches_synchronously_unless_live(self, audio_client, freshness, fetches):
+        """Test that the cache is only trusted while the event stream is live."""
+        cache = SourceCache(audio_client)
+        service = SourceService(
+            ListSourcesUseCase(cache),
+            SwitchSourceUseCase(audio_client),
+            CurrentSourceUseCase(audio_client),
+            source_cache=cache,
+            device_monitor=Mock(freshness=freshness),
+        )
+        cache.refresh()
+
+        service.handle({"op": "list"})
+
+        assert audio_client.list_sources.call_count == fetches
+
+    def test_latency_reports_percentiles(self, audio_client):
+        """Test that learned latencies are exposed per operation."""
+        timeouts = AdaptiveTimeouts()
+        timeouts.observe("list-sources", 0.004)
+        service = SourceService(
+            ListSourcesUseCase(audio_client),
+            SwitchSourceUseCase(audio_client),
+            CurrentSourceUseCase(audio_client),
+            timeouts=timeouts,
+        )
+
+        response = service.handle({"op": "latency"})
+
+        assert response["ok"]
+        assert response["operations"]["list-sources"]["samples"] == 1
+        assert response["operations"]["list-sources"]["p99"] >= 0.004
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_serves_pactl_client(self, mock_run, tmp_path):
+        """Test the service end to end against PactlClient."""
+        mock_run.return_value = MagicMock(
+            returncode=0,
+            stdout="Source #4\n\tName: alsa_input.usb-Webcam-00.mono-fallback\n\tDescription: Webcam\n",
+        )
+        socket_path = str(tmp_path / "service.sock")
+        service = start_service(PactlClient(), socket_path)
+        try:
+            sources = SourceServiceClient(socket_path).list_sources()
+        finally:
+            service.shutdown()
+
+        assert [s.name for s in sources.sources] == ["alsa_input.usb-Webcam-00.mono-fallback"]
@@ -0,0 +1,196 @@
+"""Unit tests for the on-disk source snapshot."""
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+from lib.infrastructure.audio_service import PactlClient
+from lib.infrastructure.source_cache import SourceCache
+from lib.infrastructure.source_snapshot import SourceSnapshotFile, decode_snapshot, encode_snapshot
+
+TOKEN = b"\x01" * 16
+
+
+@pytest.fixture
+def sources():
+    return AudioSourceList([
+        AudioSource(name="alsa_input.pci-0000_00_1f.3.analog-stereo", index=0, description="Built-in Audio"),
+        AudioSource(name="alsa_input.usb-Mikrofon-00.mono-fallback", index=57, description="Mikrofón USB"),
+        AudioSource(name="bluez_input.00_1B_66", index=4294967294),
+    ])
+
+
+@pytest.fixture
+def snapshot_file(tmp_path):
+    return SourceSnapshotFile(str(tmp_path / "run" / "sources.bin"))
+
+
+class TestSnapshotEncoding:
+    """Tests for encoding and decoding snapshots."""
+
+    def test_round_trip(self, sources):
+        """Test that names, descriptions and indices survive encoding."""
+        decoded = decode_snapshot(encode_snapshot(sources, TOKEN), TOKEN)
+
+        assert decoded.sources == sources.sources
+
+    def test_other_token_is_rejected(self, sources):
+        """Test that a snapshot taken under another token is not used."""
+        assert decode_snapshot(encode_snapshot(sources, TOKEN), b"\x02" * 16) is None
+
+    @pytest.mark.parametrize("damage", [
+        lambda data: data[:-3],
+        lambda data: data + b"\x00",
+        lambda data: b"JSON" + data[4:],
+        lambda data: b"",
+    ])
+    def test_damaged_data_is_rejected(self, sources, damage):
+        """Test that truncated, padded or foreign data is not decoded."""
+        assert decode_snapshot(damage(encode_snapshot(sources, TOKEN)), TOKEN) is None
+
+    def test_empty_list(self):
+        """Test that an empty list round-trips."""
+        assert decode_snapshot(encode_snapshot(AudioSourceList([]), TOKEN), TOKEN).is_empty()
+
+
+class TestSourceSnapshotFile:
+    """Tests for SourceSnapshotFile."""
+
+    def test_save_and_load(self, snapshot_file, sources):
+        """Test that a saved snapshot is loaded under the same token."""
+        snapshot_file.save(sources, TOKEN)
+
+        assert snapshot_file.load(TOKEN).sources == sources.sources
+        assert snapshot_file.load(b"other") is None
+
+    def test_missing_file(self, snapshot_file):
+        """Test that a missing file counts as invalid."""
+        assert snapshot_file.load(TOKEN) is None
+
+    def test_discard(self, snapshot_file, sources):
+        """Test that a discarded snapshot is gone, and discarding twice is harmless."""
+        snapshot_file.save(sources, TOKEN)
+
+        snapshot_file.discard()
+        snapshot_file.discard()
+
+        assert snapshot_file.load(TOKEN) is None
+
+    def test_unwritable_location_is_not_fatal(self, tmp_path, sources):
+        """Test that failing to save is only logged."""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+
+        SourceSnapshotFile(str(blocker / "sources.bin")).save(sources, TOKEN)
+
+
+class TestSourceCacheSnapshot:
+    """Tests for fetching through the snapshot file."""
+
+    @staticmethod
+    def client(sources, token=TOKEN):
+        client = Mock(spec=["list_sources", "snapshot_token", "get_default_source"])
+        client.list_sources.return_value = sources
+        client.snapshot_token.return_value = token
+        return client
+
+    def test_valid_snapshot_skips_listing(self, snapshot_file, sources):
+        """Test that a later run with the same token does not list."""
+        SourceCache(self.client(sources), snapshot_file=snapshot_file).list_sources()
+        client = self.client(sources)
+
+        listed = SourceCache(client, snapshot_file=snapshot_file).list_sources()
+
+        assert listed.sources == sources.sources
+        client.list_sources.assert_not_called()
+
+    def test_changed_token_lists_and_saves(self, snapshot_file, sources):
+        """Test that a changed source set is listed in full and saved again."""
+        snapshot_file.save(AudioSourceList([AudioSource("old", 9)]), TOKEN)
+        client = self.client(sources, token=b"new")
+
+        listed = SourceCache(client, snapshot_file=snapshot_file).list_sources()
+
+        assert listed is sources
+        assert snapshot_file.load(b"new").sources == sources.sources
+
+    def test_failed_listing_is_not_saved(self, snapshot_file):
+        """Test that an empty result does not replace the snapshot."""
+        SourceCache(self.client(AudioSourceList([])), snapshot_file=snapshot_file).list_sources()
+
+        assert snapshot_file.load(TOKEN) is None
+
+    def test_changed_description_is_not_reinstalled(self, snapshot_file, sources):
+        """Test that a change event lists afresh and discards the saved list."""
+        SourceCache(self.client(sources), snapshot_file=snapshot_file).list_sources()
+        client = self.client(sources)
+        cache = SourceCache(client, snapshot_file=snapshot_file)
+        cache.list_sources()
+        renamed = AudioSourceList([AudioSource(name=sources.sources[0].name, index=0, description="New Mic")])
+        client.list_sources.return_value = renamed
+
+        cache.apply_events([DeviceEvent(DeviceEventType.CHANGE, DeviceFacility.SOURCE, 0)])
+
+        assert cache.list_sources().sources[0].description == "New Mic"
+        assert snapshot_file.load(TOKEN) is None
+
+    def test_later_fetches_do_not_use_saved_list(self, snapshot_file, sources):
+        """Test that only the first fetch of a run may answer from the file."""
+        client = self.client(sources)
+        cache = SourceCache(client, snapshot_file=snapshot_file)
+        cache.fetch()
+        snapshot_file.save(AudioSourceList([AudioSource("old", 9)]), TOKEN)
+
+        assert cache.fetch() is sources
+        assert client.snapshot_token.call_count == 1
+
+    def test_no_token_lists_directly(self, snapshot_file, sources):
+        """Test that without a token the snapshot is neither read nor written."""
+        client = self.client(sources, token=None)
+
+        SourceCache(client, snapshot_file=snapshot_file).list_sources()
+
+        client.list_sources.assert_called_once()
+        assert snapshot_file.load(TOKEN) is None
+
+
+class TestPactlSnapshotToken:
+    """Tests for PactlClient.snapshot_token."""
+
+    @staticmethod
+    def short_listing(state):
+        return (
+            f"0\talsa_input.pci-0000_00_1f.3.analog-stereo\tPipeWire\ts32le 2ch 48000Hz\t{state}\n"
+            f"1\talsa_input.usb-ME6S-00.mono-fallback\tPipeWire\ts16le 1ch 48000Hz\t{state}\n"
+        ).encode()
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_token_ignores_source_state(self, mock_run):
+        """Test that a source starting or stopping capture keeps the token."""
+        client = PactlClient()
+        mock_run.return_value = MagicMock(returncode=0, stdout=self.short_listing("SUSPENDED"))
+        suspended = client.snapshot_token()
+        mock_run.return_value = MagicMock(returncode=0, stdout=self.short_listing("RUNNING"))
+
+        assert client.snapshot_token() == suspended
+        assert mock_run.call_args[0][0] == ["pactl", "list", "short", "sources"]
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_token_changes_with_sources(self, mock_run):
+        """Test that adding a source changes the token."""
+        client = PactlClient()
+        mock_run.return_value = MagicMock(returncode=0, stdout=self.short_listing("IDLE"))
+        before = client.snapshot_token()
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout=self.short_listing("IDLE") + b"2\tbluez_input.00_1B_66\tPipeWire\n"
+        )
+
+        assert client.snapshot_token() != before
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_no_token_when_pactl_fails(self, mock_run):
+        """Test that an unanswered short listing gives no token."""
+        mock_run.side_effect = OSError("pactl not found")
+
+        assert PactlClient().snapshot_token() is None
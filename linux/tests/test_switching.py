@@ -1,63 +1,19 @@
 """Integration tests for microphone switching."""
 import subprocess
+from unittest.mock import Mock, patch
 
 import pytest
 
+from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.source_search import SourceSearchIndex
+from lib.domain.stream_move import StreamMoveReport
 from lib.infrastructure.audio_service import PactlClient
+from lib.infrastructure.command_runner import Deadline
 from lib.application.list_sources_use_case import ListSourcesUseCase
 from lib.application.switch_source_use_case import SwitchSourceUseCase
 from lib.presentation.ulauncher_adapter import MicSwitcherPresenter
 
 
-class TestSwitchCommandGeneration:
-    """Tests for switch command generation."""
-
-    @pytest.fixture
-    def command_builder(self):
-        """Create command builder for testing."""
-        from lib.presentation.ulauncher_adapter import SwitchCommandBuilder
-        return SwitchCommandBuilder(notification_expire_time=1500)
-
-    def test_switch_command_structure(self, command_builder):
-        """Test that switch command has correct structure."""
-        source = "alsa_input.test.mono-fallback"
-        script = command_builder.build(source, "Test Mic")
-
-        assert "set-default-source" in script
-        assert source in script
-        assert "move-source-output" in script
-        assert "source-outputs" in script
-
-    def test_switch_command_handles_special_chars(self, command_builder):
-        """Test command generation with special characters."""
-        import shlex
-        source = "alsa_input.usb-0000:00:14.0.analog-stereo"
-        script = command_builder.build(source, "Test Mic")
-
-        escaped = shlex.quote(source)
-        assert escaped in script
-        assert source not in script or escaped in script
-
-    def test_switch_command_syntax_valid(self, command_builder):
-        """Test that generated script has valid shell syntax."""
-        source = "alsa_input.test.mono-fallback"
-        script = command_builder.build(source, "Test Mic")
-
-        try:
-            result = subprocess.run(
-                ["bash", "-n"],
-                input=script,
-                capture_output=True,
-                text=True,
-                timeout=1,
-            )
-
-            assert result.returncode == 0, f"Invalid syntax: {result.stderr}"
-
-        except FileNotFoundError:
-            pytest.skip("bash not available")
-
-
 class TestActualPactlCommands:
     """Tests for actual pactl commands with state preservation."""
 
@@ -181,3 +137,112 @@ done"""
 
         except FileNotFoundError:
             pytest.skip("pactl not available on this system")
+
+
+class TestListSourcesUseCase:
+    """Unit tests for ListSourcesUseCase."""
+
+    def test_index_is_reused_for_unchanged_snapshot(self):
+        """Test that the search index is only rebuilt when the snapshot changes."""
+        snapshot = AudioSourceList([AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=1)])
+        client = Mock()
+        client.list_sources.return_value = snapshot
+        use_case = ListSourcesUseCase(client)
+
+        with patch(
+            "lib.application.list_sources_use_case.SourceSearchIndex", wraps=SourceSearchIndex
+        ) as index_class:
+            use_case.execute(query="u")
+            use_case.execute(query="us")
+            result = use_case.execute(query="usb")
+            assert index_class.call_count == 1
+
+            client.list_sources.return_value = AudioSourceList(list(snapshot.sources))
+            use_case.execute(query="usb")
+            assert index_class.call_count == 2
+
+        assert result.sources[0].index == 1
+
+    def test_prepared_index_is_used_by_first_query(self):
+        """Test that an index built ahead of time is not built again on the first query."""
+        snapshot = AudioSourceList([AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=1)])
+        client = Mock()
+        client.list_sources.return_value = snapshot
+        use_case = ListSourcesUseCase(client)
+        use_case.prepare(snapshot)
+
+        with patch("lib.application.list_sources_use_case.SourceSearchIndex") as index_class:
+            use_case.execute(query="usb")
+
+        index_class.assert_not_called()
+
+    def test_extended_query_refines_previous_matches(self):
+        """Test that typing on only re-checks the previous query's matches."""
+        client = Mock()
+        client.list_sources.return_value = AudioSourceList([
+            AudioSource(name=f"{kind}-{i}", index=i)
+            for i, kind in enumerate(["usb", "pci", "usb", "bluez", "pci"] * 20)
+        ])
+        use_case = ListSourcesUseCase(client)
+        use_case.execute(query="u", limit=5)
+        index = use_case._index
+        index.matches = Mock(wraps=index.matches)
+
+        result = use_case.execute(query="USB", limit=5)
+
+        within = index.matches.call_args.args[1]
+        assert len(within) == 60
+        assert [s.index for s in result.sources] == [0, 2, 5, 7, 10]
+
+    def test_memo_is_dropped_on_snapshot_change(self):
+        """Test that matches from an older snapshot are never reused."""
+        client = Mock()
+        client.list_sources.return_value = AudioSourceList([AudioSource(name="alsa_input.pci", index=0)])
+        use_case = ListSourcesUseCase(client)
+        assert use_case.execute(query="usb").is_empty()
+
+        client.list_sources.return_value = AudioSourceList([AudioSource(name="alsa_input.usb", index=4)])
+
+        assert [s.index for s in use_case.execute(query="usb").sources] == [4]
+
+    def test_memo_is_bounded(self):
+        """Test LRU eviction of old queries."""
+        client = Mock()
+        client.list_sources.return_value = AudioSourceList([AudioSource(name="alsa_input.usb", index=0)])
+        use_case = ListSourcesUseCase(client)
+
+        for i in range(ListSourcesUseCase.MEMO_SIZE + 5):
+            use_case.execute(query=f"q{i}")
+
+        assert len(use_case._memo) == ListSourcesUseCase.MEMO_SIZE
+        assert "q0" not in use_case._memo
+
+
+class TestSwitchSourceUseCase:
+    """Unit tests for SwitchSourceUseCase."""
+
+    def test_execute_returns_switch_result(self):
+        """Test that the stream move report is handed back to the caller."""
+        client = Mock()
+        report = StreamMoveReport("alsa_input.test")
+        client.move_streams_to_source.return_value = report
+
+        result = SwitchSourceUseCase(client).execute("alsa_input.test")
+
+        client.set_default_source.assert_called_once_with("alsa_input.test")
+        assert result.source_name == "alsa_input.test"
+        assert result.streams is report
+        assert result.elapsed >= 0
+
+    def test_execute_shares_one_deadline(self):
+        """Test that both steps of a switch draw on the same budget."""
+        seen = []
+        client = Mock()
+        client.set_default_source.side_effect = lambda name: seen.append(Deadline.after(10))
+        client.move_streams_to_source.side_effect = lambda name: seen.append(Deadline.after(10)) or StreamMoveReport(name)
+
+        SwitchSourceUseCase(client, deadline=0.5).execute("alsa_input.test")
+
+        assert seen[0] is seen[1]
+        assert seen[0].remaining() <= 0.5
+        assert Deadline.after(10).remaining() > 9
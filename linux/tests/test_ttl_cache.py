@@ -0,0 +1,197 @@
+"""Unit tests for the stale-while-revalidate TTL cache."""
+import threading
+import time
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+
+from lib.infrastructure.audio_service import PactlClient
+from lib.infrastructure.ttl_cache import CacheStats, TtlCache
+
+SOURCES_LISTING = (
+    "Source #0\n"
+    "\tName: alsa_input.pci-0000_00_1f.3.analog-stereo\n"
+    "\tDescription: Built-in Audio Analog Stereo\n"
+)
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class TestTtlCache:
+    """Tests for TtlCache."""
+
+    def test_fresh_value_is_reused(self):
+        """Test that reads within the TTL do not load again."""
+        clock = Clock()
+        load = Mock(side_effect=[1, 2])
+        cache = TtlCache(load, ttl=1.0, clock=clock)
+
+        assert cache.get() == 1
+        clock.now = 0.9
+        assert cache.get() == 1
+
+        load.assert_called_once()
+        assert cache.stats() == CacheStats(hits=1, stale_hits=0, misses=1)
+
+    def test_stale_value_is_served_while_revalidating(self):
+        """Test that within the grace period the old value is returned at once and reloaded behind it."""
+        clock = Clock()
+        release = threading.Event()
+        values = iter([1, 2])
+
+        def load():
+            value = next(values)
+            if value == 2:
+                release.wait(5)
+            return value
+
+        cache = TtlCache(load, ttl=1.0, grace=5.0, clock=clock)
+        cache.get()
+        clock.now = 2.0
+
+        assert cache.get() == 1
+        assert cache.get() == 1
+        release.set()
+
+        assert wait_for(lambda: cache.get() == 2)
+        assert cache.stats().stale_hits >= 2
+        assert cache.stats().misses == 1
+
+    def test_expired_value_is_loaded_synchronously(self):
+        """Test that past the grace period a read waits for a new value."""
+        clock = Clock()
+        cache = TtlCache(Mock(side_effect=[1, 2]), ttl=1.0, grace=1.0, clock=clock)
+        cache.get()
+        clock.now = 2.5
+
+        assert cache.get() == 2
+        assert cache.stats().misses == 2
+
+    def test_concurrent_misses_share_one_load(self):
+        """Test that callers arriving during a load wait for it instead of loading again."""
+        started = threading.Event()
+        release = threading.Event()
+        load_count = []
+
+        def load():
+            load_count.append(1)
+            started.set()
+            release.wait(5)
+            return "sources"
+
+        cache = TtlCache(load, ttl=1.0)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert results == ["sources"] * 5
+        assert len(load_count) == 1
+
+    def test_uncacheable_value_keeps_previous(self):
+        """Test that a failed reload neither replaces nor evicts the cached value."""
+        clock = Clock()
+        cache = TtlCache(Mock(side_effect=[[1], [], [3]]), ttl=1.0, cacheable=bool, clock=clock)
+        cache.get()
+        clock.now = 1.5
+
+        assert cache.get() == []
+        clock.now = 1.6
+        assert cache.get() == [3]
+
+    def test_invalidate_forces_load(self):
+        """Test that an invalidated value is not served again."""
+        load = Mock(side_effect=[1, 2])
+        cache = TtlCache(load, ttl=60.0)
+        cache.get()
+
+        cache.invalidate()
+
+        assert cache.get() == 2
+
+    def test_failed_load_is_raised_to_every_caller(self):
+        """Test that load errors propagate and are not cached."""
+        cache = TtlCache(Mock(side_effect=[OSError("boom"), 1]), ttl=1.0)
+
+        with pytest.raises(OSError):
+            cache.get()
+        assert cache.get() == 1
+
+    def test_rejects_negative_durations(self):
+        """Test validation of ttl and grace."""
+        with pytest.raises(ValueError):
+            TtlCache(Mock(), ttl=-1)
+        with pytest.raises(ValueError):
+            TtlCache(Mock(), ttl=1, grace=-1)
+
+
+class TestPactlClientListCache:
+    """Tests for the source list cache inside PactlClient."""
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_listing_is_cached_within_ttl(self, mock_run):
+        """Test that repeated listings within the TTL run pactl once."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=SOURCES_LISTING.encode())
+        client = PactlClient(list_cache_ttl=60.0)
+
+        first = client.list_sources()
+        second = client.list_sources()
+
+        assert first is second
+        assert mock_run.call_count == 1
+        assert client.cache_stats() == CacheStats(hits=1, stale_hits=0, misses=1)
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_failed_listing_is_not_cached(self, mock_run):
+        """Test that an empty result from a failure is retried on the next call."""
+        mock_run.return_value = MagicMock(returncode=1, stdout=b"", stderr=b"Connection refused")
+        client = PactlClient(list_cache_ttl=60.0)
+
+        client.list_sources()
+        client.list_sources()
+
+        assert mock_run.call_count == 2
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_changed_source_invalidates_listing(self, mock_run):
+        """Test that a source change event makes the next listing ask pactl."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=SOURCES_LISTING.encode())
+        client = PactlClient(list_cache_ttl=60.0)
+        client.list_sources()
+
+        client.invalidate_source(0)
+        client.list_sources()
+
+        assert mock_run.call_count == 2
+
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
+    def test_cache_disabled_by_default(self, mock_run):
+        """Test that without a TTL every listing runs pactl."""
+        mock_run.return_value = MagicMock(returncode=0, stdout=SOURCES_LISTING.encode())
+        client = PactlClient()
+
+        client.list_sources()
+        client.list_sources()
+
+        assert mock_run.call_count == 2
+        assert client.cache_stats() == CacheStats()
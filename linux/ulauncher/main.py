@@ -13,6 +13,7 @@ def create_extension() -> MicSwitcherExtension:
     """Create and configure the extension."""
     container = Container()
     presenter = container.presenter()
+    container.publish_shared_snapshot()
     return MicSwitcherExtension(presenter)
 
 
@@ -165,6 +165,73 @@ class TestSwitchCommand:
         mock_exit.assert_called_once_with(1)
 
 
+class TestSnapshotCommand:
+    """Tests for snapshot_command function."""
+
+    @staticmethod
+    def args(command, query="", limit=10):
+        return MagicMock(command=command, query=query, limit=limit)
+
+    @staticmethod
+    def reader():
+        reader = MagicMock()
+        sources = AudioSourceList([
+            AudioSource(name="Built-in Microphone", index=0),
+            AudioSource(name="USB Microphone", index=1),
+        ])
+        reader.read.return_value = (sources, "USB Microphone")
+        reader.live = True
+        reader.list_sources.return_value = sources
+        reader.get_default_source.return_value = "USB Microphone"
+        return reader
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("sys.exit")
+    def test_list_from_snapshot(self, mock_exit, mock_stdout):
+        """Test that list is answered from the published snapshot."""
+        from macos.raycast.raycast_cli import snapshot_command
+
+        snapshot_command(self.reader(), self.args("list", query="usb"))
+
+        data = json.loads(mock_stdout.getvalue())
+        assert data["sources"] == [{"name": "USB Microphone", "index": 1}]
+        mock_exit.assert_called_once_with(0)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch("sys.exit")
+    def test_current_from_snapshot(self, mock_exit, mock_stdout):
+        """Test that current is answered from the published snapshot."""
+        from macos.raycast.raycast_cli import snapshot_command
+
+        snapshot_command(self.reader(), self.args("current"))
+
+        assert json.loads(mock_stdout.getvalue()) == {"name": "USB Microphone"}
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_falls_through_without_snapshot(self, mock_stdout):
+        """Test that nothing is output when no snapshot is published or for switch."""
+        from macos.raycast.raycast_cli import snapshot_command
+
+        reader = self.reader()
+        snapshot_command(reader, self.args("switch"))
+        reader.read.return_value = None
+        snapshot_command(reader, self.args("list"))
+
+        assert mock_stdout.getvalue() == ""
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test_falls_through_without_live_events(self, mock_stdout):
+        """Test that a snapshot device events do not keep current is not used."""
+        from macos.raycast.raycast_cli import snapshot_command
+
+        reader = self.reader()
+        reader.live = False
+        snapshot_command(reader, self.args("list"))
+        snapshot_command(reader, self.args("current"))
+
+        assert mock_stdout.getvalue() == ""
+
+
 class TestOutputJson:
     """Tests for output_json function."""
 
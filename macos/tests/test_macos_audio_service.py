@@ -39,7 +39,7 @@ class TestMacOSAudioClientListSources:
     """Tests for MacOSAudioClient.list_sources method."""
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_success(self, mock_run, mock_which):
         """Test successful source listing."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -59,7 +59,7 @@ class TestMacOSAudioClientListSources:
         assert result.sources[2].name == "External Microphone"
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_timeout(self, mock_run, mock_which):
         """Test handling of timeout exception."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -73,7 +73,7 @@ class TestMacOSAudioClientListSources:
         assert result.sources == []
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_command_failure(self, mock_run, mock_which):
         """Test handling of command failure."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -87,7 +87,7 @@ class TestMacOSAudioClientListSources:
         assert result.sources == []
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_list_sources_empty_output(self, mock_run, mock_which):
         """Test handling of empty output."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -105,7 +105,7 @@ class TestMacOSAudioClientSetDefaultSource:
     """Tests for MacOSAudioClient.set_default_source method."""
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_set_default_source_success(self, mock_run, mock_which):
         """Test setting default source successfully."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -126,7 +126,7 @@ class TestMacOSAudioClientSetDefaultSource:
         assert "input" in call_args
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_set_default_source_failure(self, mock_run, mock_which):
         """Test handling of set default source failure."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -140,7 +140,7 @@ class TestMacOSAudioClientSetDefaultSource:
             client.set_default_source("Non-existent Microphone")
 
     @patch("lib.infrastructure.macos_audio_service.shutil.which")
-    @patch("lib.infrastructure.macos_audio_service.subprocess.run")
+    @patch("lib.infrastructure.command_runner.CommandRunner.run")
     def test_set_default_source_timeout(self, mock_run, mock_which):
         """Test handling of timeout when setting default source."""
         mock_which.return_value = "/usr/local/bin/SwitchAudioSource"
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Compare AudioSource memory and filter throughput with the old dataclass.
+
+"bytes/source" is everything allocated while building the records, which
+for the slotted record includes its precomputed search key. The slotted
+record is faster to filter but larger: it trades memory for speed.
+
+Usage: python3 scripts/bench_audio_source.py [--count 10000] [--repeat 20]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.domain.audio_source import AudioSource, normalize  # noqa: E402
+
+QUERIES = ["usb", "Mic", "analog", "remap", "zzz"]
+
+
+@dataclass(frozen=True)
+class DataclassAudioSource:
+    """The previous AudioSource: plain frozen dataclass, keys computed per call."""
+    name: str
+    index: int
+    description: str = ""
+
+    def is_monitor(self) -> bool:
+        return "monitor" in self.name.lower()
+
+    def matches_query(self, query: str) -> bool:
+        query_lower = query.lower()
+        return query_lower in self.name.lower() or query_lower in self.description.lower()
+
+
+def source_fields(count):
+    kinds = ["usb-Blue_Yeti", "pci-0000_00_1f.3.analog-stereo", "remap.aes67", "bluez.headset"]
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        suffix = ".monitor" if i % 5 == 0 else ""
+        yield f"alsa_input.{kind}-{i:05d}{suffix}", i, f"{kind.split('.')[0].title()} Microphone {i}"
+
+
+def measure_memory(cls, count):
+    fields = list(source_fields(count))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sources = [cls(*f) for f in fields]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return sources, allocated / count
+
+
+def filter_dataclass(sources, query):
+    return [s for s in sources if not s.is_monitor() and s.matches_query(query)]
+
+
+def filter_slotted(sources, query):
+    needle = normalize(query)
+    return [s for s in sources if not s.is_monitor() and s.matches_key(needle)]
+
+
+def measure_filtering(sources, filter_sources, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            filter_sources(sources, query)
+    elapsed = time.perf_counter() - started
+    return repeat * len(QUERIES) * len(sources) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{args.count} sources, {args.repeat} x {len(QUERIES)} queries")
+    print(f"{'record':<22}{'object bytes':>14}{'bytes/source':>14}{'checks/s':>16}")
+    variants = [
+        ("dataclass (before)", DataclassAudioSource, filter_dataclass),
+        ("slotted AudioSource", AudioSource, filter_slotted),
+    ]
+    for label, cls, filter_sources in variants:
+        sources, per_source = measure_memory(cls, args.count)
+        throughput = measure_filtering(sources, filter_sources, args.repeat)
+        print(f"{label:<22}{sys.getsizeof(sources[0]):>14}{per_source:>14.0f}{throughput:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
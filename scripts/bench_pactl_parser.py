@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Compare the bytes parser for `pactl list sources` with the old line parser.
+
+Usage: python3 scripts/bench_pactl_parser.py [--sizes 10 100 10000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lib.domain.audio_source import AudioSource  # noqa: E402
+from lib.infrastructure.pactl_parser import parse_sources  # noqa: E402
+
+BLOCK = """Source #{index}
+\tState: SUSPENDED
+\tName: alsa_input.usb-Vendor_Device_{index:05d}-00.mono-fallback
+\tDescription: USB Microphone {index}
+\tDriver: PipeWire
+\tSample Specification: s16le 1ch 48000Hz
+\tChannel Map: mono
+\tOwner Module: 4294967295
+\tMute: no
+\tVolume: mono: 65536 / 100% / 0.00 dB
+\t        balance 0.00
+\tBase Volume: 65536 / 100% / 0.00 dB
+\tLatency: 0 usec, configured 0 usec
+\tFlags: HARDWARE HW_MUTE_CTRL HW_VOLUME_CTRL DECIBEL_VOLUME LATENCY
+\tProperties:
+\t\talsa.card = "{index}"
+\t\talsa.long_card_name = "Vendor Device at usb-0000:00:14.0-{index}, full speed"
+\t\tdevice.bus = "usb"
+\t\tdevice.description = "USB Microphone {index}"
+\t\tmedia.class = "Audio/Source"
+\t\tnode.name = "alsa_input.usb-Vendor_Device_{index:05d}-00.mono-fallback"
+\tPorts:
+\t\tanalog-input-mic: Microphone (type: Mic, priority: 8700, available)
+\tActive Port: analog-input-mic
+\tFormats:
+\t\tpcm
+
+"""
+
+
+def synthetic_output(count):
+    return "".join(BLOCK.format(index=i) for i in range(count)).encode()
+
+
+def line_parser(stdout):
+    """The previous PactlClient.list_sources parsing loop."""
+    sources = []
+    current = {}
+    for line in stdout.decode().splitlines():
+        line = line.rstrip()
+        if line.startswith("Source #"):
+            if current.get("name"):
+                sources.append(AudioSource(current["name"], current["index"], current.get("description", "")))
+            number = line[len("Source #"):].strip()
+            current = {"index": int(number) if number.isdigit() else len(sources)}
+        elif line.startswith("\tName: "):
+            current["name"] = line.split("Name: ", 1)[1].strip()
+        elif line.startswith("\tDescription: "):
+            current["description"] = line.split("Description: ", 1)[1].strip()
+    if current.get("name"):
+        sources.append(AudioSource(current["name"], current["index"], current.get("description", "")))
+    return sources
+
+
+def bytes_parser(stdout):
+    return [record.to_audio_source() for record in parse_sources(stdout)]
+
+
+def best_time(parse, stdout, budget=0.5):
+    best = float("inf")
+    deadline = time.perf_counter() + budget
+    while True:
+        started = time.perf_counter()
+        parse(stdout)
+        best = min(best, time.perf_counter() - started)
+        if time.perf_counter() > deadline:
+            return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 10_000])
+    args = parser.parse_args()
+
+    print(f"{'sources':>8}{'bytes':>12}{'line parser':>16}{'bytes parser':>16}{'speedup':>10}")
+    for count in args.sizes:
+        stdout = synthetic_output(count)
+        assert line_parser(stdout) == bytes_parser(stdout)
+        old = best_time(line_parser, stdout)
+        new = best_time(bytes_parser, stdout)
+        print(f"{count:>8}{len(stdout):>12,}{old * 1e3:>13.3f} ms{new * 1e3:>13.3f} ms{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 """Unit tests for domain models."""
+from unittest.mock import Mock
+
 import pytest
 
-from lib.domain.audio_source import AudioSource, AudioSourceList
+from lib.domain.audio_source import AudioSource, AudioSourceList, AudioSourceView
+from lib.domain.circuit_breaker import CircuitBreaker, CircuitState
+from lib.domain.device_event import DeviceEvent, DeviceEventType, DeviceFacility
+from lib.domain.event_coalescer import EventCoalescer
+from lib.domain.latency import BUCKET_BOUNDS, AdaptiveTimeouts, LatencyHistogram
+from lib.domain.source_search import PREFIX, SUBSTRING, WORD_PREFIX, SourceSearchIndex, normalize
+from lib.domain.stream_move import SourceOutput, StreamExclusionPolicy, StreamMovePlanner
 
 
 class TestAudioSource:
@@ -27,6 +35,37 @@ class TestAudioSource:
         assert not source.matches_query("bluetooth")
 
 
+    def test_record_is_immutable_and_slotted(self):
+        """Test that sources cannot be modified and carry no instance dict."""
+        from dataclasses import FrozenInstanceError
+
+        source = AudioSource(name="alsa_input.usb", index=1)
+
+        with pytest.raises(FrozenInstanceError):
+            source.name = "other"
+        assert not hasattr(source, "__dict__")
+
+    def test_value_semantics(self):
+        """Test equality, hashing, repr and pickling by field values."""
+        import pickle
+
+        source = AudioSource(name="alsa_input.usb", index=1, description="USB Mic")
+        same = AudioSource(name="alsa_input.usb", index=1, description="USB Mic")
+
+        assert source == same and hash(source) == hash(same)
+        assert source != AudioSource(name="alsa_input.usb", index=2, description="USB Mic")
+        assert repr(source) == "AudioSource(name='alsa_input.usb', index=1, description='USB Mic')"
+        assert pickle.loads(pickle.dumps(source)) == source
+
+    def test_precomputed_search_keys(self):
+        """Test that search keys are normalized once at construction."""
+        source = AudioSource(name="alsa_input.USB", index=0, description="Mikrofón")
+
+        assert source.search_keys == ("alsa_input.usb", "mikrofon")
+        assert source.matches_query("MIKROFON")
+        assert not source.matches_query("usb\0mik")
+
+
 class TestAudioSourceList:
     """Tests for AudioSourceList domain model."""
 
@@ -110,3 +149,448 @@ class TestAudioSourceList:
         assert len(result.sources) == 1
         assert "usb" in result.sources[0].name.lower()
         assert "monitor" not in result.sources[0].name.lower()
+
+
+class TestStaleAudioSourceList:
+    """Tests for keeping the stale flag through list operations."""
+
+    @pytest.fixture
+    def stale(self):
+        return AudioSourceList([
+            AudioSource(name="alsa_input.usb-1", index=0),
+            AudioSource(name="alsa_output.usb.monitor", index=1),
+            AudioSource(name="alsa_input.pci", index=2),
+        ]).as_stale()
+
+    def test_as_stale_keeps_sources(self, stale):
+        """Test that marking a list stale keeps its sources."""
+        assert stale.stale
+        assert [s.index for s in stale.sources] == [0, 1, 2]
+        assert not AudioSourceList([]).stale
+
+    def test_operations_keep_flag(self, stale):
+        """Test that filtering, limiting and views keep the flag."""
+        assert stale.filter_monitors().stale
+        assert stale.filter_by_query("usb").stale
+        assert stale.limit(1).stale
+        assert stale.view().filter_monitors().limit(1).materialize().stale
+
+    def test_search_keeps_flag(self, stale):
+        """Test that search results from a stale snapshot are stale."""
+        assert SourceSearchIndex(stale).search("pci", 5).stale
+
+
+class TestAudioSourceView:
+    """Tests for lazy AudioSourceView pipelines."""
+
+    @pytest.fixture
+    def sources(self):
+        return AudioSourceList([
+            AudioSource(name="alsa_input.usb-1", index=0),
+            AudioSource(name="alsa_output.usb.monitor", index=1),
+            AudioSource(name="alsa_input.pci", index=2),
+            AudioSource(name="alsa_input.usb-2", index=3),
+            AudioSource(name="alsa_input.usb-3", index=4),
+        ])
+
+    def test_matches_eager_chain(self, sources):
+        """Test that the lazy pipeline gives the eager API's result."""
+        eager = sources.filter_monitors().filter_by_query("usb").limit(2)
+        lazy = sources.view().filter_monitors().filter_by_query("usb").limit(2).materialize()
+
+        assert lazy == eager
+
+    def test_stops_after_limit(self, sources):
+        """Test that iteration stops once enough matches are found."""
+        seen = []
+
+        def tracked():
+            for source in sources.sources:
+                seen.append(source.index)
+                yield source
+
+        result = AudioSourceView(tracked()).filter_monitors().filter_by_query("usb").limit(2).materialize()
+
+        assert [s.index for s in result.sources] == [0, 3]
+        assert seen == [0, 1, 2, 3]
+
+    def test_is_lazy_until_iterated(self, sources):
+        """Test that building a view runs no predicates."""
+        predicate = Mock(return_value=True)
+
+        view = sources.view().where(predicate).limit(1)
+        predicate.assert_not_called()
+
+        list(view)
+        predicate.assert_called_once()
+
+    def test_steps_apply_in_order(self, sources):
+        """Test that a limit before a filter limits the input."""
+        result = sources.view().limit(2).filter_monitors().materialize()
+
+        assert [s.index for s in result.sources] == [0]
+
+
+class TestStreamMovePlanner:
+    """Tests for StreamMovePlanner."""
+
+    def test_plan_skips_streams_on_target(self):
+        """Test that streams already on the target source are not moved."""
+        outputs = [SourceOutput(1, source_index=5), SourceOutput(2, source_index=7)]
+
+        plan = StreamMovePlanner().plan(outputs, target_index=5)
+
+        assert [o.index for o in plan.to_move] == [2]
+        assert [o.index for o in plan.already_on_target] == [1]
+
+    def test_plan_applies_exclusion_policy(self):
+        """Test that excluded streams are never moved."""
+        policy = StreamExclusionPolicy.from_strings(["application.name=OBS"])
+        outputs = [
+            SourceOutput(1, source_index=3, properties={"application.name": "OBS"}),
+            SourceOutput(2, source_index=3, properties={"application.name": "Zoom"}),
+        ]
+
+        plan = StreamMovePlanner(policy).plan(outputs, target_index=5)
+
+        assert [o.index for o in plan.to_move] == [2]
+        assert [o.index for o in plan.excluded] == [1]
+        assert plan.skipped() == 1
+
+    def test_default_policy_excludes_peak_detect_streams(self):
+        """Test that pavucontrol-style level meters are excluded by default."""
+        outputs = [SourceOutput(1, source_index=3, properties={"media.name": "Peak detect"})]
+
+        plan = StreamMovePlanner().plan(outputs, target_index=None)
+
+        assert plan.to_move == []
+
+    def test_unknown_target_moves_everything_not_excluded(self):
+        """Test planning when the target index cannot be resolved."""
+        outputs = [SourceOutput(1, source_index=5), SourceOutput(2, source_index=7)]
+
+        plan = StreamMovePlanner().plan(outputs, target_index=None)
+
+        assert len(plan.to_move) == 2
+
+    def test_invalid_policy_entry_raises(self):
+        """Test that malformed exclusion entries are rejected."""
+        with pytest.raises(ValueError):
+            StreamExclusionPolicy.from_strings(["application.name"])
+
+
+class TestEventCoalescer:
+    """Tests for EventCoalescer."""
+
+    @staticmethod
+    def source(event_type, index):
+        return DeviceEvent(event_type, DeviceFacility.SOURCE, index)
+
+    def test_burst_is_flushed_once_after_window(self):
+        """Test that a burst of events becomes one batch, one per object."""
+        coalescer = EventCoalescer(window=0.1, min_interval=0.5)
+        for i in range(40):
+            coalescer.add(self.source(DeviceEventType.CHANGE, i % 2), now=i * 0.01)
+
+        assert coalescer.flush(now=0.45) == []
+        events = coalescer.flush(now=0.5)
+
+        assert [e.index for e in events] == [0, 1]
+        assert not coalescer.has_pending()
+
+    def test_continuous_events_are_flushed_after_max_delay(self):
+        """Test that a never-ending burst is still flushed."""
+        coalescer = EventCoalescer(window=0.1, min_interval=0.0, max_delay=0.3)
+        for i in range(10):
+            coalescer.add(self.source(DeviceEventType.CHANGE, 0), now=i * 0.05)
+
+        assert coalescer.due_at() == pytest.approx(0.3)
+
+    def test_min_interval_holds_trailing_events(self):
+        """Test that events after a flush wait for the refresh interval."""
+        coalescer = EventCoalescer(window=0.1, min_interval=0.5)
+        coalescer.add(self.source(DeviceEventType.NEW, 3), now=0.0)
+        coalescer.flush(now=0.1)
+
+        coalescer.add(self.source(DeviceEventType.CHANGE, 3), now=0.2)
+
+        assert coalescer.due_at() == pytest.approx(0.6)
+        assert coalescer.flush(now=0.6) == [self.source(DeviceEventType.CHANGE, 3)]
+
+    def test_new_then_remove_cancels_out(self):
+        """Test that an object that came and went yields no event."""
+        coalescer = EventCoalescer(window=0.1)
+        coalescer.add(self.source(DeviceEventType.NEW, 7), now=0.0)
+        coalescer.add(self.source(DeviceEventType.CHANGE, 7), now=0.01)
+        coalescer.add(self.source(DeviceEventType.REMOVE, 7), now=0.02)
+
+        assert coalescer.flush(now=1.0) == []
+
+    def test_remove_then_new_becomes_change(self):
+        """Test that a reused index is reported as a change."""
+        coalescer = EventCoalescer(window=0.1)
+        coalescer.add(self.source(DeviceEventType.REMOVE, 7), now=0.0)
+        coalescer.add(self.source(DeviceEventType.NEW, 7), now=0.01)
+
+        assert coalescer.flush(now=1.0) == [self.source(DeviceEventType.CHANGE, 7)]
+
+    def test_new_then_change_stays_new(self):
+        """Test that a change to a freshly added object keeps it new."""
+        coalescer = EventCoalescer(window=0.1)
+        coalescer.add(self.source(DeviceEventType.NEW, 7), now=0.0)
+        coalescer.add(self.source(DeviceEventType.CHANGE, 7), now=0.01)
+
+        assert coalescer.flush(now=1.0) == [self.source(DeviceEventType.NEW, 7)]
+
+    def test_rejects_max_delay_shorter_than_window(self):
+        """Test configuration validation."""
+        with pytest.raises(ValueError):
+            EventCoalescer(window=1.0, max_delay=0.5)
+
+
+class TestSourceSearchIndex:
+    """Tests for SourceSearchIndex."""
+
+    @pytest.fixture
+    def index(self):
+        return SourceSearchIndex(AudioSourceList([
+            AudioSource(name="alsa_input.pci-0000_00_1f.3.analog-stereo", index=0, description="Built-in Audio"),
+            AudioSource(name="alsa_input.usb-ME6S-00.mono-fallback", index=1, description="ME6S Microphone"),
+            AudioSource(name="aes67.remote-studio", index=2, description="Studio Mikrofón"),
+            AudioSource(name="remap.usb", index=3, description="usb"),
+        ]))
+
+    def test_normalize_casefolds_and_strips_accents(self):
+        """Test key normalization."""
+        assert normalize("Mikrofón STRASSE") == normalize("mikrofon straße")
+
+    def test_search_matches_substrings_like_filter_by_query(self, index):
+        """Test that the index returns the same matches as a linear scan."""
+        for query in ["usb", "o", "Audio", "analog-st", "ME6", "missing", "-0"]:
+            expected = {s.index for s in index.sources.filter_by_query(query).sources}
+
+            assert {s.index for s in index.search(query, limit=10).sources} == expected
+
+    def test_search_ranks_by_match_quality(self, index):
+        """Test exact, prefix, word-prefix, then substring ordering."""
+        result = index.search("usb", limit=10)
+
+        assert [s.index for s in result.sources] == [3, 1]
+
+    def test_search_ignores_accents(self, index):
+        """Test that unaccented queries find accented descriptions."""
+        assert [s.index for s in index.search("mikrofon", limit=10).sources] == [2]
+
+    def test_search_keeps_snapshot_order_within_rank(self, index):
+        """Test that ties are broken by position in the snapshot."""
+        assert [s.index for s in index.search("alsa", limit=10).sources] == [0, 1]
+
+    def test_search_applies_limit(self, index):
+        """Test that only the best results are returned."""
+        assert [s.index for s in index.search("a", limit=2).sources] == [0, 1]
+
+    def test_matches_within_only_ranks_given_positions(self, index):
+        """Test that refinement checks only the given snapshot positions."""
+        assert index.matches("usb", within=[1, 2]) == [(WORD_PREFIX, 1)]
+        assert index.matches("re", within=[2, 3]) == [(WORD_PREFIX, 2), (PREFIX, 3)]
+        assert index.matches("allback", within=[1]) == [(SUBSTRING, 1)]
+
+
+class TestLatencyHistogram:
+    """Tests for LatencyHistogram."""
+
+    def test_percentiles_round_up_to_bucket_bound(self):
+        """Test that percentiles land on the upper bound of their bucket."""
+        histogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.add(0.010)
+        histogram.add(0.200)
+
+        assert 0.010 <= histogram.percentile(50) < 0.010 * 1.2
+        assert histogram.percentile(99) == histogram.percentile(50)
+        assert 0.200 <= histogram.percentile(100) < 0.200 * 1.2
+
+    def test_window_drops_oldest_samples(self):
+        """Test that only the last ``window`` samples count."""
+        histogram = LatencyHistogram(window=3)
+        for seconds in [1.0, 0.01, 0.01, 0.01]:
+            histogram.add(seconds)
+
+        assert len(histogram) == 3
+        assert histogram.percentile(100) < 0.02
+
+    def test_out_of_range_samples_are_clamped(self):
+        """Test samples beyond the last bucket."""
+        histogram = LatencyHistogram()
+        histogram.add(10_000)
+
+        assert histogram.percentile(50) == BUCKET_BOUNDS[-1]
+
+    def test_restores_from_buckets(self):
+        """Test rebuilding a histogram from its saved buckets."""
+        histogram = LatencyHistogram()
+        for seconds in [0.002, 0.004, 0.5]:
+            histogram.add(seconds)
+
+        restored = LatencyHistogram(buckets=histogram.buckets() + [-1, 999])
+
+        assert restored.buckets() == histogram.buckets()
+        assert restored.percentile(90) == histogram.percentile(90)
+
+    def test_empty_has_no_percentile(self):
+        """Test an empty histogram."""
+        assert LatencyHistogram().percentile(99) is None
+
+
+class TestAdaptiveTimeouts:
+    """Tests for AdaptiveTimeouts."""
+
+    def test_default_until_enough_samples(self):
+        """Test that the caller's timeout applies while learning."""
+        timeouts = AdaptiveTimeouts(min_samples=3)
+        timeouts.observe("list", 0.01)
+        timeouts.observe("list", 0.01)
+
+        assert timeouts.timeout("list", 0.3) == 0.3
+        timeouts.observe("list", 0.01)
+        assert timeouts.timeout("list", 0.3) == 0.05
+
+    def test_p99_times_factor_within_bounds(self):
+        """Test the learned timeout and its floor and ceiling."""
+        timeouts = AdaptiveTimeouts(floor=0.05, ceiling=1.0, factor=3.0, min_samples=1)
+        timeouts.observe("list", 0.1)
+        timeouts.observe("fast", 0.001)
+        timeouts.observe("slow", 5.0)
+
+        assert 0.3 <= timeouts.timeout("list", 9) < 0.3 * 1.2
+        assert timeouts.timeout("fast", 9) == 0.05
+        assert timeouts.timeout("slow", 9) == 1.0
+
+    def test_timeouts_grow_while_calls_time_out(self):
+        """Test that recording the timeout of failed calls raises the next one."""
+        timeouts = AdaptiveTimeouts(factor=2.0, ceiling=2.0, min_samples=1)
+        timeout = 0.1
+        for _ in range(5):
+            timeouts.observe("list", timeout)
+            timeout = timeouts.timeout("list", timeout)
+
+        assert timeout == 2.0
+
+    def test_percentiles_report(self):
+        """Test the per-operation statistics."""
+        timeouts = AdaptiveTimeouts(min_samples=2)
+        timeouts.observe("list", 0.01)
+        timeouts.observe("switch", 0.02)
+        timeouts.observe("switch", 0.02)
+
+        report = timeouts.percentiles()
+
+        assert set(report) == {"list", "switch"}
+        assert set(report["list"]) == {"p50", "p90", "p99", "samples", "timeout"}
+        assert report["list"]["samples"] == 1
+        assert report["list"]["timeout"] is None
+        assert report["switch"]["timeout"] == timeouts.timeout("switch", 0)
+
+    def test_round_trip_and_unsaved_count(self):
+        """Test persisting state and tracking unsaved samples."""
+        timeouts = AdaptiveTimeouts(min_samples=1)
+        timeouts.observe("list", 0.01)
+        assert timeouts.unsaved == 1
+        timeouts.mark_saved()
+        assert timeouts.unsaved == 0
+
+        restored = AdaptiveTimeouts(min_samples=1)
+        restored.load(timeouts.to_dict())
+
+        assert restored.timeout("list", 9) == timeouts.timeout("list", 9)
+
+    def test_rejects_invalid_bounds(self):
+        """Test validation of floor, ceiling and factor."""
+        with pytest.raises(ValueError):
+            AdaptiveTimeouts(floor=0)
+        with pytest.raises(ValueError):
+            AdaptiveTimeouts(floor=1.0, ceiling=0.5)
+        with pytest.raises(ValueError):
+            AdaptiveTimeouts(factor=0.5)
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_opens_after_threshold(self):
+        """Test that calls are refused once enough calls in a row timed out."""
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=1.0)
+        for _ in range(2):
+            breaker.record_failure(now=0.0)
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.allow(now=0.0)
+        assert not breaker.healthy
+
+        breaker.record_failure(now=0.0)
+
+        assert breaker.state is CircuitState.OPEN
+        assert not breaker.allow(now=0.5)
+
+    def test_success_resets_failure_count(self):
+        """Test that only consecutive failures count."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure(now=0.0)
+        breaker.record_success()
+        breaker.record_failure(now=0.0)
+
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_half_open_lets_one_trial_through(self):
+        """Test that after the reset timeout exactly one call is let through."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0)
+        breaker.record_failure(now=0.0)
+
+        assert breaker.retry_at == pytest.approx(1.0)
+        assert breaker.allow(now=1.0)
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert not breaker.allow(now=1.1)
+
+        breaker.record_success()
+
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.healthy
+        assert breaker.retry_at is None
+
+    def test_failed_trial_backs_off(self):
+        """Test that each failed trial doubles the wait, up to the maximum."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0, max_reset_timeout=3.0)
+        breaker.record_failure(now=0.0)
+
+        breaker.allow(now=1.0)
+        breaker.record_failure(now=1.0)
+        assert breaker.retry_at == pytest.approx(3.0)
+
+        breaker.allow(now=3.0)
+        breaker.record_failure(now=3.0)
+        assert breaker.retry_at == pytest.approx(6.0)
+        assert breaker.state is CircuitState.OPEN
+
+    def test_lost_trial_is_replaced(self):
+        """Test that a trial that never reports back does not block forever."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0)
+        breaker.record_failure(now=0.0)
+        breaker.allow(now=1.0)
+
+        assert breaker.allow(now=2.0)
+
+    def test_late_failures_do_not_extend_open_circuit(self):
+        """Test that calls started before the circuit opened do not push the retry back."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=1.0)
+        breaker.record_failure(now=0.0)
+        breaker.record_failure(now=0.9)
+
+        assert breaker.retry_at == pytest.approx(1.0)
+
+    def test_rejects_invalid_settings(self):
+        """Test validation of threshold and timeouts."""
+        with pytest.raises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+        with pytest.raises(ValueError):
+            CircuitBreaker(reset_timeout=0)
+        with pytest.raises(ValueError):
+            CircuitBreaker(reset_timeout=2.0, max_reset_timeout=1.0)